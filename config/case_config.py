@@ -195,3 +195,56 @@ Example for Vitals:
 * **Temp:** 37.0°C (98.6°F)
 * **SpO2:** 98% on Room Air
 """
+
+# Narrative summary prompt: the ID, Vitals, Labs, Imaging and Other sections are
+# rendered from the case data, so the LLM only summarizes the free-text sections
+NARRATIVE_SUMMARY_SYSTEM_PROMPT = """
+You are an expert medical summarizer. Your task is to review a transcript of an emergency medicine case simulation between an AI attending physician and a user (student/resident).
+Based on the entire conversation provided, create a concise summary that would be useful for quickly understanding the patient's current status.
+
+The summary MUST include ONLY the following sections. Bullet list these with a newline between each item:
+**PMH:** Relevant past medical history.
+**Meds:** list any long-term meds the patient is taking.
+**Exam:** List pertinent positives and negatives from a physical exam in bullet form.
+**Interventions Administered:** List treatments, medications and procedures given during the case.
+
+Do not include ID, vitals, labs, imaging or other test results; these are summarized separately.
+Format clearly using Markdown.
+If information for a section is not yet available in the transcript, leave the section blank.
+The summary should reflect the *latest* state of the case based on the full transcript.
+"""
+
+# Instructions appended to a summary prompt to update an existing summary with new transcript messages
+INCREMENTAL_SUMMARY_INSTRUCTIONS = """
+You will be given the current summary followed by only the transcript messages exchanged since it was written.
+Return the complete updated summary with all of the sections above, keeping existing details unless the new messages supersede them (for example, newer vitals replace older vitals).
+Do not comment on what changed; output only the updated summary.
+"""
+
+INCREMENTAL_SUMMARY_SYSTEM_PROMPT = SUMMARY_SYSTEM_PROMPT + INCREMENTAL_SUMMARY_INSTRUCTIONS
+INCREMENTAL_NARRATIVE_SUMMARY_SYSTEM_PROMPT = NARRATIVE_SUMMARY_SYSTEM_PROMPT + INCREMENTAL_SUMMARY_INSTRUCTIONS
+
+# History digest prompt: condenses the earlier part of a long case so the attending
+# can continue it consistently without the full transcript
+HISTORY_DIGEST_SYSTEM_PROMPT = """
+You are condensing the earlier part of an emergency medicine case simulation between an AI attending physician and a user (student/resident).
+The attending will continue the case using your digest in place of these messages, so it must preserve everything needed to stay consistent:
+* Every finding the attending has revealed (history, exam, vitals, lab values, imaging and other results), with exact numbers and units.
+* Every question, order, medication and intervention the user has requested, and how the attending responded.
+* The patient's current condition and anything the attending has told the user is pending.
+
+Do not add information that is not in the transcript. Write concise Markdown bullet points.
+If you are given an existing digest, return a single updated digest that also covers the new messages.
+"""
+
+# Final summary prompt: summarizes a completed case for the final summary page
+FINAL_SUMMARY_PROMPT = """
+Please provide a concise, professional summary of this medical case simulation conversation. 
+Focus on:
+- The clinical reasoning process demonstrated
+- Key diagnostic and treatment decisions made
+- The overall approach to patient care
+- Any notable clinical insights or educational moments
+
+Keep the summary to 2-3 sentences and make it specific to the actual conversation content.
+"""
@@ -0,0 +1,225 @@
+"""
+LLM performance settings for Emergency Medicine Case Simulator
+"""
+
+import os
+
+# Live case summary: update the previous summary with only the new messages
+# instead of re-summarizing the whole transcript on every turn
+SUMMARY_INCREMENTAL_ENABLED = os.getenv("SUMMARY_INCREMENTAL_ENABLED", "true").lower() == "true"
+
+# Rebuild the live summary from the full transcript after this many incremental
+# updates to correct any drift
+SUMMARY_FULL_REBUILD_INTERVAL = int(os.getenv("SUMMARY_FULL_REBUILD_INTERVAL", "8"))
+
+# Live case summary: render ID, vitals, labs and imaging sections from the case
+# content locally and only ask the LLM for the free-text sections
+SUMMARY_STRUCTURED_EXTRACTION_ENABLED = os.getenv("SUMMARY_STRUCTURED_EXTRACTION_ENABLED", "true").lower() == "true"
+
+# Seconds between store re-checks while a summary request long-polls, so a summary
+# finished by another worker sharing the session store is seen without the timeout
+SUMMARY_WAIT_POLL_INTERVAL_SECONDS = float(os.getenv("SUMMARY_WAIT_POLL_INTERVAL_SECONDS", "1.0"))
+
+# Final summaries: longest the summary stream waits for one case, and seconds a
+# summary may stay pending with no task on this worker before this worker
+# generates it again (the worker that started it may have stopped)
+SUMMARY_FINAL_WAIT_SECONDS = float(os.getenv("SUMMARY_FINAL_WAIT_SECONDS", "120"))
+SUMMARY_FINAL_ORPHAN_SECONDS = float(os.getenv("SUMMARY_FINAL_ORPHAN_SECONDS", "60"))
+
+# Case start: serve opening presentations (with their live summaries) from a
+# per-case pool built at startup instead of calling the LLM for every trainee
+PRESENTATION_POOL_ENABLED = os.getenv("PRESENTATION_POOL_ENABLED", "true").lower() == "true"
+
+# Number of distinct presentation variants kept per case
+PRESENTATION_POOL_SIZE = int(os.getenv("PRESENTATION_POOL_SIZE", "3"))
+
+# Trainees served by one variant before it is replaced with a fresh one
+PRESENTATION_POOL_MAX_USES = int(os.getenv("PRESENTATION_POOL_MAX_USES", "25"))
+
+# Seconds a case start waits for an in-progress pool fill before calling the LLM itself
+PRESENTATION_POOL_WAIT_TIMEOUT = float(os.getenv("PRESENTATION_POOL_WAIT_TIMEOUT", "30"))
+
+# Seconds to wait before retrying a pool fill that failed
+PRESENTATION_POOL_RETRY_DELAY = float(os.getenv("PRESENTATION_POOL_RETRY_DELAY", "30"))
+
+# Chat turns: fold older turns into a "case so far" digest once the history
+# exceeds the model's token budget
+CHAT_HISTORY_WINDOW_ENABLED = os.getenv("CHAT_HISTORY_WINDOW_ENABLED", "true").lower() == "true"
+
+# Per-model context limits. history_token_budget is the chat history size that
+# triggers compaction, recent_turns the number of latest trainee turns always
+# sent verbatim. Models listed here are the ones offered by get_available_models.
+MODEL_SETTINGS = {
+    "gpt-4o": {
+        "context_window": 128000,
+        "history_token_budget": 6000,
+        "recent_turns": 6
+    },
+    "gpt-4o-mini": {
+        "context_window": 128000,
+        "history_token_budget": 6000,
+        "recent_turns": 6
+    },
+    "gpt-4-turbo": {
+        "context_window": 128000,
+        "history_token_budget": 6000,
+        "recent_turns": 6
+    },
+    "gpt-3.5-turbo": {
+        "context_window": 16385,
+        "history_token_budget": 3000,
+        "recent_turns": 4
+    }
+}
+
+# Settings used for models missing from MODEL_SETTINGS
+DEFAULT_MODEL_SETTINGS = MODEL_SETTINGS["gpt-4o"]
+
+# Summary generation: reuse responses for identical (model, prompt, messages)
+# requests, e.g. summary page reloads
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+
+# Maximum summaries kept in memory (least recently used are evicted first)
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "512"))
+
+# Seconds a cached summary stays valid
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "86400"))
+
+# SQLite file that keeps cached summaries across restarts (disabled when empty)
+SUMMARY_CACHE_DISK_PATH = os.getenv("SUMMARY_CACHE_DISK_PATH", "")
+
+# OpenAI rate limiting shared by all requests: maximum concurrent requests and
+# tokens per minute (0 disables either limit). Match these to the account's tier.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+
+# Completion tokens assumed for requests without max_tokens
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "500"))
+
+# Retries for rate limits, timeouts, connection errors and 5xx responses, with
+# jittered exponential backoff between these bounds (Retry-After takes precedence)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30.0"))
+
+# Model tiers per task. Each task uses its primary model, switching to the
+# fallback while the primary's rolling p95 latency exceeds max_p95_seconds or its
+# error rate exceeds MODEL_FALLBACK_ERROR_RATE. Chat latency is measured to the
+# first streamed chunk when streaming. Fallbacks are faster tiers, so falling back
+# for latency brings it down.
+MODEL_TIERS = {
+    "presentation": {
+        "primary": os.getenv("PRESENTATION_MODEL", "gpt-4o"),
+        "fallback": os.getenv("PRESENTATION_FALLBACK_MODEL", "gpt-4o-mini"),
+        "max_p95_seconds": float(os.getenv("PRESENTATION_MAX_P95_SECONDS", "30"))
+    },
+    "chat": {
+        "primary": os.getenv("CHAT_MODEL", "gpt-4o"),
+        "fallback": os.getenv("CHAT_FALLBACK_MODEL", "gpt-4o-mini"),
+        "max_p95_seconds": float(os.getenv("CHAT_MAX_P95_SECONDS", "20"))
+    },
+    "live_summary": {
+        "primary": os.getenv("LIVE_SUMMARY_MODEL", "gpt-4o-mini"),
+        "fallback": os.getenv("LIVE_SUMMARY_FALLBACK_MODEL", "gpt-3.5-turbo"),
+        "max_p95_seconds": float(os.getenv("LIVE_SUMMARY_MAX_P95_SECONDS", "10"))
+    },
+    "final_summary": {
+        "primary": os.getenv("FINAL_SUMMARY_MODEL", "gpt-4o-mini"),
+        "fallback": os.getenv("FINAL_SUMMARY_FALLBACK_MODEL", "gpt-3.5-turbo"),
+        "max_p95_seconds": float(os.getenv("FINAL_SUMMARY_MAX_P95_SECONDS", "10"))
+    }
+}
+
+# Error rate above which a task falls back to its secondary model
+MODEL_FALLBACK_ERROR_RATE = float(os.getenv("MODEL_FALLBACK_ERROR_RATE", "0.2"))
+
+# Number of recent requests per task and model used for p95 latency and error rate
+MODEL_HEALTH_WINDOW = int(os.getenv("MODEL_HEALTH_WINDOW", "50"))
+
+# Requests needed before a model can be judged degraded
+MODEL_HEALTH_MIN_SAMPLES = int(os.getenv("MODEL_HEALTH_MIN_SAMPLES", "10"))
+
+# Seconds before a degraded primary model is tried again
+MODEL_FALLBACK_COOLDOWN_SECONDS = float(os.getenv("MODEL_FALLBACK_COOLDOWN_SECONDS", "60"))
+
+# Chat turns: when a request has not produced its first token within the tracked
+# latency percentile, send an identical second request, use whichever answers
+# first and cancel the other (opt-in, costs extra tokens)
+CHAT_HEDGING_ENABLED = os.getenv("CHAT_HEDGING_ENABLED", "false").lower() == "true"
+
+# Latency percentile after which a chat request is hedged
+HEDGE_LATENCY_PERCENTILE = float(os.getenv("HEDGE_LATENCY_PERCENTILE", "0.9"))
+
+# Never hedge a request sooner than this, even when the model is fast
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "1.0"))
+
+# Hedge budget: extra requests allowed, as a percentage of chat requests
+HEDGE_BUDGET_PERCENT = float(os.getenv("HEDGE_BUDGET_PERCENT", "10"))
+
+# Number of recent chat requests the latency percentile is tracked over, and
+# the number needed before hedging starts
+HEDGE_LATENCY_WINDOW = int(os.getenv("HEDGE_LATENCY_WINDOW", "200"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# Offline batch summaries (python -m services.batch_service): "openai" submits
+# through the Batch API, "local" sends the requests live from this process
+BATCH_BACKEND = os.getenv("BATCH_BACKEND", "openai")
+
+# Seconds between batch status checks and the time a Batch API job may take
+BATCH_POLL_INTERVAL_SECONDS = float(os.getenv("BATCH_POLL_INTERVAL_SECONDS", "30"))
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+
+# LLM backend: "openai", or "stub" to answer from the in-process stub in
+# services/stub_llm.py for hermetic integration and load tests
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+# Stub backend: time to first token ("fixed:S", "uniform:LOW,HIGH" or
+# "lognormal:MU,SIGMA"), generation speed (0 for instant), injected error rate
+# and status, scripted responses file and random seed
+LLM_STUB_LATENCY = os.getenv("LLM_STUB_LATENCY", "lognormal:-0.7,0.5")
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "60"))
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+LLM_STUB_ERROR_STATUS = int(os.getenv("LLM_STUB_ERROR_STATUS", "429"))
+LLM_STUB_RESPONSES = os.getenv("LLM_STUB_RESPONSES", "")
+LLM_STUB_SEED = int(os.getenv("LLM_STUB_SEED")) if os.getenv("LLM_STUB_SEED") else None
+
+# Shared HTTP connection pools to OpenAI and Google Drive: pool size, how long
+# idle connections stay open for reuse, and HTTP/2 (used when h2 is installed)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+DRIVE_HTTP_TIMEOUT_SECONDS = float(os.getenv("DRIVE_HTTP_TIMEOUT_SECONDS", "60"))
+
+# Startup: connections opened to OpenAI before serving, and the longest startup
+# waits for the warm-up of all upstream APIs
+HTTP_WARMUP_CONNECTIONS = int(os.getenv("HTTP_WARMUP_CONNECTIONS", "4"))
+HTTP_WARMUP_TIMEOUT_SECONDS = float(os.getenv("HTTP_WARMUP_TIMEOUT_SECONDS", "10"))
+
+# Usage accounting: calls kept for the rolling rollups, calls kept per trainee
+# and case for the exported chat log, and the most trainee cases kept, least
+# recently used dropped first
+USAGE_WINDOW = int(os.getenv("USAGE_WINDOW", "5000"))
+USAGE_RECORDS_PER_CASE = int(os.getenv("USAGE_RECORDS_PER_CASE", "1000"))
+USAGE_MAX_CASES = int(os.getenv("USAGE_MAX_CASES", "1000"))
+
+# Session storage: "memory" keeps sessions in the worker process, "sqlite"
+# keeps them in a WAL-mode database shared by every worker on the machine so
+# they survive restarts, "redis" keeps them in Redis shared by every node
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+
+# Sessions kept in worker memory (0 for no limit) and seconds a session can sit
+# idle before it is evicted (0 to keep it). The memory store spills evicted
+# sessions to a temporary file; the other stores reload them from storage.
+SESSION_MAX_RESIDENT = int(os.getenv("SESSION_MAX_RESIDENT", "1000"))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+
+# SQLite session store: database file, longest seconds a write waits for its
+# batch to be committed, and queued writes that trigger an immediate commit
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.sqlite3")
+SESSION_DB_FLUSH_INTERVAL_SECONDS = float(os.getenv("SESSION_DB_FLUSH_INTERVAL_SECONDS", "0.05"))
+SESSION_DB_BATCH_SIZE = int(os.getenv("SESSION_DB_BATCH_SIZE", "200"))
+
+# Redis session store (needs the redis package): server and key prefix
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "emsim")
@@ -5,6 +5,7 @@ Pydantic models for Emergency Medicine Case Simulator
 from datetime import datetime
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
+from models.transcript import Transcript
 
 
 class LoginRequest(BaseModel):
@@ -24,6 +25,7 @@ class ChatMessage(BaseModel):
     role: str = Field(..., description="Role: 'user' or 'assistant'")
     content: str = Field(..., min_length=1, description="Message content")
     timestamp: datetime = Field(default_factory=datetime.now)
+    seq: int = Field(0, description="Turn number within the case, shared by a user message and its response")
 
 
 class ChatRequest(BaseModel):
@@ -35,6 +37,8 @@ class ChatResponse(BaseModel):
     """Response model for chat interactions"""
     message: str
     summary: str
+    summary_version: int = 0
+    summary_pending: bool = False
 
 
 class CaseInfo(BaseModel):
@@ -55,6 +59,78 @@ class CaseStartResponse(BaseModel):
     message: str
     initial_message: str
     summary: str
+    summary_version: int = 0
+    summary_pending: bool = False
+
+
+class LiveSummary(BaseModel):
+    """Model for the live case summary of an in-progress case"""
+    summary: str = "Summary will appear here once the case starts."
+    version: int = 0
+    message_count: int = 0  # Number of transcript messages the summary covers
+    pending: bool = False
+    needs_full_rebuild: bool = True  # Next refresh must re-summarize the full transcript
+    updates_since_rebuild: int = 0  # Incremental updates applied since the last full rebuild
+    llm_summary: str = ""  # LLM-generated part of the summary that incremental updates build on
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class FinalSummary(BaseModel):
+    """Model for the summary of a completed case shown on the final summary page"""
+    summary: str = ""
+    version: int = 0
+    message_count: int = 0  # Number of transcript messages the summary covers
+    pending: bool = False
+    failed: bool = False
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class HistoryDigest(BaseModel):
+    """Model for the condensed earlier part of a long case conversation"""
+    summary: str
+    message_count: int  # Number of leading transcript messages the digest replaces
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class PooledPresentation(BaseModel):
+    """Model for a pre-generated opening case presentation and its live summary"""
+    initial_message: str
+    summary: str
+    llm_summary: str  # LLM-generated part of the summary, see LiveSummary.llm_summary
+    model: str  # Model that generated the presentation
+    uses: int = 0  # Number of trainees who received this variant
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+class LLMCallRecord(BaseModel):
+    """Model for the usage and timing of one OpenAI API call"""
+    user_id: Optional[str] = None  # None for calls not made for a trainee, e.g. pool fills
+    case_id: Optional[str] = None
+    task: str  # Model routing task, e.g. "chat" or "live_summary"
+    prompt_type: str  # Prompt the call was built from, e.g. "incremental_summary"
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    time_to_first_token: Optional[float] = None  # Seconds, None if the call failed
+    latency: float  # Seconds until the call finished
+    outcome: str  # "ok", "cancelled" or the error type, e.g. "RateLimitError"
+    timestamp: datetime = Field(default_factory=datetime.now)
+
+
+class LiveSummaryResponse(BaseModel):
+    """Response model for polling the live case summary"""
+    summary: str
+    version: int
+    pending: bool
+
+
+class FinalCaseSummaryResponse(BaseModel):
+    """Response model for polling the final summary of a completed case"""
+    summary: str
+    version: int
+    pending: bool
+    failed: bool
 
 
 class CaseCompleteRequest(BaseModel):
@@ -91,8 +167,11 @@ class UserSession(BaseModel):
     user_id: str
     current_case: Optional[str] = None
     completed_cases: List[str] = []
-    chat_history: Dict[str, List[ChatMessage]] = {}
+    chat_history: Dict[str, Transcript] = {}  # case_id -> chat transcript
     survey_responses: Dict[str, Dict[int, int]] = {}  # case_id -> question_index -> rating
+    live_summaries: Dict[str, LiveSummary] = {}  # case_id -> latest live summary
+    history_digests: Dict[str, HistoryDigest] = {}  # case_id -> digest of earlier chat turns
+    final_summaries: Dict[str, FinalSummary] = {}  # case_id -> summary of the completed case
     started_at: datetime = Field(default_factory=datetime.now)
 
 
@@ -103,6 +182,10 @@ class CaseSummaryData(BaseModel):
     description: str
     chat_messages: List[ChatMessage]
     completion_action: Optional[str] = None
+    summary: str = ""
+    summary_version: int = 0
+    summary_pending: bool = False
+    summary_failed: bool = False
 
 
 class FinalSummaryResponse(BaseModel):
@@ -110,3 +193,47 @@ class FinalSummaryResponse(BaseModel):
     completed_cases: List[CaseSummaryData]
     survey_questions: List[str]
     existing_responses: Dict[str, Dict[int, int]]
+
+
+class PatientIdentification(BaseModel):
+    """Model for patient identification details parsed from case content"""
+    age: Optional[int] = None
+    sex: Optional[str] = None
+    chief_complaint: Optional[str] = None
+
+
+class VitalSign(BaseModel):
+    """Model for a vital sign parsed from case content"""
+    name: str = Field(..., description="Canonical name: BP, HR, RR, Temp, SpO2 or Pain")
+    value: str
+    unit: Optional[str] = None
+    alternate: Optional[str] = Field(None, description="Same reading in other units, e.g. '98.6 °F'")
+
+
+class LabResult(BaseModel):
+    """Model for a laboratory result parsed from case content"""
+    name: str
+    panel: Optional[str] = None
+    value: str
+    numeric_value: Optional[float] = None
+    unit: Optional[str] = None
+    reference_range: Optional[str] = None
+    reference_low: Optional[float] = None
+    reference_high: Optional[float] = None
+    flag: Optional[str] = Field(None, description="'H', 'L', 'A' (abnormal) or None if within range")
+
+
+class ImagingResult(BaseModel):
+    """Model for an imaging or other diagnostic study parsed from case content"""
+    modality: str
+    finding: str
+    section: str = Field("Imaging", description="Summary section: 'Imaging' or 'Other'")
+
+
+class CaseDataIndex(BaseModel):
+    """Model for the structured data indexed from a case"""
+    case_id: str
+    identification: PatientIdentification = Field(default_factory=PatientIdentification)
+    vitals: List[VitalSign] = []
+    labs: List[LabResult] = []
+    imaging: List[ImagingResult] = []
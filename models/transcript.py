@@ -0,0 +1,175 @@
+"""
+Compact chat transcripts for Emergency Medicine Case Simulator
+"""
+
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from pydantic_core import core_schema
+
+
+class MessageView(Sequence):
+    """Read-only window over a transcript's API messages that copies nothing"""
+    
+    __slots__ = ("_messages", "_start", "_stop")
+    
+    def __init__(self, messages: List[Dict[str, str]], start: int, stop: int):
+        """
+        Initialize message view.
+        
+        Args:
+            messages (List[Dict[str, str]]): Transcript API messages
+            start (int): Index of the first message in the view
+            stop (int): Index after the last message in the view
+        """
+        self._messages = messages
+        self._start = start
+        self._stop = stop
+    
+    def __len__(self) -> int:
+        """Number of messages in the view"""
+        return self._stop - self._start
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, str], "MessageView"]:
+        """Get a message, or a narrower view for a slice"""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("Message views do not support slice steps")
+            return MessageView(self._messages, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Message view index out of range")
+        return self._messages[self._start + index]
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        """Iterate over the messages in the view"""
+        return islice(self._messages, self._start, self._stop)
+
+
+class Transcript:
+    """
+    Append-only chat transcript of one case, stored column-wise.
+    
+    The role/content dicts sent to the chat completions API are built once, when
+    a message is appended, and read through MessageView, so a chat turn does not
+    copy the transcript. ChatMessage models are only built for HTTP responses.
+    """
+    
+    __slots__ = ("roles", "contents", "timestamps", "seqs", "api_messages")
+    
+    def __init__(self):
+        """Initialize an empty transcript"""
+        self.roles: List[str] = []
+        self.contents: List[str] = []
+        self.timestamps: List[datetime] = []
+        self.seqs: List[int] = []
+        self.api_messages: List[Dict[str, str]] = []
+    
+    def append(self, role: str, content: str, timestamp: Optional[datetime] = None, seq: int = 0):
+        """
+        Append a message.
+        
+        Args:
+            role (str): Message role ('user' or 'assistant')
+            content (str): Message content
+            timestamp (Optional[datetime]): Time the message was sent, now if None
+            seq (int): Turn number within the case
+        
+        Raises:
+            ValueError: If the content is empty
+        """
+        if not content:
+            raise ValueError("Message content must not be empty")
+        
+        self.roles.append(role)
+        self.contents.append(content)
+        self.timestamps.append(timestamp or datetime.now())
+        self.seqs.append(seq)
+        self.api_messages.append({"role": role, "content": content})
+    
+    def __len__(self) -> int:
+        """Number of messages"""
+        return len(self.roles)
+    
+    @property
+    def last_seq(self) -> int:
+        """Turn number of the last message, 0 for an empty transcript"""
+        return self.seqs[-1] if self.seqs else 0
+    
+    def view(self, start: int = 0, stop: Optional[int] = None) -> MessageView:
+        """
+        Get API messages without copying them.
+        
+        Args:
+            start (int): Index of the first message
+            stop (Optional[int]): Index after the last message, the end if None
+        
+        Returns:
+            MessageView: Role/content dicts of the messages
+        """
+        length = len(self.api_messages)
+        stop = length if stop is None else min(stop, length)
+        return MessageView(self.api_messages, min(start, stop), stop)
+    
+    def rows(self, start: int = 0) -> Iterator[Tuple[str, str, datetime, int]]:
+        """
+        Iterate over messages as (role, content, timestamp, seq) tuples.
+        
+        Args:
+            start (int): Index of the first message
+        
+        Returns:
+            Iterator[Tuple[str, str, datetime, int]]: Message fields
+        """
+        return islice(zip(self.roles, self.contents, self.timestamps, self.seqs), start, None)
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Get every message as a dict with the ChatMessage fields.
+        
+        Returns:
+            List[Dict[str, Any]]: Messages with role, content, timestamp and seq
+        """
+        return [
+            {"role": role, "content": content, "timestamp": timestamp, "seq": seq}
+            for role, content, timestamp, seq in self.rows()
+        ]
+    
+    @classmethod
+    def from_messages(cls, messages: Any) -> "Transcript":
+        """
+        Build a transcript from ChatMessage models or dicts with their fields.
+        
+        Args:
+            messages: Transcript, or list of ChatMessage models or dicts
+        
+        Returns:
+            Transcript: Transcript holding the messages
+        
+        Raises:
+            ValueError: If messages is not a transcript or a list of messages
+        """
+        if isinstance(messages, Transcript):
+            return messages
+        if not isinstance(messages, list):
+            raise ValueError("A transcript must be a list of messages")
+        
+        transcript = cls()
+        for message in messages:
+            if not isinstance(message, dict):
+                message = message.__dict__
+            timestamp = message.get("timestamp")
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            transcript.append(message["role"], message["content"], timestamp, message.get("seq", 0))
+        return transcript
+    
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> core_schema.CoreSchema:
+        """Validate transcripts from message lists and serialize them as message lists"""
+        return core_schema.no_info_plain_validator_function(
+            cls.from_messages,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda transcript: transcript.to_dicts())
+        )
@@ -2,6 +2,9 @@
 Authentication service for Emergency Medicine Case Simulator
 """
 
+import os
+import hmac
+from typing import Optional
 from config.valid_user_ids import VALID_USER_IDS
 
 
@@ -30,3 +33,19 @@ class AuthService:
             list: List of valid user IDs
         """
         return VALID_USER_IDS.copy()
+    
+    @staticmethod
+    def validate_admin_token(token: Optional[str]) -> bool:
+        """
+        Validate the token sent to admin endpoints against ADMIN_TOKEN.
+        
+        Args:
+            token (Optional[str]): Token from the request
+            
+        Returns:
+            bool: True if the token matches, False otherwise or if ADMIN_TOKEN is not set
+        """
+        admin_token = os.getenv("ADMIN_TOKEN")
+        if not admin_token or not token:
+            return False
+        return hmac.compare_digest(token.encode(), admin_token.encode())
@@ -0,0 +1,385 @@
+"""
+Offline batch summaries for Emergency Medicine Case Simulator
+
+Re-summarizes exported chat logs after a study closes through a batch backend
+instead of one live call per transcript:
+
+    python -m services.batch_service exported_logs/ summaries.csv
+"""
+
+import os
+import csv
+import json
+import uuid
+import asyncio
+import argparse
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+from openai import AsyncOpenAI
+from services.openai_service import OpenAIService
+from services.model_router import FINAL_SUMMARY_TASK
+from services.prompt_assembler import CONVERSATION_SUMMARY_PROMPT
+from config.case_config import AVAILABLE_CASES
+from config.llm_config import BATCH_BACKEND, BATCH_POLL_INTERVAL_SECONDS, BATCH_COMPLETION_WINDOW
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+
+# Batch states after which polling stops
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+TranscriptKey = Tuple[str, str]
+
+
+def load_chat_logs(directory: str, case_ids: Iterable[str] = AVAILABLE_CASES) -> Dict[TranscriptKey, List[Dict[str, str]]]:
+    """
+    Load chat logs exported by GoogleDriveService.upload_chat_log.
+    
+    Files are named {user_id}_{case_id}_{case_title}_chat_log_{timestamp}.csv.
+    When a transcript was exported more than once, the latest export is used.
+    
+    Args:
+        directory (str): Directory containing the exported CSV files
+        case_ids (Iterable[str]): Known case IDs, used to split the file names
+    
+    Returns:
+        Dict[TranscriptKey, List[Dict[str, str]]]: Messages per (user_id, case_id)
+    """
+    case_ids = list(case_ids)
+    transcripts = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".csv") or "_chat_log_" not in filename:
+            continue
+        
+        key = None
+        for case_id in case_ids:
+            user_id, separator, _ = filename.partition(f"_{case_id}_")
+            if separator and user_id:
+                key = (user_id, case_id)
+                break
+        if key is None:
+            print(f"Warning: Skipping chat log with unknown case: {filename}")
+            continue
+        
+        with open(os.path.join(directory, filename), newline="", encoding="utf-8") as f:
+            transcripts[key] = [
+                {"role": row["role"], "content": row["content"]}
+                for row in csv.DictReader(f)
+                if row.get("role") in ("user", "assistant") and row.get("content")
+            ]
+    return transcripts
+
+
+def write_summaries_csv(summaries: Dict[TranscriptKey, str], path: str):
+    """
+    Write batch summaries to a CSV file.
+    
+    Args:
+        summaries (Dict[TranscriptKey, str]): Summary per (user_id, case_id)
+        path (str): Output file path
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "case_id", "summary"])
+        for (user_id, case_id), summary in sorted(summaries.items()):
+            writer.writerow([user_id, case_id, summary])
+
+
+class OpenAIBatchBackend:
+    """Runs batch jobs through the OpenAI Batch API"""
+    
+    def __init__(self, client: AsyncOpenAI, completion_window: str = BATCH_COMPLETION_WINDOW):
+        """
+        Initialize OpenAI batch backend.
+        
+        Args:
+            client (AsyncOpenAI): OpenAI client
+            completion_window (str): Time the batch may take, e.g. "24h"
+        """
+        self.client = client
+        self.completion_window = completion_window
+    
+    async def submit(self, jsonl: str) -> str:
+        """
+        Upload a batch input file and start the batch.
+        
+        Args:
+            jsonl (str): Batch requests, one JSON object per line
+        
+        Returns:
+            str: Batch ID
+        """
+        input_file = await self.client.files.create(
+            file=("summaries.jsonl", jsonl.encode("utf-8")),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_ENDPOINT,
+            completion_window=self.completion_window
+        )
+        return batch.id
+    
+    async def get_status(self, batch_id: str) -> str:
+        """
+        Get the state of a batch.
+        
+        Args:
+            batch_id (str): Batch ID
+        
+        Returns:
+            str: Batch status, e.g. "in_progress" or "completed"
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.status
+    
+    async def get_results(self, batch_id: str) -> str:
+        """
+        Download the results of a finished batch.
+        
+        Args:
+            batch_id (str): Batch ID
+        
+        Returns:
+            str: Output and error lines in the Batch API result format
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+        parts = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                parts.append(content.text)
+        return "\n".join(parts)
+
+
+class LocalBatchBackend:
+    """Runs batch jobs in-process, producing the same result format as the Batch API"""
+    
+    def __init__(self, complete: Callable[[Dict[str, Any]], Awaitable[str]], concurrency: int = 4):
+        """
+        Initialize local batch backend.
+        
+        Args:
+            complete (Callable[[Dict[str, Any]], Awaitable[str]]): Returns the completion
+                text for a chat completions request body
+            concurrency (int): Requests run at the same time
+        """
+        self.complete = complete
+        self.concurrency = concurrency
+        self._jobs: Dict[str, asyncio.Task] = {}
+    
+    async def submit(self, jsonl: str) -> str:
+        """
+        Start running a batch.
+        
+        Args:
+            jsonl (str): Batch requests, one JSON object per line
+        
+        Returns:
+            str: Batch ID
+        """
+        batch_id = f"local_batch_{uuid.uuid4().hex}"
+        requests = [json.loads(line) for line in jsonl.splitlines() if line.strip()]
+        self._jobs[batch_id] = asyncio.ensure_future(self._run(requests))
+        return batch_id
+    
+    async def _run(self, requests: List[Dict[str, Any]]) -> str:
+        """
+        Run every request of a batch.
+        
+        Args:
+            requests (List[Dict[str, Any]]): Batch requests
+        
+        Returns:
+            str: Result lines
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def run_one(request: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    content = await self.complete(request["body"])
+                except Exception as e:
+                    return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+            body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+            return {"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+        
+        results = await asyncio.gather(*(run_one(request) for request in requests))
+        return "\n".join(json.dumps(result) for result in results)
+    
+    async def get_status(self, batch_id: str) -> str:
+        """
+        Get the state of a batch.
+        
+        Args:
+            batch_id (str): Batch ID
+        
+        Returns:
+            str: "in_progress", "completed" or "failed"
+        """
+        job = self._jobs[batch_id]
+        if not job.done():
+            return "in_progress"
+        return "failed" if job.exception() is not None else "completed"
+    
+    async def get_results(self, batch_id: str) -> str:
+        """
+        Get the results of a finished batch.
+        
+        Args:
+            batch_id (str): Batch ID
+        
+        Returns:
+            str: Result lines
+        """
+        return self._jobs.pop(batch_id).result()
+
+
+class BatchService:
+    """Service for summarizing many transcripts through a batch backend"""
+    
+    def __init__(self, openai_service: OpenAIService, backend):
+        """
+        Initialize batch service.
+        
+        Args:
+            openai_service (OpenAIService): Service that builds the summary requests
+            backend: OpenAIBatchBackend, LocalBatchBackend or another object with
+                submit, get_status and get_results
+        """
+        self.openai_service = openai_service
+        self.backend = backend
+    
+    def build_batch(self, transcripts: Dict[TranscriptKey, List[Dict[str, str]]], custom_prompt: str = None) -> str:
+        """
+        Build the JSONL batch input for a set of transcripts.
+        
+        Each line holds the same request generate_conversation_summary would send,
+        with a custom_id of "{user_id}:{case_id}".
+        
+        Args:
+            transcripts (Dict[TranscriptKey, List[Dict[str, str]]]): Messages per (user_id, case_id)
+            custom_prompt (str, optional): Custom prompt for summary generation
+        
+        Returns:
+            str: Batch requests, one JSON object per line
+        """
+        lines = []
+        for (user_id, case_id), messages in sorted(transcripts.items()):
+            if not messages:
+                continue
+            lines.append(json.dumps({
+                "custom_id": f"{user_id}:{case_id}",
+                "method": "POST",
+                "url": CHAT_COMPLETIONS_ENDPOINT,
+                "body": self.openai_service.build_conversation_summary_request(messages, custom_prompt)
+            }, ensure_ascii=False))
+        return "\n".join(lines)
+    
+    def parse_results(self, output: str) -> Dict[TranscriptKey, str]:
+        """
+        Read summaries from batch result lines.
+        
+        Args:
+            output (str): Result lines in the Batch API format
+        
+        Returns:
+            Dict[TranscriptKey, str]: Summary per (user_id, case_id), failed requests omitted
+        """
+        summaries = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                print(f"Batch request {result.get('custom_id')} failed: {result.get('error') or response.get('body')}")
+                continue
+            
+            user_id, case_id = result["custom_id"].split(":", 1)
+            summaries[(user_id, case_id)] = response["body"]["choices"][0]["message"]["content"].strip()
+        return summaries
+    
+    async def summarize(self, transcripts: Dict[TranscriptKey, List[Dict[str, str]]], custom_prompt: str = None,
+                        poll_interval: float = BATCH_POLL_INTERVAL_SECONDS) -> Dict[TranscriptKey, str]:
+        """
+        Summarize transcripts in one batch and wait for the results.
+        
+        Args:
+            transcripts (Dict[TranscriptKey, List[Dict[str, str]]]): Messages per (user_id, case_id)
+            custom_prompt (str, optional): Custom prompt for summary generation
+            poll_interval (float): Seconds between status checks
+        
+        Returns:
+            Dict[TranscriptKey, str]: Summary per (user_id, case_id)
+        
+        Raises:
+            Exception: If the batch did not complete
+        """
+        jsonl = self.build_batch(transcripts, custom_prompt)
+        if not jsonl:
+            return {}
+        
+        batch_id = await self.backend.submit(jsonl)
+        print(f"Submitted batch {batch_id} with {len(jsonl.splitlines())} requests")
+        
+        status = await self.backend.get_status(batch_id)
+        while status not in FINISHED_STATUSES:
+            await asyncio.sleep(poll_interval)
+            status = await self.backend.get_status(batch_id)
+        if status != "completed":
+            raise Exception(f"Batch {batch_id} ended with status {status}")
+        
+        summaries = self.parse_results(await self.backend.get_results(batch_id))
+        print(f"Batch {batch_id} completed: {len(summaries)} summaries")
+        return summaries
+
+
+def create_backend(name: str, openai_service: OpenAIService):
+    """
+    Create a batch backend by name.
+    
+    Args:
+        name (str): "openai" for the Batch API, "local" to send the requests live
+        openai_service (OpenAIService): Service providing the OpenAI client
+    
+    Returns:
+        Batch backend
+    """
+    if name == "local":
+        async def complete(body: Dict[str, Any]) -> str:
+            response = await openai_service._create_async(FINAL_SUMMARY_TASK, CONVERSATION_SUMMARY_PROMPT, **body)
+            return response.choices[0].message.content
+        return LocalBatchBackend(complete)
+    return OpenAIBatchBackend(openai_service.async_client)
+
+
+async def main():
+    """Summarize exported chat logs from the command line"""
+    parser = argparse.ArgumentParser(description="Summarize exported chat logs in one batch")
+    parser.add_argument("log_dir", help="Directory of exported chat log CSV files")
+    parser.add_argument("output", help="CSV file to write the summaries to")
+    parser.add_argument("--backend", choices=["openai", "local"], default=BATCH_BACKEND)
+    parser.add_argument("--prompt-file", help="Text file with a custom summary prompt")
+    parser.add_argument("--jsonl", help="Also write the batch input to this file")
+    args = parser.parse_args()
+    
+    custom_prompt = None
+    if args.prompt_file:
+        with open(args.prompt_file, encoding="utf-8") as f:
+            custom_prompt = f.read()
+    
+    openai_service = OpenAIService()
+    batch_service = BatchService(openai_service, create_backend(args.backend, openai_service))
+    transcripts = load_chat_logs(args.log_dir)
+    print(f"Loaded {len(transcripts)} transcripts from {args.log_dir}")
+    
+    if args.jsonl:
+        with open(args.jsonl, "w", encoding="utf-8") as f:
+            f.write(batch_service.build_batch(transcripts, custom_prompt))
+    
+    summaries = await batch_service.summarize(transcripts, custom_prompt)
+    write_summaries_csv(summaries, args.output)
+    print(f"Wrote {len(summaries)} summaries to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,693 @@
+"""
+Case data service for Emergency Medicine Case Simulator
+
+Indexes the vitals, labs and imaging in each case's content and detects which of
+them the AI has revealed in a transcript, so the structured sections of the live
+case summary can be rendered without an LLM call.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.schemas import (
+    CaseDataIndex, PatientIdentification, VitalSign, LabResult, ImagingResult
+)
+from config.case_config import AVAILABLE_CASES
+
+# Order of the sections requested by SUMMARY_SYSTEM_PROMPT
+SUMMARY_SECTIONS = ["ID", "PMH", "Meds", "Vitals", "Exam", "Labs", "Imaging", "Other", "Interventions Administered"]
+
+# Sections rendered from the case data index; the rest come from the LLM
+STRUCTURED_SECTIONS = ["ID", "Vitals", "Labs", "Imaging", "Other"]
+NARRATIVE_SECTIONS = [section for section in SUMMARY_SECTIONS if section not in STRUCTURED_SECTIONS]
+
+VITAL_ALIASES = {
+    "BP": ["BP", "Blood Pressure"],
+    "HR": ["HR", "Heart Rate", "Pulse"],
+    "RR": ["RR", "Respiratory Rate", "Resp Rate"],
+    "Temp": ["Temp", "Temperature"],
+    "SpO2": ["SpO2", "O2 Sat", "Oxygen Saturation", "Sat"],
+    "Pain": ["Pain"],
+}
+
+VITAL_UNITS = {"BP": "mmHg", "HR": "bpm", "RR": "breaths/min", "SpO2": "%"}
+
+LAB_ALIASES = {
+    "WBC": ["White Blood Cell", "White Count"],
+    "Hgb": ["Hemoglobin", "Haemoglobin", "Hb"],
+    "Plt": ["Platelets", "Platelet"],
+    "Na": ["Sodium"],
+    "K": ["Potassium"],
+    "Cl": ["Chloride"],
+    "HCO3": ["Bicarbonate", "Bicarb"],
+    "AG": ["Anion Gap"],
+    "Urea": ["BUN"],
+    "Cr": ["Creatinine"],
+    "Ca": ["Calcium"],
+    "Mg": ["Magnesium"],
+    "PO4": ["Phosphate", "Phosphorus"],
+    "Trop": ["Troponin"],
+    "Bili": ["Bilirubin"],
+    "EtOH": ["Ethanol", "Alcohol"],
+    "ASA": ["Salicylate", "Aspirin"],
+    "Tylenol": ["Acetaminophen", "Paracetamol"],
+    "Osmols": ["Osmolality", "Osmolarity"],
+    "B-HCG": ["Beta-HCG", "hCG", "Pregnancy test"],
+    "CMP": ["Metabolic panel"],
+    "CBC": ["Complete blood count", "Blood count"],
+}
+
+IMAGING_ALIASES = {
+    "ECG": ["EKG", "Electrocardiogram"],
+    "CXR": ["Chest X-ray", "Chest radiograph", "X-ray"],
+    "POCUS": ["Bedside ultrasound", "Point-of-care ultrasound", "Point of care ultrasound"],
+    "CT": ["CT scan", "Computed tomography"],
+}
+
+# Studies reported under "Other" rather than "Imaging"
+OTHER_STUDIES = {"ECG", "EKG"}
+
+ABNORMAL_WORDS = ("elevated", "increased", "decreased", "low", "high", "positive", "abnormal", "raised")
+
+STOPWORDS = {
+    "normal", "evidence", "without", "within", "identified", "presence", "absence",
+    "shows", "showing", "significant", "acute", "there", "which", "their", "about",
+}
+
+SECTION_HEADERS = {
+    "laboratory results": "labs",
+    "labs": "labs",
+    "lab results": "labs",
+    "vital signs": "vitals",
+    "vitals": "vitals",
+    "ecgs, x-rays, ultrasounds and pictures": "imaging",
+    "imaging": "imaging",
+}
+
+NUMBER = r"-?\d+(?:\.\d+)?"
+
+
+class CaseDataService:
+    """Service for indexing structured case data and rendering summary sections"""
+    
+    def __init__(self, cases: Dict[str, Dict] = None):
+        """
+        Initialize case data service and index every available case.
+        
+        Args:
+            cases (Dict[str, Dict], optional): Cases to index, defaults to AVAILABLE_CASES
+        """
+        cases = AVAILABLE_CASES if cases is None else cases
+        self.indexes: Dict[str, CaseDataIndex] = {}
+        self._matchers: Dict[str, List[Tuple[object, re.Pattern, List[str], bool]]] = {}
+        
+        for case_id, case_data in cases.items():
+            index = self.parse_case_content(case_id, case_data["content"])
+            self.indexes[case_id] = index
+            self._matchers[case_id] = self._build_matchers(index)
+    
+    def get_index(self, case_id: str) -> Optional[CaseDataIndex]:
+        """
+        Get the structured data index for a case.
+        
+        Args:
+            case_id (str): Case ID
+        
+        Returns:
+            Optional[CaseDataIndex]: Case data index, None if case unknown
+        """
+        return self.indexes.get(case_id)
+    
+    def has_structured_data(self, case_id: str) -> bool:
+        """
+        Check whether a case has vitals, labs or imaging that can be rendered locally.
+        
+        Args:
+            case_id (str): Case ID
+        
+        Returns:
+            bool: True if the case has indexed vitals, labs or imaging
+        """
+        index = self.indexes.get(case_id)
+        return index is not None and bool(index.vitals or index.labs or index.imaging)
+    
+    def parse_case_content(self, case_id: str, content: str) -> CaseDataIndex:
+        """
+        Parse case content into typed vitals, labs and imaging records.
+        
+        Args:
+            case_id (str): Case ID
+            content (str): Case content from the case configuration
+        
+        Returns:
+            CaseDataIndex: Parsed case data
+        """
+        index = CaseDataIndex(case_id=case_id, identification=self._parse_identification(content))
+        
+        section = None
+        panel = None
+        open_study: Optional[ImagingResult] = None
+        
+        for raw_line in content.splitlines():
+            line = raw_line.strip()
+            
+            if not line:
+                open_study = None
+                continue
+            
+            # Continuation lines of a multi-line study (e.g. "ECG:" followed by findings)
+            if open_study is not None and ":" not in line:
+                separator = " " if not open_study.finding or open_study.finding.endswith((".", ";")) else ". "
+                open_study.finding = f"{open_study.finding}{separator}{line}".strip()
+                continue
+            open_study = None
+            
+            label, _, rest = line.partition(":")
+            label, rest = label.strip(), rest.strip()
+            header = SECTION_HEADERS.get(label.lower()) if _ else None
+            
+            if label.lower() == "triage vitals":
+                index.vitals = self._parse_inline_vitals(rest)
+                continue
+            
+            if header and not rest:
+                section, panel = header, None
+                continue
+            
+            if self._canonical_study(label) and not rest:
+                # Study heading with findings on the following lines
+                open_study = self._make_study(label, "")
+                index.imaging.append(open_study)
+                section = "imaging"
+                continue
+            
+            if not _:
+                # Panel names inside the labs section, e.g. "CBC (Reference Ranges)"
+                if section == "labs":
+                    panel = re.sub(r"\(.*\)", "", line).strip()
+                continue
+            
+            if not rest:
+                # Any other heading ends the current structured section
+                section, panel = None, None
+                continue
+            
+            if section == "labs":
+                lab = self._parse_lab(label, rest, panel)
+                if lab is not None:
+                    index.labs.append(lab)
+            elif section == "imaging":
+                index.imaging.append(self._make_study(label, rest))
+            elif section == "vitals":
+                vital = self._parse_vital(label, rest)
+                if vital is not None:
+                    index.vitals.append(vital)
+        
+        index.imaging = [study for study in index.imaging if study.finding]
+        return index
+    
+    def _parse_identification(self, content: str) -> PatientIdentification:
+        """
+        Parse age, sex and chief complaint from case content.
+        
+        Args:
+            content (str): Case content
+        
+        Returns:
+            PatientIdentification: Parsed identification details
+        """
+        identification = PatientIdentification()
+        
+        age_match = re.search(r"^\s*Age:\s*(\d+)", content, re.MULTILINE | re.IGNORECASE)
+        sex_match = re.search(r"^\s*(?:Gender|Sex):\s*(\w+)", content, re.MULTILINE | re.IGNORECASE)
+        complaint_match = re.search(r"^\s*(?:Presenting|Chief) complaint:\s*(.+)$", content, re.MULTILINE | re.IGNORECASE)
+        one_liner = re.search(
+            r"(\d+)[- ]year[- ]old\s+(man|woman|male|female)\b(?:.*?\bwith\s+([^.]+?)(?:\s+that\b|\.|$))?",
+            content, re.IGNORECASE | re.MULTILINE
+        )
+        
+        if age_match:
+            identification.age = int(age_match.group(1))
+        elif one_liner:
+            identification.age = int(one_liner.group(1))
+        
+        if sex_match:
+            identification.sex = sex_match.group(1).capitalize()
+        elif one_liner:
+            identification.sex = "Male" if one_liner.group(2).lower() in ("man", "male") else "Female"
+        
+        if complaint_match:
+            identification.chief_complaint = complaint_match.group(1).strip().rstrip(".")
+        elif one_liner and one_liner.group(3):
+            identification.chief_complaint = one_liner.group(3).strip()
+        
+        return identification
+    
+    def _canonical_vital(self, label: str) -> Optional[str]:
+        """
+        Map a vital sign label to its canonical name.
+        
+        Args:
+            label (str): Label as written in the case
+        
+        Returns:
+            Optional[str]: Canonical vital name, None if not a vital sign
+        """
+        for name, aliases in VITAL_ALIASES.items():
+            if label.lower() in (alias.lower() for alias in aliases):
+                return name
+        return None
+    
+    def _parse_vital(self, label: str, rest: str) -> Optional[VitalSign]:
+        """
+        Parse a single vital sign.
+        
+        Args:
+            label (str): Vital sign label
+            rest (str): Text following the label
+        
+        Returns:
+            Optional[VitalSign]: Parsed vital sign, None if not recognised
+        """
+        name = self._canonical_vital(label)
+        if name is None:
+            return None
+        
+        if name == "BP":
+            match = re.search(r"\d{2,3}/\d{2,3}", rest)
+        elif name == "Pain":
+            match = re.search(r"\d+/10", rest)
+        else:
+            match = re.search(NUMBER, rest)
+        if match is None:
+            return None
+        
+        value = match.group(0)
+        remainder = rest[match.end():].strip()
+        unit = VITAL_UNITS.get(name)
+        alternate = None
+        if name == "Temp":
+            unit_match = re.match(r"°?\s*([CF])\b", remainder)
+            unit = f"°{unit_match.group(1)}" if unit_match else None
+            other_match = re.search(rf"\(\s*({NUMBER})\s*°?\s*([CF])\s*\)", remainder)
+            if other_match:
+                alternate = f"{other_match.group(1)} °{other_match.group(2)}"
+                # Report Celsius first, as in the summary prompt example
+                if unit == "°F" and other_match.group(2) == "C":
+                    alternate, value, unit = f"{value} {unit}", other_match.group(1), "°C"
+        
+        return VitalSign(name=name, value=value, unit=unit, alternate=alternate)
+    
+    def _parse_inline_vitals(self, text: str) -> List[VitalSign]:
+        """
+        Parse a comma-separated vitals line such as "HR 115, BP 130/80 mmHg, RR 22".
+        
+        Args:
+            text (str): Vitals text
+        
+        Returns:
+            List[VitalSign]: Parsed vital signs
+        """
+        vitals = []
+        for part in text.rstrip(".").split(","):
+            match = re.match(r"\s*([A-Za-z][A-Za-z0-9 ]*?)\s+(\S.*)$", part)
+            if match is None:
+                continue
+            vital = self._parse_vital(match.group(1), match.group(2))
+            if vital is not None:
+                vitals.append(vital)
+        return vitals
+    
+    def _parse_lab(self, name: str, rest: str, panel: Optional[str]) -> Optional[LabResult]:
+        """
+        Parse a lab result line such as "WBC: 7.8 x 10^9/L (4.0-11.0 x 10^9/L)".
+        
+        Args:
+            name (str): Lab name
+            rest (str): Value, unit and reference range
+            panel (Optional[str]): Panel the lab belongs to
+        
+        Returns:
+            Optional[LabResult]: Parsed lab result, None if not applicable
+        """
+        if rest.lower() in ("not applicable", "n/a", "pending"):
+            return None
+        
+        reference_range = None
+        range_match = re.search(r"\(([^()]*)\)\s*$", rest)
+        if range_match and self._parse_range(range_match.group(1)) != (None, None, None):
+            reference_range = range_match.group(1).strip()
+            rest = rest[:range_match.start()].strip()
+        
+        lab = LabResult(name=name, panel=panel, value=rest, reference_range=reference_range)
+        
+        value_match = re.match(rf"([<>]?)\s*({NUMBER})\s*(.*)$", rest)
+        if value_match:
+            lab.value = f"{value_match.group(1)}{value_match.group(2)}"
+            lab.numeric_value = float(value_match.group(2))
+            lab.unit = value_match.group(3).strip() or None
+        
+        low, high, expected = self._parse_range(reference_range) if reference_range else (None, None, None)
+        lab.reference_low, lab.reference_high = low, high
+        
+        if lab.numeric_value is not None and (low is not None or high is not None):
+            if high is not None and lab.numeric_value > high:
+                lab.flag = "H"
+            elif low is not None and lab.numeric_value < low:
+                lab.flag = "L"
+        elif expected is not None:
+            if lab.value.lower() != expected.lower():
+                lab.flag = "A"
+        elif any(word in lab.value.lower() for word in ABNORMAL_WORDS):
+            lab.flag = "A"
+        
+        return lab
+    
+    def _parse_range(self, text: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+        """
+        Parse a reference range.
+        
+        Args:
+            text (str): Reference range such as "4.0-11.0 x 10^9/L", "<0.04 ng/mL" or "Negative"
+        
+        Returns:
+            Tuple[Optional[float], Optional[float], Optional[str]]: (low, high, expected qualitative value)
+        """
+        text = text.strip()
+        match = re.match(rf"({NUMBER})\s*-\s*({NUMBER})", text)
+        if match:
+            return float(match.group(1)), float(match.group(2)), None
+        match = re.match(rf"<\s*({NUMBER})", text)
+        if match:
+            return None, float(match.group(1)), None
+        match = re.match(rf">\s*({NUMBER})", text)
+        if match:
+            return float(match.group(1)), None, None
+        if text.lower() in ("negative", "positive", "normal", "not detected"):
+            return None, None, text
+        return None, None, None
+    
+    def _canonical_study(self, label: str) -> Optional[str]:
+        """
+        Map a study label to its canonical modality.
+        
+        Args:
+            label (str): Study label as written in the case
+        
+        Returns:
+            Optional[str]: Canonical modality, None if not a known study
+        """
+        lowered = label.lower()
+        for modality, aliases in IMAGING_ALIASES.items():
+            if lowered in [modality.lower()] + [alias.lower() for alias in aliases]:
+                return modality
+        if any(word in lowered for word in ("ultrasound", "x-ray", "ct ", "mri", "duplex", "echo")):
+            return label
+        return None
+    
+    def _make_study(self, label: str, finding: str) -> ImagingResult:
+        """
+        Create an imaging or other study record.
+        
+        Args:
+            label (str): Study label
+            finding (str): Study findings
+        
+        Returns:
+            ImagingResult: Study record
+        """
+        modality = self._canonical_study(label) or label
+        section = "Other" if modality.upper() in OTHER_STUDIES else "Imaging"
+        return ImagingResult(modality=modality, finding=finding, section=section)
+    
+    def _aliases_pattern(self, names: List[str]) -> str:
+        """
+        Build a regex alternation matching any of the given names as whole words.
+        
+        Args:
+            names (List[str]): Names and aliases
+        
+        Returns:
+            str: Regex pattern
+        """
+        escaped = sorted({re.escape(name) for name in names}, key=len, reverse=True)
+        return r"(?<![A-Za-z0-9])(?:" + "|".join(escaped) + r")(?![A-Za-z0-9])"
+    
+    def _value_pattern(self, value: str) -> str:
+        """
+        Build a regex matching a value without matching inside a longer number.
+        
+        Args:
+            value (str): Value text
+        
+        Returns:
+            str: Regex pattern
+        """
+        value = value.lstrip("<>")
+        return r"(?<![\d.])" + re.escape(value) + r"(?![\d])"
+    
+    def _keywords(self, text: str) -> List[str]:
+        """
+        Extract distinctive words used to recognise a free-text finding.
+        
+        Args:
+            text (str): Finding text
+        
+        Returns:
+            List[str]: Lowercase keywords
+        """
+        words = re.findall(r"[A-Za-z][A-Za-z-]{4,}", text.lower())
+        return list(dict.fromkeys(word for word in words if word not in STOPWORDS))
+    
+    def _build_matchers(self, index: CaseDataIndex) -> List[Tuple[object, re.Pattern, List[str], bool]]:
+        """
+        Precompile the patterns used to detect revealed records.
+        
+        Args:
+            index (CaseDataIndex): Case data index
+        
+        Returns:
+            List[Tuple[object, re.Pattern, List[str], bool]]: (record, pattern, keywords, line_scoped) tuples
+        """
+        matchers = []
+        
+        for vital in index.vitals:
+            names = self._aliases_pattern(VITAL_ALIASES[vital.name])
+            values = [self._value_pattern(vital.value)]
+            if vital.alternate:
+                values.append(self._value_pattern(vital.alternate.split()[0]))
+            pattern = re.compile(names + r"[^\n\d]{0,25}?(?:" + "|".join(values) + ")", re.IGNORECASE)
+            matchers.append((vital, pattern, [], False))
+        
+        for lab in index.labs:
+            names = self._aliases_pattern([lab.name] + LAB_ALIASES.get(lab.name, []))
+            if lab.numeric_value is not None:
+                pattern = re.compile(names + r"[^\n\d]{0,25}?" + self._value_pattern(lab.value), re.IGNORECASE)
+                matchers.append((lab, pattern, [], False))
+            else:
+                keywords = self._keywords(lab.value) or [lab.value.lower()]
+                matchers.append((lab, re.compile(names + r"[^\n]*", re.IGNORECASE), keywords, True))
+        
+        for study in index.imaging:
+            names = [study.modality] + IMAGING_ALIASES.get(study.modality, [])
+            if "duplex" in study.modality.lower():
+                names += ["duplex", "venous ultrasound", "doppler"]
+            elif "ultrasound" in study.modality.lower():
+                names.append("ultrasound")
+            pattern = re.compile(self._aliases_pattern(names), re.IGNORECASE)
+            matchers.append((study, pattern, self._keywords(study.finding), False))
+        
+        return matchers
+    
+    def find_revealed(self, case_id: str, chat_history: Sequence[Dict[str, str]]) -> CaseDataIndex:
+        """
+        Find the indexed records the AI has revealed so far in a transcript.
+        
+        Args:
+            case_id (str): Case ID
+            chat_history (Sequence[Dict[str, str]]): Conversation messages
+        
+        Returns:
+            CaseDataIndex: Index containing only revealed records
+        """
+        index = self.indexes.get(case_id)
+        revealed = CaseDataIndex(case_id=case_id)
+        if index is None:
+            return revealed
+        
+        assistant_messages = [msg["content"] for msg in chat_history if msg["role"] == "assistant"]
+        if not assistant_messages:
+            return revealed
+        
+        identification = index.identification
+        if identification.age is not None and any(
+            re.search(rf"\b{identification.age}[- ]?(?:year|yr|yo|y/o|y\.o\.)", text, re.IGNORECASE)
+            for text in assistant_messages
+        ):
+            revealed.identification = identification
+        
+        for record, pattern, keywords, line_scoped in self._matchers[case_id]:
+            if not self._is_revealed(pattern, keywords, line_scoped, assistant_messages):
+                continue
+            if isinstance(record, VitalSign):
+                revealed.vitals.append(record)
+            elif isinstance(record, LabResult):
+                revealed.labs.append(record)
+            else:
+                revealed.imaging.append(record)
+        
+        return revealed
+    
+    def _is_revealed(self, pattern: re.Pattern, keywords: List[str], line_scoped: bool, messages: List[str]) -> bool:
+        """
+        Check whether a record appears in any assistant message.
+        
+        Args:
+            pattern (re.Pattern): Pattern matching the record name (and value)
+            keywords (List[str]): Finding keywords that must accompany the name
+            line_scoped (bool): Whether the keywords must appear on the matched line
+            messages (List[str]): Assistant message texts
+        
+        Returns:
+            bool: True if the record has been revealed
+        """
+        required = min(2, len(keywords))
+        for text in messages:
+            for match in pattern.finditer(text):
+                if not keywords:
+                    return True
+                # Line-scoped patterns capture the rest of the line; otherwise search the message
+                scope = match.group(0).lower() if line_scoped else text.lower()
+                if sum(1 for word in keywords if word in scope) >= required:
+                    return True
+        return False
+    
+    def render_structured_sections(self, case_id: str, chat_history: Sequence[Dict[str, str]]) -> Dict[str, str]:
+        """
+        Render the ID, Vitals, Labs, Imaging and Other summary sections from revealed data.
+        
+        Args:
+            case_id (str): Case ID
+            chat_history (Sequence[Dict[str, str]]): Conversation messages
+        
+        Returns:
+            Dict[str, str]: Markdown body for each structured section (empty if nothing revealed)
+        """
+        revealed = self.find_revealed(case_id, chat_history)
+        sections = {section: "" for section in STRUCTURED_SECTIONS}
+        
+        identification = revealed.identification
+        if identification.age is not None:
+            parts = [f"{identification.age}-year-old" + (f" {identification.sex.lower()}" if identification.sex else "")]
+            if identification.chief_complaint:
+                parts.append(identification.chief_complaint)
+            sections["ID"] = ", ".join(parts)
+        
+        if revealed.vitals:
+            sections["Vitals"] = "\n".join(
+                f"* **{vital.name}:** {self._format_vital(vital)}" for vital in revealed.vitals
+            )
+        
+        if revealed.labs:
+            abnormal = [lab for lab in revealed.labs if lab.flag]
+            normal = list(dict.fromkeys(lab.name for lab in revealed.labs if not lab.flag))
+            lines = []
+            for lab in abnormal:
+                value = lab.value + (f" {lab.unit}" if lab.unit else "")
+                reference = f", ref {lab.reference_range}" if lab.reference_range else ""
+                lines.append(f"* **{lab.name}:** {value} ({lab.flag}{reference})")
+            if normal:
+                lines.append(f"* Within normal limits: {', '.join(normal)}")
+            sections["Labs"] = "\n".join(lines)
+        
+        for section in ("Imaging", "Other"):
+            studies = [study for study in revealed.imaging if study.section == section]
+            if studies:
+                sections[section] = "\n".join(
+                    f"* **{study.modality}:** {self._first_sentence(study.finding)}" for study in studies
+                )
+        
+        return sections
+    
+    def _format_vital(self, vital: VitalSign) -> str:
+        """
+        Format a vital sign value with its units.
+        
+        Args:
+            vital (VitalSign): Vital sign
+        
+        Returns:
+            str: Display text, e.g. "37.0°C (98.6°F)"
+        """
+        if vital.unit == "%":
+            text = f"{vital.value}%"
+        elif vital.unit and vital.unit.startswith("°"):
+            text = f"{vital.value}{vital.unit}"
+        else:
+            text = f"{vital.value} {vital.unit}" if vital.unit else vital.value
+        
+        if vital.alternate:
+            text += f" ({vital.alternate.replace(' ', '')})"
+        return text
+    
+    def _first_sentence(self, text: str) -> str:
+        """
+        Shorten a study finding to its first sentence.
+        
+        Args:
+            text (str): Finding text
+        
+        Returns:
+            str: First sentence of the finding
+        """
+        match = re.match(r"(.+?\.)(?:\s|$)", text)
+        return match.group(1) if match else text
+
+
+def split_summary_sections(summary: str) -> Dict[str, str]:
+    """
+    Split a Markdown summary into its "**Section:**" bodies.
+    
+    Args:
+        summary (str): Summary text
+    
+    Returns:
+        Dict[str, str]: Section body by section name (only sections present)
+    """
+    names = "|".join(re.escape(section) for section in SUMMARY_SECTIONS)
+    pattern = re.compile(rf"^[\s*\-]*\*\*({names}):?\*\*:?[ \t]*", re.MULTILINE | re.IGNORECASE)
+    canonical = {section.lower(): section for section in SUMMARY_SECTIONS}
+    
+    matches = list(pattern.finditer(summary))
+    sections = {}
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(summary)
+        sections[canonical[match.group(1).lower()]] = summary[match.end():end].strip()
+    return sections
+
+
+def compose_summary(structured_sections: Dict[str, str], narrative: str) -> str:
+    """
+    Merge locally rendered sections with the LLM-generated free-text sections.
+    
+    Args:
+        structured_sections (Dict[str, str]): Sections rendered by CaseDataService
+        narrative (str): LLM summary containing the remaining sections
+    
+    Returns:
+        str: Summary with sections in SUMMARY_SYSTEM_PROMPT order
+    """
+    narrative_sections = split_summary_sections(narrative) if narrative else {}
+    
+    blocks = []
+    for section in SUMMARY_SECTIONS:
+        body = structured_sections.get(section) if section in STRUCTURED_SECTIONS else narrative_sections.get(section)
+        if not body:
+            continue
+        separator = "\n" if body.lstrip().startswith(("*", "-")) else " "
+        blocks.append(f"**{section}:**{separator}{body}")
+    
+    # Keep LLM output that did not follow the section format rather than dropping it
+    if narrative and not narrative_sections:
+        blocks.append(narrative.strip())
+    
+    return "\n\n".join(blocks)
@@ -5,19 +5,33 @@ Google Drive service for Emergency Medicine Case Simulator
 import os
 import io
 import json
+import asyncio
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from functools import partial
+from typing import Any, Callable, List, Dict, Optional
+import httplib2
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload
+from config.llm_config import DRIVE_HTTP_TIMEOUT_SECONDS
 
 
 class GoogleDriveService:
     """Service for handling Google Drive operations"""
     
-    def __init__(self):
-        """Initialize Google Drive service"""
+    def __init__(self, http: Optional[httplib2.Http] = None):
+        """
+        Initialize Google Drive service.
+        
+        Args:
+            http (Optional[httplib2.Http]): Shared HTTP connection, a new one if None
+        """
+        self.http = http or httplib2.Http(timeout=DRIVE_HTTP_TIMEOUT_SECONDS)
+        # httplib2 is not thread-safe, so every call on the shared connection runs on one thread
+        self._executor: Optional[ThreadPoolExecutor] = None
         self.service = None
         self.folder_id = os.getenv("GOOGLE_DRIVE_FOLDER_ID", "1mLOznW0Jtcdb_2AJKKu3y94L913Y26ji")
         self._initialize_service()
@@ -44,13 +58,50 @@ class GoogleDriveService:
                 scopes=['https://www.googleapis.com/auth/drive.file']
             )
             
-            # Build service
-            self.service = build('drive', 'v3', credentials=creds)
+            # Build service on the shared connection
+            self.service = build('drive', 'v3', http=AuthorizedHttp(creds, http=self.http))
             
         except Exception as e:
             print(f"Warning: Could not initialize Google Drive service: {e}")
             self.service = None
     
+    def warm_up(self):
+        """
+        Fetch an access token and open the Drive connection ahead of the first upload.
+        """
+        if not self.is_available():
+            return
+        
+        try:
+            self.service.files().list(
+                q=f"'{self.folder_id}' in parents",
+                pageSize=1,
+                fields='files(id)'
+            ).execute()
+        except Exception as e:
+            print(f"Warning: Google Drive warm-up failed: {e}")
+    
+    async def run(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking Drive method on the Drive thread without blocking the event loop.
+        
+        Args:
+            method (Callable[..., Any]): Method of this service, e.g. upload_chat_log_sync
+            *args: Arguments of the method
+        
+        Returns:
+            Any: Result of the method
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="google-drive")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args))
+    
+    def close(self):
+        """Wait for Drive calls in progress and stop the Drive thread"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
     def is_available(self) -> bool:
         """
         Check if Google Drive service is available.
@@ -0,0 +1,146 @@
+"""
+Chat history service for Emergency Medicine Case Simulator
+"""
+
+import asyncio
+from typing import Dict, Sequence, Tuple
+from models.transcript import Transcript
+from services.openai_service import OpenAIService
+from services.session_service import SessionService
+from services.token_counter import count_message_tokens
+from services.model_router import CHAT_TASK
+from config.llm_config import CHAT_HISTORY_WINDOW_ENABLED
+
+DIGEST_HEADER = "Case so far (earlier conversation, condensed):"
+
+
+class HistoryService:
+    """Service for keeping chat context within each model's token budget"""
+    
+    def __init__(self, openai_service: OpenAIService, session_service: SessionService):
+        """
+        Initialize history service.
+        
+        Args:
+            openai_service (OpenAIService): Service used to generate history digests
+            session_service (SessionService): Service holding transcripts and digests
+        """
+        self.openai_service = openai_service
+        self.session_service = session_service
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._dirty: set = set()
+    
+    def get_window(self, user_id: str, case_id: str) -> Sequence[Dict[str, str]]:
+        """
+        Get the chat history to send with the next chat turn.
+        
+        Within the model's history budget the full history is returned. Beyond it,
+        turns before the most recent ones are replaced by the case digest. The digest
+        is refreshed in the background only while the digest and the turns after it
+        are still over budget. Within the budget the transcript's API messages are
+        returned without copying them.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            Sequence[Dict[str, str]]: Conversation messages
+        """
+        transcript = self.session_service.get_transcript(user_id, case_id)
+        messages = transcript.view()
+        if not CHAT_HISTORY_WINDOW_ENABLED:
+            return messages
+        
+        model = self.openai_service.get_model(CHAT_TASK)
+        settings = self.openai_service.get_model_settings(model)
+        if count_message_tokens(messages, model) <= settings["history_token_budget"]:
+            return messages
+        
+        digest = self.session_service.get_history_digest(user_id, case_id)
+        if digest is not None:
+            digest_message = {"role": "user", "content": f"{DIGEST_HEADER}\n\n{digest.summary}"}
+            messages = [digest_message, *messages[digest.message_count:]]
+        else:
+            messages = list(messages)
+        
+        # Budget the window that is actually sent, so a case the digest has brought back
+        # within budget does not pay for another digest call on every turn
+        if count_message_tokens(messages, model) > settings["history_token_budget"]:
+            self._schedule_digest(user_id, case_id)
+        
+        # Until a digest catches up, drop the oldest turns rather than exceed the context window
+        max_tokens = settings["context_window"] // 2
+        keep = len(transcript) - self._recent_start(transcript, settings["recent_turns"])
+        first = 1 if digest is not None else 0
+        while len(messages) - first > keep and count_message_tokens(messages, model) > max_tokens:
+            del messages[first]
+        
+        return messages
+    
+    def _recent_start(self, transcript: Transcript, recent_turns: int) -> int:
+        """
+        Find where the most recent turns that are always sent verbatim begin.
+        
+        Args:
+            transcript (Transcript): Case transcript
+            recent_turns (int): Number of trainee turns to keep
+        
+        Returns:
+            int: Index of the first verbatim message
+        """
+        turns = 0
+        roles = transcript.roles
+        for index in range(len(roles) - 1, -1, -1):
+            if roles[index] == "user":
+                turns += 1
+                if turns == recent_turns:
+                    return index
+        return 0
+    
+    def _schedule_digest(self, user_id: str, case_id: str):
+        """
+        Schedule a background refresh of the case digest.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        """
+        key = (user_id, case_id)
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            self._dirty.add(key)
+        else:
+            self._tasks[key] = asyncio.create_task(self._run_digest(key))
+    
+    async def _run_digest(self, key: Tuple[str, str]):
+        """
+        Fold turns older than the recent window into the digest until it is current.
+        
+        Args:
+            key (Tuple[str, str]): (user_id, case_id)
+        """
+        user_id, case_id = key
+        try:
+            while True:
+                self._dirty.discard(key)
+                transcript = self.session_service.get_transcript(user_id, case_id)
+                settings = self.openai_service.get_model_settings(self.openai_service.get_model(CHAT_TASK))
+                target = self._recent_start(transcript, settings["recent_turns"])
+                
+                digest = self.session_service.get_history_digest(user_id, case_id)
+                covered = digest.message_count if digest is not None else 0
+                if target > covered:
+                    summary = await self.openai_service.generate_history_digest_async(
+                        transcript.view(covered, target),
+                        digest.summary if digest is not None else None
+                    )
+                    self.session_service.set_history_digest(user_id, case_id, summary, target)
+                
+                if key not in self._dirty:
+                    break
+        except Exception as e:
+            print(f"Error updating history digest for {user_id}/{case_id}: {e}")
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
@@ -0,0 +1,77 @@
+"""
+Shared HTTP clients for Emergency Medicine Case Simulator
+"""
+
+import importlib.util
+from typing import Optional
+import httpx
+import httplib2
+from openai import DefaultHttpxClient, DefaultAsyncHttpxClient
+from config.llm_config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP2_ENABLED,
+    DRIVE_HTTP_TIMEOUT_SECONDS
+)
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP2_SUPPORTED = HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def _limits() -> httpx.Limits:
+    """
+    Get the connection pool limits for upstream APIs.
+    
+    Returns:
+        httpx.Limits: Pool size and keep-alive settings
+    """
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+    )
+
+
+def create_openai_http_client(transport: Optional[httpx.BaseTransport] = None) -> httpx.Client:
+    """
+    Create a pooled HTTP client for the sync OpenAI client.
+    
+    Args:
+        transport (Optional[httpx.BaseTransport]): Transport to use instead of the network
+    
+    Returns:
+        httpx.Client: HTTP client
+    """
+    return DefaultHttpxClient(limits=_limits(), http2=HTTP2_SUPPORTED, transport=transport)
+
+
+def create_async_openai_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Create a pooled HTTP client for the async OpenAI client.
+    
+    Args:
+        transport (Optional[httpx.AsyncBaseTransport]): Transport to use instead of the network
+    
+    Returns:
+        httpx.AsyncClient: HTTP client
+    """
+    return DefaultAsyncHttpxClient(limits=_limits(), http2=HTTP2_SUPPORTED, transport=transport)
+
+
+class HTTPClients:
+    """Connection pools to OpenAI and Google Drive shared for the app's lifetime"""
+    
+    def __init__(self):
+        """Create the pooled clients"""
+        self.openai = create_openai_http_client()
+        self.openai_async = create_async_openai_http_client()
+        # httplib2 keeps one persistent connection per host; it is not thread-safe,
+        # so GoogleDriveService makes every Drive call on its own single thread
+        self.google = httplib2.Http(timeout=DRIVE_HTTP_TIMEOUT_SECONDS)
+    
+    async def close(self):
+        """Close every pooled connection"""
+        self.openai.close()
+        await self.openai_async.aclose()
+        self.google.close()
@@ -0,0 +1,167 @@
+"""
+Model routing for Emergency Medicine Case Simulator
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from config.llm_config import (
+    MODEL_TIERS,
+    MODEL_FALLBACK_ERROR_RATE,
+    MODEL_HEALTH_WINDOW,
+    MODEL_HEALTH_MIN_SAMPLES,
+    MODEL_FALLBACK_COOLDOWN_SECONDS
+)
+
+# Tasks with their own model tier
+PRESENTATION_TASK = "presentation"
+CHAT_TASK = "chat"
+LIVE_SUMMARY_TASK = "live_summary"
+FINAL_SUMMARY_TASK = "final_summary"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Get a percentile of a list of values.
+    
+    Args:
+        values (List[float]): Values, not necessarily sorted
+        fraction (float): Percentile as a fraction, e.g. 0.95
+    
+    Returns:
+        float: Value at the percentile (0 if there are no values)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ModelRouter:
+    """Picks the model for each task, falling back when the primary model degrades"""
+    
+    def __init__(self, tiers: Optional[Dict[str, Dict]] = None):
+        """
+        Initialize model router.
+        
+        Args:
+            tiers (Optional[Dict[str, Dict]]): Primary/fallback models and latency limit
+                per task, defaults to MODEL_TIERS
+        """
+        self.tiers = tiers if tiers is not None else MODEL_TIERS
+        self.pinned_model: Optional[str] = None
+        self._samples: Dict[Tuple[str, str], Deque[Tuple[float, bool]]] = {}
+        self._degraded_since: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def select(self, task: str) -> str:
+        """
+        Get the model to use for a task.
+        
+        Args:
+            task (str): Task name, e.g. CHAT_TASK
+        
+        Returns:
+            str: Model name
+        """
+        if self.pinned_model:
+            return self.pinned_model
+        
+        tier = self.tiers[task]
+        primary, fallback = tier["primary"], tier.get("fallback")
+        if not fallback or fallback == primary:
+            return primary
+        
+        with self._lock:
+            degraded_since = self._degraded_since.get(task)
+            if degraded_since is not None and time.monotonic() - degraded_since >= MODEL_FALLBACK_COOLDOWN_SECONDS:
+                # Give the primary model a fresh chance after the cooldown
+                self._samples.pop((task, primary), None)
+                del self._degraded_since[task]
+                degraded_since = None
+            
+            if degraded_since is None and self._is_degraded(task, primary):
+                print(f"Model {primary} degraded for {task}, falling back to {fallback}")
+                self._degraded_since[task] = degraded_since = time.monotonic()
+        
+        return fallback if degraded_since is not None else primary
+    
+    def _is_degraded(self, task: str, model: str) -> bool:
+        """
+        Check whether a model's recent latency or error rate is over the task's limits.
+        
+        Args:
+            task (str): Task name
+            model (str): Model name
+        
+        Returns:
+            bool: True if the fallback model should be used
+        """
+        samples = self._samples.get((task, model))
+        if not samples or len(samples) < MODEL_HEALTH_MIN_SAMPLES:
+            return False
+        
+        errors = sum(1 for _, ok in samples if not ok)
+        if errors / len(samples) > MODEL_FALLBACK_ERROR_RATE:
+            return True
+        
+        latencies = [latency for latency, ok in samples if ok]
+        return percentile(latencies, 0.95) > self.tiers[task]["max_p95_seconds"]
+    
+    def record(self, task: str, model: str, latency: float, ok: bool):
+        """
+        Record the outcome of a request.
+        
+        Args:
+            task (str): Task name
+            model (str): Model that served the request
+            latency (float): Seconds until the response (first chunk when streaming)
+            ok (bool): Whether the request succeeded
+        """
+        with self._lock:
+            samples = self._samples.setdefault((task, model), deque(maxlen=MODEL_HEALTH_WINDOW))
+            samples.append((latency, ok))
+    
+    def get_task_models(self, task: str) -> List[str]:
+        """
+        Get every model that may currently serve a task.
+        
+        Args:
+            task (str): Task name
+        
+        Returns:
+            List[str]: Model names
+        """
+        if self.pinned_model:
+            return [self.pinned_model]
+        tier = self.tiers[task]
+        return [model for model in (tier["primary"], tier.get("fallback")) if model]
+    
+    def pin(self, model_name: Optional[str]):
+        """
+        Use one model for every task, or return to tiered routing.
+        
+        Args:
+            model_name (Optional[str]): Model name, None to use the tiers again
+        """
+        self.pinned_model = model_name
+    
+    def get_status(self) -> Dict[str, Dict]:
+        """
+        Get the routing state of every task.
+        
+        Returns:
+            Dict[str, Dict]: Selected model, p95 latency and error rate of the primary per task
+        """
+        status = {}
+        for task, tier in self.tiers.items():
+            samples = list(self._samples.get((task, tier["primary"]), ()))
+            status[task] = {
+                "model": self.select(task),
+                "primary": tier["primary"],
+                "fallback": tier.get("fallback"),
+                "primary_p95_seconds": round(percentile([latency for latency, ok in samples if ok], 0.95), 3),
+                "primary_error_rate": round(sum(1 for _, ok in samples if not ok) / len(samples), 3) if samples else 0.0
+            }
+        return status
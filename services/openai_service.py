@@ -3,19 +3,493 @@ OpenAI service for Emergency Medicine Case Simulator
 """
 
 import os
-from typing import List, Dict
-from openai import OpenAI
-from config.case_config import SYSTEM_PROMPT, SUMMARY_SYSTEM_PROMPT
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Any, List, Dict, Optional, AsyncIterator, Sequence, Tuple
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    RateLimitError,
+    APITimeoutError,
+    APIConnectionError,
+    InternalServerError
+)
+from config.case_config import (
+    SYSTEM_PROMPT,
+    SUMMARY_SYSTEM_PROMPT,
+    INCREMENTAL_SUMMARY_SYSTEM_PROMPT,
+    HISTORY_DIGEST_SYSTEM_PROMPT
+)
+from config.llm_config import (
+    MODEL_SETTINGS,
+    DEFAULT_MODEL_SETTINGS,
+    SUMMARY_CACHE_ENABLED,
+    SUMMARY_CACHE_MAX_ENTRIES,
+    SUMMARY_CACHE_TTL_SECONDS,
+    SUMMARY_CACHE_DISK_PATH,
+    LLM_MAX_IN_FLIGHT,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_COMPLETION_TOKEN_ESTIMATE,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    CHAT_HEDGING_ENABLED,
+    HEDGE_LATENCY_PERCENTILE,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_BUDGET_PERCENT,
+    HEDGE_LATENCY_WINDOW,
+    HEDGE_MIN_SAMPLES,
+    LLM_BACKEND,
+    HTTP_WARMUP_CONNECTIONS
+)
+from services.prompt_assembler import (
+    PromptAssembler,
+    CASE_PROMPT,
+    LIVE_SUMMARY_PROMPT,
+    INCREMENTAL_SUMMARY_PROMPT,
+    CONVERSATION_SUMMARY_PROMPT,
+    HISTORY_DIGEST_PROMPT
+)
+from services.response_cache import ResponseCache, request_fingerprint
+from services.rate_limiter import RateLimiter
+from services.single_flight import SingleFlight
+from services.request_hedger import RequestHedger
+from services.stub_llm import StubLLM
+from services.usage_tracker import UsageTracker
+from services.http_clients import HTTPClients, create_openai_http_client, create_async_openai_http_client
+from services.token_counter import count_message_tokens
+from services.model_router import (
+    ModelRouter,
+    PRESENTATION_TASK,
+    CHAT_TASK,
+    LIVE_SUMMARY_TASK,
+    FINAL_SUMMARY_TASK
+)
+
+# Prefix of the text returned when a live case summary cannot be generated
+SUMMARY_ERROR_PREFIX = "Could not generate summary at this time."
+# Prefix of the text returned when a conversation summary cannot be generated
+CONVERSATION_SUMMARY_ERROR_PREFIX = "Unable to generate summary:"
+
+PRESENTATION_REQUEST = {"role": "user", "content": "Present the case based on the details provided in your system instructions."}
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx responses
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+DEFAULT_CONVERSATION_SUMMARY_PROMPT = """
+            You are an expert medical educator. Please provide a concise, professional summary 
+            of this medical case simulation conversation focusing on the clinical reasoning, 
+            diagnostic approach, and treatment decisions demonstrated.
+            """
+
 
 class OpenAIService:
     """Service for handling OpenAI API interactions"""
     
-    def __init__(self):
-        """Initialize OpenAI client"""
-        self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY")
+    def __init__(self, http_clients: Optional[HTTPClients] = None):
+        """
+        Initialize OpenAI clients.
+        
+        Args:
+            http_clients (Optional[HTTPClients]): Shared connection pools, new ones if None
+        """
+        api_key = os.getenv("OPENAI_API_KEY")
+        self.stub = None
+        if LLM_BACKEND == "stub":
+            # Answer every request in-process for hermetic tests
+            self.stub = StubLLM()
+            api_key = api_key or "stub"
+            http_client = create_openai_http_client(self.stub.transport())
+            async_http_client = create_async_openai_http_client(self.stub.async_transport())
+        elif http_clients is not None:
+            http_client, async_http_client = http_clients.openai, http_clients.openai_async
+        else:
+            http_client, async_http_client = create_openai_http_client(), create_async_openai_http_client()
+        
+        # Retries are handled by _create/_create_async so they pass through the limiter
+        self.client = OpenAI(api_key=api_key, max_retries=0, http_client=http_client)
+        # Async client used by the FastAPI routes so that a slow completion
+        # does not block the event loop for every other user
+        self.async_client = AsyncOpenAI(api_key=api_key, max_retries=0, http_client=async_http_client)
+        # Shared by every request so a cohort stays within the account's rate limits
+        self.limiter = RateLimiter(LLM_MAX_IN_FLIGHT, LLM_TOKENS_PER_MINUTE)
+        # Concurrent identical requests (double clicks, reloads, cohort starts) share one call
+        self.in_flight = SingleFlight()
+        # Picks a model per task and falls back when the primary one degrades
+        self.router = ModelRouter()
+        # Sends a second copy of chat requests stuck in the latency tail
+        self.hedger = RequestHedger(
+            HEDGE_LATENCY_PERCENTILE, HEDGE_MIN_DELAY_SECONDS, HEDGE_BUDGET_PERCENT,
+            HEDGE_LATENCY_WINDOW, HEDGE_MIN_SAMPLES
+        ) if CHAT_HEDGING_ENABLED else None
+        # Tokens, latency and outcome of every call per trainee and case
+        self.usage = UsageTracker()
+        # Keeps the system prompt and case content byte-identical across requests
+        self.prompts = PromptAssembler()
+        # Identical summary requests (e.g. summary page reloads) are served from here
+        self.summary_cache = ResponseCache(
+            SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_TTL_SECONDS, SUMMARY_CACHE_DISK_PATH
+        ) if SUMMARY_CACHE_ENABLED else None
+    
+    def _estimate_tokens(self, request: Dict[str, Any]) -> int:
+        """
+        Estimate the tokens a completion request will consume.
+        
+        Args:
+            request (Dict[str, Any]): Chat completions request parameters
+        
+        Returns:
+            int: Prompt tokens plus the expected completion length
+        """
+        completion_tokens = request.get("max_tokens") or LLM_COMPLETION_TOKEN_ESTIMATE
+        return count_message_tokens(request["messages"], request["model"]) + completion_tokens
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Compute how long to wait before retrying a failed request.
+        
+        Uses jittered exponential backoff, waiting at least as long as the
+        Retry-After header of the response asks for.
+        
+        Args:
+            error (Exception): Error raised by the request
+            attempt (int): Number of retries already made
+        
+        Returns:
+            float: Seconds to wait
+        """
+        backoff = min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt)
+        delay = random.uniform(backoff / 2, backoff)
+        
+        response = getattr(error, "response", None)
+        headers = response.headers if response is not None else {}
+        retry_after = None
+        try:
+            if headers.get("retry-after-ms"):
+                retry_after = float(headers["retry-after-ms"]) / 1000
+            elif headers.get("retry-after"):
+                value = headers["retry-after"]
+                try:
+                    retry_after = float(value)
+                except ValueError:
+                    retry_after = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            retry_after = None
+        
+        if retry_after is not None and retry_after > 0:
+            delay = max(delay, retry_after + random.uniform(0, LLM_RETRY_BASE_DELAY))
+        return delay
+    
+    def _handle_retryable_error(self, error: Exception, attempt: int) -> float:
+        """
+        Decide whether to retry a failed request.
+        
+        Args:
+            error (Exception): Error raised by the request
+            attempt (int): Number of retries already made
+        
+        Returns:
+            float: Seconds to wait before retrying
+        
+        Raises:
+            Exception: The original error once retries are exhausted
+        """
+        if attempt >= LLM_MAX_RETRIES:
+            raise error
+        
+        delay = self._retry_delay(error, attempt)
+        if isinstance(error, RateLimitError):
+            # Hold back every caller, not only this one, until the limit resets
+            self.limiter.pause(delay)
+        print(f"OpenAI request failed ({type(error).__name__}), retrying in {delay:.1f}s")
+        return delay
+    
+    def _used_tokens(self, response) -> Optional[int]:
+        """
+        Get the tokens a completion actually consumed.
+        
+        Args:
+            response: Chat completion response
+        
+        Returns:
+            Optional[int]: Total tokens or None if not reported
+        """
+        usage = getattr(response, "usage", None)
+        return getattr(usage, "total_tokens", None) if usage is not None else None
+    
+    def _create(self, task: str, prompt_type: str, **request) -> Any:
+        """
+        Call the chat completions API through the shared limiter, retrying transient errors.
+        
+        Every attempt is recorded in the usage tracker.
+        
+        Args:
+            task (str): Task the request serves, for model routing health
+            prompt_type (str): Prompt type the usage is recorded under
+            **request: Chat completions request parameters
+        
+        Returns:
+            Chat completion response
+        """
+        tokens = self._estimate_tokens(request)
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            started = time.monotonic()
+            try:
+                response = self.client.chat.completions.create(**request)
+            except RETRYABLE_ERRORS as e:
+                latency = time.monotonic() - started
+                self.limiter.release(tokens)
+                self.router.record(task, request["model"], latency, False)
+                self.usage.record(task, prompt_type, request["model"], None, None, latency, type(e).__name__)
+                time.sleep(self._handle_retryable_error(e, attempt))
+                attempt += 1
+                continue
+            except Exception as e:
+                self.limiter.release(tokens)
+                self.usage.record(task, prompt_type, request["model"], None, None, time.monotonic() - started, type(e).__name__)
+                raise
+            
+            latency = time.monotonic() - started
+            self.router.record(task, request["model"], latency, True)
+            self.limiter.release(tokens, self._used_tokens(response))
+            self.prompts.record_usage(prompt_type, response.usage)
+            self.usage.record(task, prompt_type, request["model"], response.usage, latency, latency, "ok")
+            return response
+    
+    async def _create_async(self, task: str, prompt_type: str, **request) -> Any:
+        """
+        Async version of _create.
+        
+        For streaming requests the limiter slot stays held and usage is not
+        recorded; the caller must do both once the stream has been consumed.
+        
+        Args:
+            task (str): Task the request serves, for model routing health
+            prompt_type (str): Prompt type the usage is recorded under
+            **request: Chat completions request parameters
+        
+        Returns:
+            Chat completion response or stream
+        """
+        tokens = self._estimate_tokens(request)
+        attempt = 0
+        while True:
+            await self.limiter.acquire_async(tokens)
+            started = time.monotonic()
+            try:
+                response = await self.async_client.chat.completions.create(**request)
+            except RETRYABLE_ERRORS as e:
+                latency = time.monotonic() - started
+                self.limiter.release(tokens)
+                self.router.record(task, request["model"], latency, False)
+                self.usage.record(task, prompt_type, request["model"], None, None, latency, type(e).__name__)
+                await asyncio.sleep(self._handle_retryable_error(e, attempt))
+                attempt += 1
+                continue
+            except (Exception, asyncio.CancelledError) as e:
+                # Also on cancellation, e.g. of the losing copy of a hedged request
+                self.limiter.release(tokens)
+                outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else type(e).__name__
+                self.usage.record(task, prompt_type, request["model"], None, None, time.monotonic() - started, outcome)
+                raise
+            
+            # For streams this is the time until the response headers, close to the first token
+            latency = time.monotonic() - started
+            self.router.record(task, request["model"], latency, True)
+            if not request.get("stream"):
+                self.limiter.release(tokens, self._used_tokens(response))
+                self.prompts.record_usage(prompt_type, response.usage)
+                self.usage.record(task, prompt_type, request["model"], response.usage, latency, latency, "ok")
+            return response
+    
+    async def _complete_async(self, prompt_type: str, task: str, cache: bool = False, coalesce: bool = True,
+                              **request) -> str:
+        """
+        Get a completion, joining an identical request that is already in flight.
+        
+        Args:
+            prompt_type (str): Prompt type the usage is recorded under
+            task (str): Task the request serves, for model routing health
+            cache (bool): Whether to store the result in the summary cache
+            coalesce (bool): Whether to join an identical request in flight; callers
+                that want independent samples of the same prompt pass False
+            **request: Chat completions request parameters
+        
+        Returns:
+            str: Completion text
+        """
+        params = {name: value for name, value in request.items() if name not in ("model", "messages")}
+        key = request_fingerprint(request["model"], request["messages"], **params)
+        
+        async def complete() -> str:
+            response = await self._create_async(task, prompt_type, **request)
+            content = response.choices[0].message.content
+            if cache:
+                self._cache_summary(key, content)
+            return content
+        
+        if not coalesce:
+            return await complete()
+        return await self.in_flight.do(key, complete)
+    
+    @property
+    def model(self) -> str:
+        """Model currently serving chat turns"""
+        return self.router.select(CHAT_TASK)
+    
+    def _build_presentation_messages(self, case_content: str) -> List[Dict[str, str]]:
+        """
+        Build API messages for the initial case presentation.
+        
+        Args:
+            case_content (str): Case details and information
+            
+        Returns:
+            List[Dict[str, str]]: Messages for the chat completions API
+        """
+        return self.prompts.case_messages(case_content, SYSTEM_PROMPT, [PRESENTATION_REQUEST])
+    
+    def _build_chat_messages(self, case_content: str, chat_history: Sequence[Dict[str, str]], user_message: str) -> List[Dict[str, str]]:
+        """
+        Build API messages for a chat turn.
+        
+        Args:
+            case_content (str): Case details and information
+            chat_history (Sequence[Dict[str, str]]): Previous conversation messages
+            user_message (str): Latest user message
+            
+        Returns:
+            List[Dict[str, str]]: Messages for the chat completions API
+        """
+        # Chat history and the current user message follow the cached case prefix
+        messages = self.prompts.case_messages(case_content, SYSTEM_PROMPT, chat_history)
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    def _format_case_transcript(self, chat_history: Sequence[Dict[str, str]]) -> str:
+        """
+        Format conversation messages as a labelled transcript for the live summary.
+        
+        Args:
+            chat_history (Sequence[Dict[str, str]]): Conversation messages
+            
+        Returns:
+            str: Transcript text
+        """
+        formatted_history = []
+        for msg in chat_history:
+            if msg["role"] == "user":
+                role_label = "Student/Resident (User)"
+            elif msg["role"] == "assistant":
+                role_label = "Attending (AI)"
+            else:
+                continue
+            
+            formatted_history.append(f"{role_label}: {msg['content']}")
+        
+        return "\n".join(formatted_history)
+    
+    def _build_case_summary_messages(self, chat_history: Sequence[Dict[str, str]], system_prompt: str = None) -> List[Dict[str, str]]:
+        """
+        Build API messages for the live case summary.
+        
+        Args:
+            chat_history (Sequence[Dict[str, str]]): Conversation messages
+            system_prompt (str, optional): Summary prompt, defaults to SUMMARY_SYSTEM_PROMPT
+        
+        Returns:
+            List[Dict[str, str]]: Messages for the chat completions API
+        """
+        history_text = self._format_case_transcript(chat_history)
+        
+        return self.prompts.summary_messages(
+            LIVE_SUMMARY_PROMPT,
+            system_prompt or SUMMARY_SYSTEM_PROMPT,
+            f"Please summarize the following case interaction transcript:\n\n{history_text}"
+        )
+    
+    def _build_incremental_summary_messages(self, previous_summary: str, new_messages: Sequence[Dict[str, str]], system_prompt: str = None) -> List[Dict[str, str]]:
+        """
+        Build API messages for updating a live case summary with new messages.
+        
+        Args:
+            previous_summary (str): Summary covering the earlier part of the transcript
+            new_messages (Sequence[Dict[str, str]]): Messages added since that summary
+            system_prompt (str, optional): Update prompt, defaults to INCREMENTAL_SUMMARY_SYSTEM_PROMPT
+        
+        Returns:
+            List[Dict[str, str]]: Messages for the chat completions API
+        """
+        new_text = self._format_case_transcript(new_messages)
+        
+        return self.prompts.summary_messages(
+            INCREMENTAL_SUMMARY_PROMPT,
+            system_prompt or INCREMENTAL_SUMMARY_SYSTEM_PROMPT,
+            f"Current summary:\n\n{previous_summary}\n\nNew transcript messages:\n\n{new_text}"
         )
-        self.model = "gpt-4o"  # Default model
+    
+    def _build_conversation_summary_messages(self, messages: Sequence[Dict[str, str]], custom_prompt: str = None) -> List[Dict[str, str]]:
+        """
+        Build API messages for the end-of-case conversation summary.
+        
+        Args:
+            messages (Sequence[Dict[str, str]]): Conversation messages
+            custom_prompt (str, optional): Custom prompt for summary generation
+            
+        Returns:
+            List[Dict[str, str]]: Messages for the chat completions API
+        """
+        # Format conversation for summary
+        formatted_conversation = []
+        for msg in messages:
+            if msg["role"] == "user":
+                role_label = "Medical Student/Resident"
+            elif msg["role"] == "assistant":
+                role_label = "AI Physician"
+            else:
+                continue
+            
+            formatted_conversation.append(f"{role_label}: {msg['content']}")
+        
+        conversation_text = "\n".join(formatted_conversation)
+        
+        # Use custom prompt or default
+        system_prompt = custom_prompt or DEFAULT_CONVERSATION_SUMMARY_PROMPT
+        
+        return self.prompts.summary_messages(
+            CONVERSATION_SUMMARY_PROMPT,
+            system_prompt,
+            f"Please summarize this medical case conversation:\n\n{conversation_text}"
+        )
+    
+    def _get_cached_summary(self, cache_key: str) -> Optional[str]:
+        """
+        Look up a previously generated summary.
+        
+        Args:
+            cache_key (str): Request fingerprint
+        
+        Returns:
+            Optional[str]: Cached summary or None if not cached
+        """
+        if self.summary_cache is None:
+            return None
+        return self.summary_cache.get(cache_key)
+    
+    def _cache_summary(self, cache_key: str, summary: str):
+        """
+        Store a generated summary for identical future requests.
+        
+        Args:
+            cache_key (str): Request fingerprint
+            summary (str): Generated summary
+        """
+        if self.summary_cache is not None and summary:
+            self.summary_cache.set(cache_key, summary)
     
     def get_case_presentation(self, case_content: str) -> str:
         """
@@ -30,16 +504,14 @@ class OpenAIService:
         Raises:
             Exception: If OpenAI API call fails
         """
-        system_message = SYSTEM_PROMPT + "\n\n" + case_content
-        
-        messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": "Present the case based on the details provided in your system instructions."}
-        ]
+        model = self.router.select(PRESENTATION_TASK)
+        messages = self._build_presentation_messages(case_content)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._create(
+                PRESENTATION_TASK,
+                CASE_PROMPT,
+                model=model,
                 messages=messages,
                 temperature=0.7
             )
@@ -47,13 +519,43 @@ class OpenAIService:
         except Exception as e:
             raise Exception(f"Error getting case presentation: {str(e)}")
     
-    def get_chat_response(self, case_content: str, chat_history: List[Dict[str, str]], user_message: str) -> str:
+    async def get_case_presentation_async(self, case_content: str, coalesce: bool = True) -> str:
+        """
+        Async version of get_case_presentation.
+        
+        Args:
+            case_content (str): Case details and information
+            coalesce (bool): Whether to share an identical presentation request in
+                flight, False when several distinct variants are wanted
+            
+        Returns:
+            str: Initial case presentation from AI
+            
+        Raises:
+            Exception: If OpenAI API call fails
+        """
+        model = self.router.select(PRESENTATION_TASK)
+        messages = self._build_presentation_messages(case_content)
+        
+        try:
+            return await self._complete_async(
+                CASE_PROMPT,
+                PRESENTATION_TASK,
+                model=model,
+                coalesce=coalesce,
+                messages=messages,
+                temperature=0.7
+            )
+        except Exception as e:
+            raise Exception(f"Error getting case presentation: {str(e)}")
+    
+    def get_chat_response(self, case_content: str, chat_history: Sequence[Dict[str, str]], user_message: str) -> str:
         """
         Generate chat response based on conversation history.
         
         Args:
             case_content (str): Case details and information
-            chat_history (List[Dict[str, str]]): Previous conversation messages
+            chat_history (Sequence[Dict[str, str]]): Previous conversation messages
             user_message (str): Latest user message
             
         Returns:
@@ -62,25 +564,14 @@ class OpenAIService:
         Raises:
             Exception: If OpenAI API call fails
         """
-        system_message = SYSTEM_PROMPT + "\n\n" + case_content
-        
-        # Build conversation messages
-        messages = [{"role": "system", "content": system_message}]
-        
-        # Add chat history (exclude system messages)
-        for msg in chat_history:
-            if msg["role"] in ["user", "assistant"]:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
+        model = self.router.select(CHAT_TASK)
+        messages = self._build_chat_messages(case_content, chat_history, user_message)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._create(
+                CHAT_TASK,
+                CASE_PROMPT,
+                model=model,
                 messages=messages,
                 temperature=0.7
             )
@@ -88,12 +579,201 @@ class OpenAIService:
         except Exception as e:
             raise Exception(f"Error getting chat response: {str(e)}")
     
-    def generate_case_summary(self, chat_history: List[Dict[str, str]]) -> str:
+    async def get_chat_response_async(self, case_content: str, chat_history: Sequence[Dict[str, str]], user_message: str) -> str:
+        """
+        Async version of get_chat_response.
+        
+        Args:
+            case_content (str): Case details and information
+            chat_history (Sequence[Dict[str, str]]): Previous conversation messages
+            user_message (str): Latest user message
+            
+        Returns:
+            str: AI response to user message
+            
+        Raises:
+            Exception: If OpenAI API call fails
+        """
+        model = self.router.select(CHAT_TASK)
+        request = {
+            "model": model,
+            "messages": self._build_chat_messages(case_content, chat_history, user_message),
+            "temperature": 0.7
+        }
+        
+        try:
+            if self.hedger is not None:
+                response = await self.hedger.run(model, lambda: self._create_async(CHAT_TASK, CASE_PROMPT, **request))
+            else:
+                response = await self._create_async(CHAT_TASK, CASE_PROMPT, **request)
+            return response.choices[0].message.content
+        except Exception as e:
+            raise Exception(f"Error getting chat response: {str(e)}")
+    
+    async def stream_chat_response(self, case_content: str, chat_history: Sequence[Dict[str, str]], user_message: str) -> AsyncIterator[str]:
+        """
+        Stream a chat response token by token as the model generates it.
+        
+        Args:
+            case_content (str): Case details and information
+            chat_history (Sequence[Dict[str, str]]): Previous conversation messages
+            user_message (str): Latest user message
+            
+        Yields:
+            str: Content deltas of the AI response
+            
+        Raises:
+            Exception: If OpenAI API call fails
+        """
+        model = self.router.select(CHAT_TASK)
+        request = {
+            "model": model,
+            "messages": self._build_chat_messages(case_content, chat_history, user_message),
+            "temperature": 0.7,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        
+        tokens = self._estimate_tokens(request)
+        started = time.monotonic()
+        
+        try:
+            if self.hedger is not None:
+                stream, first_chunks = await self.hedger.run(
+                    f"{model}/stream",
+                    lambda: self._open_stream(request, tokens),
+                    lambda opened: self._discard_stream(opened, request, tokens, started)
+                )
+            else:
+                stream, first_chunks = await self._open_stream(request, tokens)
+            # _open_stream returns once the first content chunk has arrived
+            time_to_first_token = time.monotonic() - started
+            
+            usage = None
+            outcome = "cancelled"
+            try:
+                async for chunk in self._iterate_stream(stream, first_chunks):
+                    # Usage is reported on a final chunk without choices
+                    if chunk.usage is not None:
+                        self.prompts.record_usage(CASE_PROMPT, chunk.usage)
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+                outcome = "ok"
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                await self._close_stream(stream, tokens, usage.total_tokens if usage is not None else None)
+                self.usage.record(
+                    CHAT_TASK, CASE_PROMPT, model, usage, time_to_first_token, time.monotonic() - started, outcome
+                )
+        except Exception as e:
+            raise Exception(f"Error getting chat response: {str(e)}")
+    
+    async def _open_stream(self, request: Dict[str, Any], tokens: int) -> Tuple[Any, List[Any]]:
+        """
+        Send a streaming chat request and wait for its first content chunk.
+        
+        Args:
+            request (Dict[str, Any]): Chat completions request parameters
+            tokens (int): Tokens reserved for the request in the limiter
+        
+        Returns:
+            Tuple[Any, List[Any]]: Open stream and the chunks received so far
+        """
+        started = time.monotonic()
+        stream = await self._create_async(CHAT_TASK, CASE_PROMPT, **request)
+        chunks = []
+        try:
+            while True:
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+                chunks.append(chunk)
+                if chunk.usage is not None or (chunk.choices and chunk.choices[0].delta.content):
+                    break
+        except (Exception, asyncio.CancelledError) as e:
+            # The API accepted the request, e.g. the losing copy of a hedged one, so it is billed
+            await self._close_stream(stream, tokens)
+            outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else type(e).__name__
+            self.usage.record(
+                CHAT_TASK, CASE_PROMPT, request["model"], self._stream_usage(chunks), None, time.monotonic() - started, outcome
+            )
+            raise
+        return stream, chunks
+    
+    async def _discard_stream(self, opened: Tuple[Any, List[Any]], request: Dict[str, Any], tokens: int,
+                              started: float):
+        """
+        Close the stream of a hedged request that lost to the other copy, recording its usage.
+        
+        Args:
+            opened (Tuple[Any, List[Any]]): Stream and first chunks returned by _open_stream
+            request (Dict[str, Any]): Chat completions request parameters
+            tokens (int): Tokens reserved for the request in the limiter
+            started (float): Monotonic time the hedged request started
+        """
+        stream, chunks = opened
+        usage = self._stream_usage(chunks)
+        await self._close_stream(stream, tokens, usage.total_tokens if usage is not None else None)
+        # Its first token has arrived, so the time to first token is the latency
+        latency = time.monotonic() - started
+        self.usage.record(CHAT_TASK, CASE_PROMPT, request["model"], usage, latency, latency, "cancelled")
+    
+    def _stream_usage(self, chunks: List[Any]) -> Any:
+        """
+        Get the usage reported by the chunks read from a stream.
+        
+        Args:
+            chunks (List[Any]): Chat completion chunks
+        
+        Returns:
+            Usage of the final chunk, None if it was not received
+        """
+        return next((chunk.usage for chunk in chunks if chunk.usage is not None), None)
+    
+    async def _iterate_stream(self, stream, first_chunks: List[Any]) -> AsyncIterator[Any]:
+        """
+        Iterate over the chunks already read from a stream, then the rest of it.
+        
+        Args:
+            stream: Open chat completion stream
+            first_chunks (List[Any]): Chunks read by _open_stream
+        
+        Yields:
+            Chat completion chunks
+        """
+        for chunk in first_chunks:
+            yield chunk
+        async for chunk in stream:
+            yield chunk
+    
+    async def _close_stream(self, stream, tokens: int, used_tokens: Optional[int] = None):
+        """
+        Close a chat completion stream and free its limiter slot.
+        
+        Args:
+            stream: Chat completion stream
+            tokens (int): Tokens reserved for the request in the limiter
+            used_tokens (Optional[int]): Tokens reported by the API, None to keep the estimate
+        """
+        self.limiter.release(tokens, used_tokens)
+        try:
+            await stream.close()
+        except Exception as e:
+            print(f"Warning: Could not close chat stream: {e}")
+    
+    def generate_case_summary(self, chat_history: Sequence[Dict[str, str]]) -> str:
         """
         Generate case summary from chat history.
         
         Args:
-            chat_history (List[Dict[str, str]]): Conversation messages
+            chat_history (Sequence[Dict[str, str]]): Conversation messages
             
         Returns:
             str: Generated case summary
@@ -104,41 +784,150 @@ class OpenAIService:
         if not chat_history:
             return "No case information available to summarize yet."
         
-        # Format chat history for summary
-        formatted_history = []
-        for msg in chat_history:
-            if msg["role"] == "user":
-                role_label = "Student/Resident (User)"
-            elif msg["role"] == "assistant":
-                role_label = "Attending (AI)"
-            else:
-                continue
-            
-            formatted_history.append(f"{role_label}: {msg['content']}")
+        model = self.router.select(LIVE_SUMMARY_TASK)
+        messages = self._build_case_summary_messages(chat_history)
+        cache_key = request_fingerprint(model, messages, temperature=0.3)
+        cached = self._get_cached_summary(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = self._create(
+                LIVE_SUMMARY_TASK,
+                LIVE_SUMMARY_PROMPT,
+                model=model,
+                messages=messages,
+                temperature=0.3
+            )
+            summary = response.choices[0].message.content
+            self._cache_summary(cache_key, summary)
+            return summary
+        except Exception as e:
+            return f"{SUMMARY_ERROR_PREFIX} Error: {str(e)[:100]}..."
+    
+    async def generate_case_summary_async(self, chat_history: Sequence[Dict[str, str]], system_prompt: str = None) -> str:
+        """
+        Async version of generate_case_summary.
+        
+        Args:
+            chat_history (Sequence[Dict[str, str]]): Conversation messages
+            system_prompt (str, optional): Summary prompt, defaults to SUMMARY_SYSTEM_PROMPT
+        
+        Returns:
+            str: Generated case summary
+        """
+        if not chat_history:
+            return "No case information available to summarize yet."
+        
+        model = self.router.select(LIVE_SUMMARY_TASK)
+        messages = self._build_case_summary_messages(chat_history, system_prompt)
+        cached = self._get_cached_summary(request_fingerprint(model, messages, temperature=0.3))
+        if cached is not None:
+            return cached
+        
+        try:
+            return await self._complete_async(
+                LIVE_SUMMARY_PROMPT,
+                LIVE_SUMMARY_TASK,
+                cache=True,
+                model=model,
+                messages=messages,
+                temperature=0.3
+            )
+        except Exception as e:
+            return f"{SUMMARY_ERROR_PREFIX} Error: {str(e)[:100]}..."
+    
+    async def update_case_summary_async(self, previous_summary: str, new_messages: Sequence[Dict[str, str]], system_prompt: str = None) -> str:
+        """
+        Update an existing case summary with only the messages added since it was generated.
         
-        history_text = "\n".join(formatted_history)
+        Args:
+            previous_summary (str): Summary covering the earlier part of the transcript
+            new_messages (Sequence[Dict[str, str]]): Messages added since that summary
+            system_prompt (str, optional): Update prompt, defaults to INCREMENTAL_SUMMARY_SYSTEM_PROMPT
+
+        Returns:
+            str: Updated case summary
+            
+        Raises:
+            Exception: If OpenAI API call fails
+        """
+        if not new_messages:
+            return previous_summary
         
-        messages = [
-            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
-            {"role": "user", "content": f"Please summarize the following case interaction transcript:\n\n{history_text}"}
-        ]
+        model = self.router.select(LIVE_SUMMARY_TASK)
+        messages = self._build_incremental_summary_messages(previous_summary, new_messages, system_prompt)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            return await self._complete_async(
+                INCREMENTAL_SUMMARY_PROMPT,
+                LIVE_SUMMARY_TASK,
+                model=model,
                 messages=messages,
                 temperature=0.3
             )
+        except Exception as e:
+            raise Exception(f"Error updating case summary: {str(e)}")
+    
+    async def generate_history_digest_async(self, messages: Sequence[Dict[str, str]], previous_digest: str = None) -> str:
+        """
+        Condense earlier chat turns into a digest that can replace them in the chat context.
+        
+        Args:
+            messages (Sequence[Dict[str, str]]): Messages to condense
+            previous_digest (str, optional): Digest of the messages before these
+        
+        Returns:
+            str: Digest covering the previous digest and the messages
+        
+        Raises:
+            Exception: If OpenAI API call fails
+        """
+        model = self.router.select(LIVE_SUMMARY_TASK)
+        transcript = self._format_case_transcript(messages)
+        if previous_digest:
+            user_content = f"Existing digest:\n\n{previous_digest}\n\nNew transcript messages:\n\n{transcript}"
+        else:
+            user_content = f"Transcript:\n\n{transcript}"
+        
+        messages_for_api = self.prompts.summary_messages(HISTORY_DIGEST_PROMPT, HISTORY_DIGEST_SYSTEM_PROMPT, user_content)
+        
+        try:
+            response = await self._create_async(
+                LIVE_SUMMARY_TASK,
+                HISTORY_DIGEST_PROMPT,
+                model=model,
+                messages=messages_for_api,
+                temperature=0.3
+            )
             return response.choices[0].message.content
         except Exception as e:
-            return f"Could not generate summary at this time. Error: {str(e)[:100]}..."
+            raise Exception(f"Error generating history digest: {str(e)}")
     
-    def generate_conversation_summary(self, messages: List[Dict[str, str]], custom_prompt: str = None) -> str:
+    def build_conversation_summary_request(self, messages: Sequence[Dict[str, str]], custom_prompt: str = None) -> Dict[str, Any]:
+        """
+        Build the chat completions request for a conversation summary.
+        
+        Args:
+            messages (Sequence[Dict[str, str]]): Conversation messages
+            custom_prompt (str, optional): Custom prompt for summary generation
+            
+        Returns:
+            Dict[str, Any]: Chat completions request parameters
+        """
+        return {
+            "model": self.router.select(FINAL_SUMMARY_TASK),
+            "messages": self._build_conversation_summary_messages(messages, custom_prompt),
+            "temperature": 0.3,
+            "max_tokens": 200  # Keep summaries concise
+        }
+    
+    def generate_conversation_summary(self, messages: Sequence[Dict[str, str]], custom_prompt: str = None) -> str:
         """
         Generate a conversational summary using a custom prompt.
         
         Args:
-            messages (List[Dict[str, str]]): Conversation messages
+            messages (Sequence[Dict[str, str]]): Conversation messages
             custom_prompt (str, optional): Custom prompt for summary generation
             
         Returns:
@@ -150,64 +939,158 @@ class OpenAIService:
         if not messages:
             return "No conversation to summarize."
         
-        # Format conversation for summary
-        formatted_conversation = []
-        for msg in messages:
-            if msg["role"] == "user":
-                role_label = "Medical Student/Resident"
-            elif msg["role"] == "assistant":
-                role_label = "AI Physician"
-            else:
-                continue
-            
-            formatted_conversation.append(f"{role_label}: {msg['content']}")
+        request = self.build_conversation_summary_request(messages, custom_prompt)
+        cache_key = request_fingerprint(request["model"], request["messages"], temperature=0.3, max_tokens=200)
+        cached = self._get_cached_summary(cache_key)
+        if cached is not None:
+            return cached
         
-        conversation_text = "\n".join(formatted_conversation)
+        try:
+            response = self._create(FINAL_SUMMARY_TASK, CONVERSATION_SUMMARY_PROMPT, **request)
+            summary = response.choices[0].message.content.strip()
+            self._cache_summary(cache_key, summary)
+            return summary
+        except Exception as e:
+            return f"{CONVERSATION_SUMMARY_ERROR_PREFIX} {str(e)[:50]}..."
+    
+    async def generate_conversation_summary_async(self, messages: Sequence[Dict[str, str]], custom_prompt: str = None) -> str:
+        """
+        Async version of generate_conversation_summary.
         
-        # Use custom prompt or default
-        if custom_prompt:
-            system_prompt = custom_prompt
-        else:
-            system_prompt = """
-            You are an expert medical educator. Please provide a concise, professional summary 
-            of this medical case simulation conversation focusing on the clinical reasoning, 
-            diagnostic approach, and treatment decisions demonstrated.
-            """
+        Args:
+            messages (Sequence[Dict[str, str]]): Conversation messages
+            custom_prompt (str, optional): Custom prompt for summary generation
+            
+        Returns:
+            str: Generated conversation summary
+        """
+        if not messages:
+            return "No conversation to summarize."
         
-        messages_for_api = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Please summarize this medical case conversation:\n\n{conversation_text}"}
-        ]
+        request = self.build_conversation_summary_request(messages, custom_prompt)
+        cached = self._get_cached_summary(
+            request_fingerprint(request["model"], request["messages"], temperature=0.3, max_tokens=200)
+        )
+        if cached is not None:
+            return cached.strip()
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages_for_api,
-                temperature=0.3,
-                max_tokens=200  # Keep summaries concise
+            summary = await self._complete_async(
+                CONVERSATION_SUMMARY_PROMPT,
+                FINAL_SUMMARY_TASK,
+                cache=True,
+                **request
             )
-            return response.choices[0].message.content.strip()
+            return summary.strip()
         except Exception as e:
-            return f"Unable to generate summary: {str(e)[:50]}..."
+            return f"{CONVERSATION_SUMMARY_ERROR_PREFIX} {str(e)[:50]}..."
+    
+    async def warm_up(self, connections: int = HTTP_WARMUP_CONNECTIONS):
+        """
+        Open connections to the API so the first trainee request skips DNS and TLS setup.
+        
+        Args:
+            connections (int): Concurrent requests, and so pooled connections, to open
+        """
+        if self.stub is not None:
+            return
+        
+        # Listing models costs no tokens
+        results = await asyncio.gather(
+            *(self.async_client.models.list() for _ in range(connections)),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            print(f"Warning: OpenAI warm-up failed: {errors[0]}")
+    
+    def set_model(self, model_name: Optional[str]):
+        """
+        Set the OpenAI model to use for every task.
+        
+        Args:
+            model_name (Optional[str]): Model name (e.g., 'gpt-4o', 'gpt-3.5-turbo'),
+                None to return to the per-task tiers in MODEL_TIERS
+        """
+        self.router.pin(model_name)
     
-    def set_model(self, model_name: str):
+    def get_model(self, task: str) -> str:
         """
-        Set the OpenAI model to use.
+        Get the model currently serving a task.
         
         Args:
-            model_name (str): Model name (e.g., 'gpt-4o', 'gpt-3.5-turbo')
+            task (str): Task name, e.g. CHAT_TASK
+        
+        Returns:
+            str: Model name
         """
-        self.model = model_name
+        return self.router.select(task)
+    
+    def get_task_models(self, task: str) -> List[str]:
+        """
+        Get every model that may currently serve a task.
+        
+        Args:
+            task (str): Task name, e.g. PRESENTATION_TASK
+        
+        Returns:
+            List[str]: Model names
+        """
+        return self.router.get_task_models(task)
+    
+    def get_routing_status(self) -> Dict[str, Dict]:
+        """
+        Get the model selected for each task and the health of its primary model.
+        
+        Returns:
+            Dict[str, Dict]: Routing state per task
+        """
+        return self.router.get_status()
+    
+    def get_hedging_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get chat request hedging counters.
+        
+        Returns:
+            Optional[Dict[str, Any]]: Requests, hedges sent and won, None if hedging is disabled
+        """
+        return self.hedger.get_stats() if self.hedger is not None else None
+    
+    def get_queue_depth(self) -> int:
+        """
+        Get the number of OpenAI requests waiting for the rate limiter.
+        
+        Returns:
+            int: Waiting requests
+        """
+        return self.limiter.get_queue_depth()
+    
+    def get_prompt_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get provider prompt cache usage per prompt type.
+        
+        Returns:
+            Dict[str, Dict[str, float]]: Calls, prompt tokens, cached tokens and hit rate
+        """
+        return self.prompts.get_cache_stats()
     
     def get_available_models(self) -> List[str]:
         """
         Get list of available OpenAI models.
         
         Returns:
-            List[str]: Available model names
+            List[str]: Available model names, configured in MODEL_SETTINGS
+        """
+        return list(MODEL_SETTINGS.keys())
+    
+    def get_model_settings(self, model_name: str = None) -> Dict[str, int]:
+        """
+        Get context limits for a model.
+        
+        Args:
+            model_name (str, optional): Model name, defaults to the current model
+        
+        Returns:
+            Dict[str, int]: context_window, history_token_budget and recent_turns
         """
-        return [
-            "gpt-4o",
-            "gpt-4-turbo", 
-            "gpt-3.5-turbo"
-        ]
+        return MODEL_SETTINGS.get(model_name or self.model, DEFAULT_MODEL_SETTINGS)
@@ -0,0 +1,213 @@
+"""
+Presentation pool service for Emergency Medicine Case Simulator
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+from models.schemas import PooledPresentation
+from services.openai_service import OpenAIService
+from services.summary_service import SummaryService
+from services.model_router import PRESENTATION_TASK
+from services.usage_tracker import attribute_usage
+from config.case_config import AVAILABLE_CASES
+from config.llm_config import (
+    PRESENTATION_POOL_ENABLED,
+    PRESENTATION_POOL_SIZE,
+    PRESENTATION_POOL_MAX_USES,
+    PRESENTATION_POOL_WAIT_TIMEOUT,
+    PRESENTATION_POOL_RETRY_DELAY
+)
+
+
+class PresentationPoolService:
+    """Service for serving pre-generated opening case presentations"""
+    
+    def __init__(self, openai_service: OpenAIService, summary_service: SummaryService,
+                 cases: Optional[Dict[str, Dict]] = None):
+        """
+        Initialize presentation pool service.
+        
+        Args:
+            openai_service (OpenAIService): Service used to generate presentations
+            summary_service (SummaryService): Service used to summarize presentations
+            cases (Optional[Dict[str, Dict]]): Cases to pool, defaults to AVAILABLE_CASES
+        """
+        self.openai_service = openai_service
+        self.summary_service = summary_service
+        self.cases = cases if cases is not None else AVAILABLE_CASES
+        self._pools: Dict[str, List[PooledPresentation]] = {case_id: [] for case_id in self.cases}
+        self._next_variant: Dict[str, int] = {case_id: 0 for case_id in self.cases}
+        self._fill_tasks: Dict[str, asyncio.Task] = {}
+        self._available: Dict[str, asyncio.Event] = {}
+    
+    def start(self):
+        """Start filling the pool of every case in the background."""
+        if not PRESENTATION_POOL_ENABLED:
+            return
+        
+        for case_id in self.cases:
+            self._schedule_fill(case_id)
+    
+    async def stop(self):
+        """Cancel any pool fills still running."""
+        tasks = list(self._fill_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._fill_tasks.clear()
+    
+    async def acquire(self, case_id: str) -> Optional[PooledPresentation]:
+        """
+        Get a pooled presentation for a trainee starting a case.
+        
+        Variants are handed out in rotation. If the pool is still being filled,
+        the caller waits for the fill instead of generating its own presentation.
+        
+        Args:
+            case_id (str): Case ID
+        
+        Returns:
+            Optional[PooledPresentation]: Pooled variant, None if the caller should generate one
+        """
+        if not PRESENTATION_POOL_ENABLED or case_id not in self.cases:
+            return None
+        
+        variant = self._take(case_id)
+        if variant is not None:
+            return variant
+        
+        task = self._fill_tasks.get(case_id)
+        if task is None or task.done():
+            return None
+        
+        event = self._available.setdefault(case_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=PRESENTATION_POOL_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        return self._take(case_id)
+    
+    def get_pool_sizes(self) -> Dict[str, int]:
+        """
+        Get the number of variants currently pooled per case.
+        
+        Returns:
+            Dict[str, int]: Variant count by case ID
+        """
+        return {case_id: len(pool) for case_id, pool in self._pools.items()}
+    
+    def _take(self, case_id: str) -> Optional[PooledPresentation]:
+        """
+        Take the next variant from a case pool, retiring it once fully used.
+        
+        Args:
+            case_id (str): Case ID
+        
+        Returns:
+            Optional[PooledPresentation]: Pooled variant, None if the pool is empty
+        """
+        pool = self._pools[case_id]
+        
+        # Variants generated before a model switch no longer match the configured models
+        models = self.openai_service.get_task_models(PRESENTATION_TASK)
+        current = [variant for variant in pool if variant.model in models]
+        if len(current) != len(pool):
+            pool[:] = current
+        
+        if len(pool) < PRESENTATION_POOL_SIZE:
+            self._schedule_fill(case_id)
+        if not pool:
+            return None
+        
+        index = self._next_variant[case_id] % len(pool)
+        self._next_variant[case_id] = index + 1
+        variant = pool[index]
+        variant.uses += 1
+        
+        if variant.uses >= PRESENTATION_POOL_MAX_USES:
+            pool.remove(variant)
+            self._schedule_fill(case_id)
+        return variant
+    
+    def _schedule_fill(self, case_id: str):
+        """
+        Start refilling a case pool unless a fill is already running.
+        
+        Args:
+            case_id (str): Case ID
+        """
+        task = self._fill_tasks.get(case_id)
+        if task is None or task.done():
+            self._fill_tasks[case_id] = asyncio.create_task(self._fill(case_id))
+    
+    async def _fill(self, case_id: str):
+        """
+        Generate variants until the case pool is full.
+        
+        Args:
+            case_id (str): Case ID
+        """
+        # Pooled variants are shared, not generated for the trainee who triggered the refill
+        attribute_usage(None, case_id)
+        pool = self._pools[case_id]
+        try:
+            while len(pool) < PRESENTATION_POOL_SIZE:
+                missing = PRESENTATION_POOL_SIZE - len(pool)
+                results = await asyncio.gather(
+                    *(self._generate_variant(case_id) for _ in range(missing)),
+                    return_exceptions=True
+                )
+                
+                variants = [result for result in results if isinstance(result, PooledPresentation)]
+                pool.extend(variants[:PRESENTATION_POOL_SIZE - len(pool)])
+                if variants:
+                    self._notify(case_id)
+                    continue
+                
+                print(f"Error filling presentation pool for {case_id}: {results[0]}")
+                # Let waiting case starts fall back to generating their own presentation
+                self._notify(case_id)
+                await asyncio.sleep(PRESENTATION_POOL_RETRY_DELAY)
+        finally:
+            if self._fill_tasks.get(case_id) is asyncio.current_task():
+                del self._fill_tasks[case_id]
+            self._notify(case_id)
+    
+    async def _generate_variant(self, case_id: str) -> PooledPresentation:
+        """
+        Generate an opening presentation and its live summary.
+        
+        Args:
+            case_id (str): Case ID
+        
+        Returns:
+            PooledPresentation: New variant
+        
+        Raises:
+            Exception: If the presentation or summary could not be generated
+        """
+        model = self.openai_service.get_model(PRESENTATION_TASK)
+        # Variants are generated concurrently from the same prompt; coalescing would make them identical
+        initial_message = await self.openai_service.get_case_presentation_async(
+            self.cases[case_id]["content"], coalesce=False
+        )
+        chat_history = [{"role": "assistant", "content": initial_message}]
+        summary, llm_summary = await self.summary_service.generate_full_summary(case_id, chat_history)
+        
+        return PooledPresentation(
+            initial_message=initial_message,
+            summary=summary,
+            llm_summary=llm_summary,
+            model=model
+        )
+    
+    def _notify(self, case_id: str):
+        """
+        Wake up any case start waiting for a pooled variant.
+        
+        Args:
+            case_id (str): Case ID
+        """
+        event = self._available.pop(case_id, None)
+        if event is not None:
+            event.set()
@@ -0,0 +1,116 @@
+"""
+Prompt assembly for Emergency Medicine Case Simulator
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+# Prompt types. Case presentations and chat turns share the case prefix.
+CASE_PROMPT = "case"
+LIVE_SUMMARY_PROMPT = "live_summary"
+INCREMENTAL_SUMMARY_PROMPT = "incremental_summary"
+CONVERSATION_SUMMARY_PROMPT = "conversation_summary"
+HISTORY_DIGEST_PROMPT = "history_digest"
+
+# Upper bound on memoized prefixes, conversation summary prompts can be caller-supplied
+MAX_CACHED_PREFIXES = 64
+
+
+class PromptAssembler:
+    """Builds API messages behind stable prefixes so provider prompt caching can hit"""
+    
+    def __init__(self):
+        """Initialize prefix memo and cache usage counters"""
+        self._prefixes: Dict[Tuple[str, str, str], Tuple[Dict[str, str], ...]] = {}
+        self._usage: Dict[str, Dict[str, int]] = {}
+    
+    def prefix(self, prompt_type: str, system_prompt: str, context: str = "") -> Tuple[Dict[str, str], ...]:
+        """
+        Get the stable leading messages for a prompt type.
+        
+        The same prompt type, system prompt and context always yield the same
+        message objects, so every request shares a byte-identical prefix.
+        
+        Args:
+            prompt_type (str): Prompt type, e.g. CASE_PROMPT
+            system_prompt (str): System instructions
+            context (str): Per-case context appended to the instructions (e.g. case content)
+        
+        Returns:
+            Tuple[Dict[str, str], ...]: Prefix messages, must not be modified
+        """
+        key = (prompt_type, system_prompt, context)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            content = system_prompt + "\n\n" + context if context else system_prompt
+            prefix = ({"role": "system", "content": content},)
+            if len(self._prefixes) < MAX_CACHED_PREFIXES:
+                self._prefixes[key] = prefix
+        return prefix
+    
+    def case_messages(self, case_content: str, system_prompt: str, conversation: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Build messages for a case presentation or chat turn.
+        
+        Conversation messages are role/content dicts, such as a transcript view,
+        and are shared with the returned list rather than copied.
+        
+        Args:
+            case_content (str): Case details and information
+            system_prompt (str): Simulator instructions
+            conversation (Iterable[Dict[str, str]]): Messages to append after the case prefix
+        
+        Returns:
+            List[Dict[str, str]]: Messages for the chat completions API, must not be modified
+        """
+        messages = list(self.prefix(CASE_PROMPT, system_prompt, case_content))
+        messages.extend(msg for msg in conversation if msg["role"] in ("user", "assistant"))
+        return messages
+    
+    def summary_messages(self, prompt_type: str, system_prompt: str, user_content: str) -> List[Dict[str, str]]:
+        """
+        Build messages for a summary request.
+        
+        Args:
+            prompt_type (str): Prompt type, e.g. LIVE_SUMMARY_PROMPT
+            system_prompt (str): Summary instructions
+            user_content (str): Variable request text, always placed after the prefix
+        
+        Returns:
+            List[Dict[str, str]]: Messages for the chat completions API
+        """
+        messages = list(self.prefix(prompt_type, system_prompt))
+        messages.append({"role": "user", "content": user_content})
+        return messages
+    
+    def record_usage(self, prompt_type: str, usage) -> None:
+        """
+        Record prompt and cached token counts reported for a completion.
+        
+        Args:
+            prompt_type (str): Prompt type of the request
+            usage: Usage object of the completion (None if not reported)
+        """
+        if usage is None:
+            return
+        
+        details = getattr(usage, "prompt_tokens_details", None)
+        counters = self._usage.setdefault(prompt_type, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+        counters["calls"] += 1
+        counters["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        counters["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get prompt cache usage per prompt type.
+        
+        Returns:
+            Dict[str, Dict[str, float]]: Calls, token counts and cached token ratio by prompt type
+        """
+        stats = {}
+        for prompt_type, counters in self._usage.items():
+            prompt_tokens = counters["prompt_tokens"]
+            stats[prompt_type] = {
+                **counters,
+                "cache_hit_rate": counters["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+            }
+        return stats
@@ -0,0 +1,170 @@
+"""
+Rate limiter for Emergency Medicine Case Simulator
+"""
+
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Optional
+
+# Longest single wait before re-checking the limiter
+MAX_POLL_INTERVAL = 0.25
+
+
+class RateLimiter:
+    """Shared limit on in-flight requests and tokens per minute for sync and async callers"""
+    
+    def __init__(self, max_in_flight: int, tokens_per_minute: int):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            max_in_flight (int): Maximum concurrent requests, unlimited if 0
+            tokens_per_minute (int): Token bucket refill rate, unlimited if 0
+        """
+        self.max_in_flight = max_in_flight
+        self.capacity = float(tokens_per_minute)
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        """
+        Add the tokens earned since the last refill.
+        
+        Args:
+            now (float): Current monotonic time
+        """
+        if self.capacity:
+            elapsed = now - self._refilled_at
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.capacity / 60.0)
+        self._refilled_at = now
+    
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        Reserve a request slot and tokens if both are available.
+        
+        Args:
+            tokens (int): Estimated tokens of the request
+        
+        Returns:
+            float: 0 if acquired, otherwise seconds to wait before trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                return MAX_POLL_INTERVAL
+            
+            if self.capacity:
+                # Requests larger than the bucket go through once it is full
+                tokens = min(tokens, self.capacity)
+                if self._tokens < tokens:
+                    return (tokens - self._tokens) * 60.0 / self.capacity
+                self._tokens -= tokens
+            
+            self._in_flight += 1
+            return 0.0
+    
+    def _add_waiter(self, delta: int):
+        """
+        Track the number of callers waiting for the limiter.
+        
+        Args:
+            delta (int): 1 when a caller starts waiting, -1 when it stops
+        """
+        with self._lock:
+            self._waiting += delta
+    
+    async def acquire_async(self, tokens: int):
+        """
+        Wait until a request slot and enough tokens are available.
+        
+        Args:
+            tokens (int): Estimated tokens of the request
+        """
+        wait = self._try_acquire(tokens)
+        if wait <= 0:
+            return
+        
+        self._add_waiter(1)
+        try:
+            while wait > 0:
+                await asyncio.sleep(min(wait, MAX_POLL_INTERVAL) * random.uniform(0.8, 1.0))
+                wait = self._try_acquire(tokens)
+        finally:
+            self._add_waiter(-1)
+    
+    def acquire(self, tokens: int):
+        """
+        Blocking version of acquire_async for the sync client.
+        
+        Args:
+            tokens (int): Estimated tokens of the request
+        """
+        wait = self._try_acquire(tokens)
+        if wait <= 0:
+            return
+        
+        self._add_waiter(1)
+        try:
+            while wait > 0:
+                time.sleep(min(wait, MAX_POLL_INTERVAL) * random.uniform(0.8, 1.0))
+                wait = self._try_acquire(tokens)
+        finally:
+            self._add_waiter(-1)
+    
+    def release(self, reserved_tokens: int, used_tokens: Optional[int] = None):
+        """
+        Free a request slot, correcting the bucket with the tokens actually used.
+        
+        Args:
+            reserved_tokens (int): Tokens reserved when acquiring
+            used_tokens (Optional[int]): Tokens reported by the API, None to keep the estimate
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if self.capacity and used_tokens is not None:
+                reserved = min(reserved_tokens, self.capacity)
+                self._tokens = min(self.capacity, self._tokens + reserved - used_tokens)
+    
+    def pause(self, seconds: float):
+        """
+        Hold back all new requests, e.g. after the API reports a rate limit.
+        
+        Args:
+            seconds (float): Seconds to pause for
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def get_queue_depth(self) -> int:
+        """
+        Get the number of requests waiting for the limiter.
+        
+        Returns:
+            int: Waiting requests
+        """
+        return self._waiting
+    
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get the current limiter state.
+        
+        Returns:
+            Dict[str, float]: In-flight requests, queue depth and available tokens
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "available_tokens": round(self._tokens) if self.capacity else None
+            }
@@ -0,0 +1,410 @@
+"""
+Redis session storage for Emergency Medicine Case Simulator
+"""
+
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set
+from models.schemas import UserSession, LiveSummary, HistoryDigest, FinalSummary
+from models.transcript import Transcript
+from services.session_store import SessionStore, SessionCache
+from config.llm_config import REDIS_URL, REDIS_KEY_PREFIX
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Session hash fields holding one JSON model per case, by field prefix
+CASE_FIELDS = {
+    "live": ("live_summaries", LiveSummary),
+    "digest": ("history_digests", HistoryDigest),
+    "final": ("final_summaries", FinalSummary),
+}
+
+# Attempts to write a session before giving up on a contended key
+MAX_WRITE_ATTEMPTS = 5
+
+# Seconds the invalidation listener waits for a message before checking whether to stop
+LISTENER_POLL_SECONDS = 0.2
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Keeps sessions in Redis, shared by app nodes behind a load balancer.
+    
+    Per user: a hash with a version counter and the session fields (one field per
+    case summary), a list per case transcript, a set of the cases with a
+    transcript, a sorted set of completed cases and a hash of survey responses.
+    Each write is one pipelined transaction that increments the version. Loaded
+    sessions are cached and reloaded when another node has changed them. Writes
+    only touch the fields that changed, guarded by WATCH on the session hash, so
+    nodes updating different cases of the same user never overwrite each other.
+    
+    Writes run in order on a writer thread, so requests never wait for Redis to
+    save a session. Each write publishes the new version on an invalidation
+    channel; a listener thread drops cached sessions another node has changed,
+    so loading a cached session needs no round trip while the listener runs.
+    """
+    
+    def __init__(self, client: Any = None, prefix: str = REDIS_KEY_PREFIX):
+        """
+        Initialize Redis store.
+        
+        Args:
+            client: redis.Redis compatible client (e.g. fakeredis), created from REDIS_URL if None
+            prefix (str): Prefix of every key
+        
+        Raises:
+            RuntimeError: If no client is given and the redis package is not installed
+        """
+        if client is None:
+            if redis is None:
+                raise RuntimeError("SESSION_STORE=redis requires the redis package (pip install '.[redis]')")
+            client = redis.Redis.from_url(REDIS_URL)
+        
+        self.client = client
+        self.prefix = prefix
+        # Loaded sessions with their version and the field values last written or read
+        self._cache = SessionCache()
+        self._authenticated: Set[str] = set()
+        
+        # Cache, pending counts and stale users are shared with the writer and listener threads
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="redis-session-writer")
+        # Writes per user submitted to the writer thread and not yet done
+        self._pending: Dict[str, int] = {}
+        # Users another node wrote to while writes here were pending; reloaded once they are done
+        self._stale: Set[str] = set()
+        
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self._key("invalidate"): self._invalidated})
+        self._listener = self._pubsub.run_in_thread(sleep_time=LISTENER_POLL_SECONDS, daemon=True)
+    
+    def _key(self, *parts: str) -> str:
+        """
+        Build a key under the store prefix.
+        
+        Args:
+            *parts (str): Key parts
+        
+        Returns:
+            str: Redis key
+        """
+        return ":".join((self.prefix,) + parts)
+    
+    def _fields(self, session: UserSession) -> Dict[str, Dict[str, str]]:
+        """
+        Flatten a session, except its transcripts, into Redis hash fields.
+        
+        Args:
+            session (UserSession): Session
+        
+        Returns:
+            Dict[str, Dict[str, str]]: Session hash, survey hash and completed cases fields
+        """
+        fields = {
+            "started_at": session.started_at.isoformat(),
+            "current_case": session.current_case or ""
+        }
+        for prefix, (attribute, _) in CASE_FIELDS.items():
+            for case_id, value in getattr(session, attribute).items():
+                fields[f"{prefix}:{case_id}"] = value.model_dump_json()
+        
+        survey = {
+            f"{case_id}:{question_index}": str(rating)
+            for case_id, ratings in session.survey_responses.items()
+            for question_index, rating in ratings.items()
+        }
+        completed = {case_id: "" for case_id in session.completed_cases}
+        return {"session": fields, "survey": survey, "completed": completed}
+    
+    def load(self, user_id: str) -> Optional[UserSession]:
+        """Get a session from the cache, reloading it if another node changed it"""
+        with self._lock:
+            cached = self._cache.get(user_id)
+            pending = self._pending.get(user_id, 0)
+        if cached is not None:
+            # Cached changes still being written are newer than Redis; otherwise the
+            # listener has already dropped the session if another node changed it
+            if pending or self._listener.is_alive():
+                return cached[0]
+            version = self.client.hget(self._key("session", user_id), "version")
+            if version is not None and int(version) == cached[1]:
+                return cached[0]
+        elif pending:
+            # Evicted with writes still queued; read it back once they are written
+            self.flush()
+        
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self._key("session", user_id))
+        pipe.smembers(self._key("cases", user_id))
+        pipe.zrange(self._key("completed", user_id), 0, -1)
+        pipe.hgetall(self._key("survey", user_id))
+        fields, case_ids, completed, survey = pipe.execute()
+        if not fields:
+            self._cache.pop(user_id)
+            return None
+        
+        fields = {_text(name): _text(value) for name, value in fields.items()}
+        case_ids = sorted(_text(case_id) for case_id in case_ids)
+        pipe = self.client.pipeline(transaction=False)
+        for case_id in case_ids:
+            pipe.lrange(self._key("chat", user_id, case_id), 0, -1)
+        transcripts = pipe.execute()
+        
+        session = UserSession(
+            user_id=user_id,
+            current_case=fields.get("current_case") or None,
+            started_at=datetime.fromisoformat(fields["started_at"]),
+            completed_cases=[_text(case_id) for case_id in completed],
+            chat_history={
+                case_id: Transcript.from_messages([json.loads(message) for message in messages])
+                for case_id, messages in zip(case_ids, transcripts)
+            }
+        )
+        for name, value in fields.items():
+            prefix, _, case_id = name.partition(":")
+            if prefix in CASE_FIELDS:
+                attribute, model = CASE_FIELDS[prefix]
+                getattr(session, attribute)[case_id] = model.model_validate_json(value)
+        for name, rating in survey.items():
+            case_id, _, question_index = _text(name).rpartition(":")
+            session.survey_responses.setdefault(case_id, {})[int(question_index)] = int(rating)
+        
+        with self._lock:
+            self._cache.put(user_id, (session, int(fields.get("version", 0)), self._fields(session)))
+        return session
+    
+    def save(self, session: UserSession):
+        """Queue a write of the session fields that changed since they were last written or read"""
+        user_id = session.user_id
+        current = self._fields(session)
+        with self._lock:
+            cached = self._cache.get(user_id)
+            written = cached[2] if cached is not None else {"session": {}, "survey": {}, "completed": {}}
+            changes = {
+                group: {name: value for name, value in values.items() if written[group].get(name) != value}
+                for group, values in current.items()
+            }
+            if not any(changes.values()):
+                return
+            self._cache.put(user_id, (session, cached[1] if cached is not None else 0, current))
+        self._submit(user_id, self._write_fields, user_id, changes)
+    
+    def _write_fields(self, user_id: str, changes: Dict[str, Dict[str, str]]):
+        """
+        Write changed session fields; runs on the writer thread.
+        
+        Args:
+            user_id (str): User ID
+            changes (Dict[str, Dict[str, str]]): Changed session hash, survey hash and completed cases fields
+        """
+        session_key = self._key("session", user_id)
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    pipe.watch(session_key)
+                    version = int(pipe.hget(session_key, "version") or 0)
+                    pipe.multi()
+                    if changes["session"]:
+                        pipe.hset(session_key, mapping=changes["session"])
+                    if changes["survey"]:
+                        pipe.hset(self._key("survey", user_id), mapping=changes["survey"])
+                    if changes["completed"]:
+                        now = time.time()
+                        pipe.zadd(
+                            self._key("completed", user_id),
+                            {case_id: now + index * 1e-6 for index, case_id in enumerate(changes["completed"])},
+                            nx=True
+                        )
+                    pipe.hincrby(session_key, "version", 1)
+                    new_version = pipe.execute()[-1]
+                except redis.WatchError:
+                    continue
+            
+            self._written(user_id, lambda cached: version == cached, new_version)
+            return
+        print(f"Error writing session for {user_id}: key contended after {MAX_WRITE_ATTEMPTS} attempts")
+        self._written(user_id, lambda cached: False, None)
+    
+    def append_messages(self, user_id: str, case_id: str, transcript: Transcript, count: int):
+        """Queue an append of messages to the case transcript list"""
+        messages = [
+            json.dumps({"role": role, "content": content, "timestamp": timestamp.isoformat(), "seq": seq})
+            for role, content, timestamp, seq in transcript.rows(len(transcript) - count)
+        ]
+        self._submit(user_id, self._write_messages, user_id, case_id, messages)
+    
+    def _write_messages(self, user_id: str, case_id: str, messages: list):
+        """
+        Append serialized messages; runs on the writer thread.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            messages (list): JSON encoded messages
+        """
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(self._key("chat", user_id, case_id), *messages)
+        pipe.sadd(self._key("cases", user_id), case_id)
+        pipe.hincrby(self._key("session", user_id), "version", 1)
+        new_version = pipe.execute()[-1]
+        self._written(user_id, lambda cached: new_version == cached + 1, new_version)
+    
+    def _submit(self, user_id: str, write: Callable, *args):
+        """
+        Queue a write of a user's keys on the writer thread.
+        
+        Args:
+            user_id (str): User ID
+            write (Callable): Write method
+            *args: Write arguments
+        """
+        with self._lock:
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        self._writer.submit(self._run_write, user_id, write, *args)
+    
+    def _run_write(self, user_id: str, write: Callable, *args):
+        """
+        Run a queued write, dropping the cached session if it fails.
+        
+        Args:
+            user_id (str): User ID
+            write (Callable): Write method
+            *args: Write arguments
+        """
+        try:
+            write(*args)
+        except redis.RedisError as e:
+            print(f"Error writing session for {user_id}: {e}")
+            self._written(user_id, lambda cached: False, None)
+    
+    def _written(self, user_id: str, current: Callable[[int], bool], new_version: Optional[int]):
+        """
+        Record a finished write and tell the other nodes about it.
+        
+        Args:
+            user_id (str): User ID
+            current (Callable[[int], bool]): Whether the write followed the cached version directly
+            new_version (Optional[int]): Version after the write, None if it failed
+        """
+        with self._lock:
+            self._pending[user_id] -= 1
+            cached = self._cache.get(user_id)
+            if cached is not None:
+                if new_version is not None and current(cached[1]):
+                    self._cache.put(user_id, (cached[0], new_version, cached[2]))
+                else:
+                    # Another node changed the session, or the write failed; reload it
+                    self._stale.add(user_id)
+            if not self._pending[user_id]:
+                del self._pending[user_id]
+                if user_id in self._stale:
+                    self._stale.discard(user_id)
+                    self._cache.pop(user_id)
+        if new_version is not None:
+            self.client.publish(self._key("invalidate"), f"{user_id} {new_version}")
+    
+    def _invalidated(self, message: Dict[str, Any]):
+        """
+        Drop a cached session another node has changed; runs on the listener thread.
+        
+        Args:
+            message (Dict[str, Any]): Pub/sub message with the user ID and new version, -1 if deleted
+        """
+        user_id, _, version = _text(message["data"]).rpartition(" ")
+        version = int(version)
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is None or (0 <= version <= cached[1]):
+                return
+            if user_id in self._pending:
+                # The pending writes see the new version and reload the session when done
+                self._stale.add(user_id)
+            else:
+                self._cache.pop(user_id)
+    
+    def delete(self, user_id: str) -> bool:
+        """Delete every key of a session after the writes queued before it"""
+        with self._lock:
+            self._cache.pop(user_id)
+        return self._writer.submit(self._delete, user_id).result()
+    
+    def _delete(self, user_id: str) -> bool:
+        """
+        Delete every key of a session; runs on the writer thread.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            bool: Whether the session existed
+        """
+        case_ids = self.client.smembers(self._key("cases", user_id))
+        keys = [self._key(kind, user_id) for kind in ("session", "cases", "completed", "survey")]
+        keys.extend(self._key("chat", user_id, _text(case_id)) for case_id in case_ids)
+        deleted = self.client.delete(*keys) > 0
+        with self._lock:
+            self._cache.pop(user_id)
+        self.client.publish(self._key("invalidate"), f"{user_id} -1")
+        return deleted
+    
+    def add_authenticated_user(self, user_id: str):
+        """Record a login for every node"""
+        self._authenticated.add(user_id)
+        self._writer.submit(self._write_login, user_id)
+    
+    def _write_login(self, user_id: str):
+        """
+        Add a user to the authenticated set; runs on the writer thread.
+        
+        Args:
+            user_id (str): User ID
+        """
+        try:
+            self.client.sadd(self._key("authenticated"), user_id)
+        except redis.RedisError as e:
+            print(f"Error recording login for {user_id}: {e}")
+    
+    def is_authenticated(self, user_id: str) -> bool:
+        """Check logins made on any node"""
+        if user_id in self._authenticated:
+            return True
+        if self.client.sismember(self._key("authenticated"), user_id):
+            self._authenticated.add(user_id)
+            return True
+        return False
+    
+    def flush(self):
+        """Wait for the writer thread to finish every queued write"""
+        self._writer.submit(lambda: None).result()
+    
+    async def flush_async(self):
+        """Wait for the writer thread to finish every queued write without blocking the event loop"""
+        await asyncio.wrap_future(self._writer.submit(lambda: None))
+    
+    def close(self):
+        """Finish queued writes, stop the listener and close the connection pool"""
+        self._writer.shutdown(wait=True)
+        self._listener.stop()
+        self._listener.join()
+        self._pubsub.close()
+        self.client.close()
+
+
+def _text(value: Any) -> str:
+    """
+    Decode a Redis reply, which is bytes unless the client decodes responses.
+    
+    Args:
+        value: Reply value
+    
+    Returns:
+        str: Text value
+    """
+    return value.decode() if isinstance(value, bytes) else value
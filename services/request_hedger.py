@@ -0,0 +1,149 @@
+"""
+Request hedging for Emergency Medicine Case Simulator
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from services.model_router import percentile
+
+# Most hedges that may be saved up while requests are fast
+MAX_HEDGE_BURST = 5.0
+
+
+class RequestHedger:
+    """Sends a second copy of slow requests and keeps whichever answers first"""
+    
+    def __init__(self, latency_percentile: float, min_delay: float, budget_percent: float,
+                 window: int, min_samples: int):
+        """
+        Initialize request hedger.
+        
+        Args:
+            latency_percentile (float): Percentile of recent latencies after which to hedge, e.g. 0.9
+            min_delay (float): Minimum seconds before hedging
+            budget_percent (float): Extra requests allowed as a percentage of requests
+            window (int): Number of recent latencies tracked per key
+            min_samples (int): Latencies needed before hedging starts
+        """
+        self.latency_percentile = latency_percentile
+        self.min_delay = min_delay
+        self.budget_ratio = budget_percent / 100.0
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._budget = 0.0
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+    
+    def get_hedge_delay(self, key: str) -> Optional[float]:
+        """
+        Get how long to wait for a request before hedging it.
+        
+        Args:
+            key (str): Latency group, e.g. model and streaming mode
+        
+        Returns:
+            Optional[float]: Seconds to wait, None if too few latencies are known
+        """
+        latencies = self._latencies.get(key)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(list(latencies), self.latency_percentile))
+    
+    def record(self, key: str, latency: float):
+        """
+        Record the latency of a request.
+        
+        Args:
+            key (str): Latency group
+            latency (float): Seconds until the first token
+        """
+        self._latencies.setdefault(key, deque(maxlen=self.window)).append(latency)
+    
+    def _spend_budget(self) -> bool:
+        """
+        Take one hedge from the budget if available.
+        
+        Returns:
+            bool: True if a hedge may be sent
+        """
+        if self._budget < 1.0:
+            return False
+        self._budget -= 1.0
+        return True
+    
+    async def run(self, key: str, start: Callable[[], Awaitable[Any]],
+                  discard: Optional[Callable[[Any], Awaitable[None]]] = None) -> Any:
+        """
+        Run a request, hedging it if it is slower than the tracked percentile.
+        
+        The losing request is cancelled. If it finished at the same time as the
+        winner, its result is passed to discard so it can be cleaned up.
+        
+        Args:
+            key (str): Latency group
+            start (Callable[[], Awaitable[Any]]): Coroutine function that sends the
+                request and returns once the first token has arrived
+            discard (Optional[Callable[[Any], Awaitable[None]]]): Cleanup for an unused result
+        
+        Returns:
+            Any: Result of the first request to succeed
+        
+        Raises:
+            Exception: The primary request's error if every request failed
+        """
+        self.requests += 1
+        self._budget = min(MAX_HEDGE_BURST, self._budget + self.budget_ratio)
+        
+        started = time.monotonic()
+        tasks: List[asyncio.Task] = [asyncio.ensure_future(start())]
+        winner = None
+        try:
+            delay = self.get_hedge_delay(key)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._spend_budget():
+                    self.hedged += 1
+                    tasks.append(asyncio.ensure_future(start()))
+            
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the primary when both finish together
+                for task in tasks:
+                    if task in done and task.exception() is None:
+                        winner = task
+                        break
+            
+            if winner is None:
+                raise tasks[0].exception()
+            
+            self.record(key, time.monotonic() - started)
+            if winner is not tasks[0]:
+                self.hedge_wins += 1
+            return winner.result()
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None and discard is not None:
+                    await discard(task.result())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hedging counters.
+        
+        Returns:
+            Dict[str, Any]: Requests, hedges sent, hedges that won and the current delays
+        """
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "delays": {key: self.get_hedge_delay(key) for key in self._latencies}
+        }
@@ -0,0 +1,160 @@
+"""
+Response cache for Emergency Medicine Case Simulator
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def request_fingerprint(model: str, messages: List[Dict[str, str]], **params: Any) -> str:
+    """
+    Hash a completion request so identical requests share a key.
+    
+    Only message roles and contents are hashed, so client-side fields such as
+    timestamps do not affect the key.
+    
+    Args:
+        model (str): Model name
+        messages (List[Dict[str, str]]): Messages for the chat completions API
+        **params: Other request parameters that affect the output (e.g. temperature)
+    
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = {
+        "model": model,
+        "messages": [[msg["role"], msg["content"]] for msg in messages],
+        "params": params
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Bounded LRU cache with expiry and an optional SQLite tier that survives restarts"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_path: Optional[str] = None):
+        """
+        Initialize response cache.
+        
+        Args:
+            max_entries (int): Maximum entries kept in memory
+            ttl_seconds (float): Seconds an entry stays valid
+            disk_path (Optional[str]): SQLite file for the on-disk tier, disabled if empty
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        self._db = None
+        if disk_path:
+            try:
+                self._db = self._open_disk_tier(disk_path)
+            except Exception as e:
+                print(f"Warning: Could not open response cache at {disk_path}, using memory only: {e}")
+    
+    def _open_disk_tier(self, disk_path: str) -> sqlite3.Connection:
+        """
+        Open the SQLite tier and drop expired entries.
+        
+        Args:
+            disk_path (str): SQLite file path
+        
+        Returns:
+            sqlite3.Connection: Open connection
+        """
+        directory = os.path.dirname(disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        db = sqlite3.connect(disk_path, check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        db.commit()
+        return db
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response.
+        
+        Args:
+            key (str): Request fingerprint
+        
+        Returns:
+            Optional[str]: Cached response or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            
+            self.misses += 1
+            return None
+    
+    def set(self, key: str, value: str):
+        """
+        Cache a response.
+        
+        Args:
+            key (str): Request fingerprint
+            value (str): Response text
+        """
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not write response cache entry: {e}")
+    
+    def _store(self, key: str, value: str, expires_at: float):
+        """
+        Put an entry in the memory tier, evicting the least recently used ones.
+        
+        Args:
+            key (str): Request fingerprint
+            value (str): Response text
+            expires_at (float): Expiry as a Unix timestamp
+        """
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get cache usage counters.
+        
+        Returns:
+            Dict[str, int]: Hits, misses and entries held in memory
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -2,18 +2,29 @@
 Session service for Emergency Medicine Case Simulator
 """
 
-from typing import Dict, Optional, List
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, List, Tuple
 from datetime import datetime
-from models.schemas import UserSession, ChatMessage
+from models.schemas import UserSession, ChatMessage, LiveSummary, HistoryDigest, FinalSummary
+from models.transcript import Transcript
+from services.session_store import SessionStore, create_session_store
 from config.case_config import AVAILABLE_CASES
 
 
 class SessionService:
     """Service for managing user sessions"""
     
-    def __init__(self):
-        """Initialize session service"""
-        self.sessions: Dict[str, UserSession] = {}
+    def __init__(self, store: Optional[SessionStore] = None):
+        """
+        Initialize session service.
+        
+        Args:
+            store (Optional[SessionStore]): Session storage, the configured SESSION_STORE by default
+        """
+        self.store = store if store is not None else create_session_store()
+        # Turn lock per (user_id, case_id) with the number of turns holding or awaiting it
+        self._turn_locks: Dict[Tuple[str, str], Tuple[asyncio.Lock, int]] = {}
     
     def create_session(self, user_id: str) -> UserSession:
         """
@@ -26,7 +37,7 @@ class SessionService:
             UserSession: Created session object
         """
         session = UserSession(user_id=user_id)
-        self.sessions[user_id] = session
+        self.store.save(session)
         return session
     
     def get_session(self, user_id: str) -> Optional[UserSession]:
@@ -39,7 +50,7 @@ class SessionService:
         Returns:
             Optional[UserSession]: Session object if exists, None otherwise
         """
-        return self.sessions.get(user_id)
+        return self.store.load(user_id)
     
     def get_or_create_session(self, user_id: str) -> UserSession:
         """
@@ -75,8 +86,9 @@ class SessionService:
         
         # Initialize chat history for this case if not exists
         if case_id not in session.chat_history:
-            session.chat_history[case_id] = []
+            session.chat_history[case_id] = Transcript()
         
+        self.store.save(session)
         return True
     
     def add_message(self, user_id: str, case_id: str, role: str, content: str) -> bool:
@@ -96,16 +108,94 @@ class SessionService:
         if session is None:
             return False
         
-        if case_id not in session.chat_history:
-            session.chat_history[case_id] = []
+        transcript = session.chat_history.setdefault(case_id, Transcript())
+        transcript.append(role, content, seq=transcript.last_seq + 1)
+        self.store.append_messages(user_id, case_id, transcript, 1)
+        return True
+    
+    def add_turn(self, user_id: str, case_id: str, user_message: str, ai_response: str) -> bool:
+        """
+        Add a completed chat turn to case chat history.
+        
+        The user message and AI response are stored together, so a turn that was
+        abandoned before the response arrived leaves no unanswered user message.
         
-        message = ChatMessage(role=role, content=content)
-        session.chat_history[case_id].append(message)
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            user_message (str): User message
+            ai_response (str): AI response to the user message
+            
+        Returns:
+            bool: True if turn added successfully, False otherwise
+        """
+        session = self.get_session(user_id)
+        if session is None:
+            return False
+        
+        if not user_message or not ai_response:
+            raise ValueError("Message content must not be empty")
+        
+        transcript = session.chat_history.setdefault(case_id, Transcript())
+        seq = transcript.last_seq + 1
+        transcript.append("user", user_message, seq=seq)
+        transcript.append("assistant", ai_response, seq=seq)
+        self.store.append_messages(user_id, case_id, transcript, 2)
         return True
     
+    @asynccontextmanager
+    async def turn(self, user_id: str, case_id: str) -> AsyncIterator[None]:
+        """
+        Serialize the chat turns of a case.
+        
+        A turn submitted while another is in flight (a double submit, a second
+        tab) waits for it, so its LLM call sees the complete transcript and turns
+        are stored in the order they were answered. Turns are only serialized
+        within this worker process; the turn's writes are committed before the
+        next turn starts, so a worker serving the next request reads them.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        """
+        key = (user_id, case_id)
+        lock, turns = self._turn_locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._turn_locks[key] = (lock, turns + 1)
+        try:
+            async with lock:
+                try:
+                    yield
+                finally:
+                    await self.store.flush_async()
+        finally:
+            lock, turns = self._turn_locks[key]
+            if turns == 1:
+                del self._turn_locks[key]
+            else:
+                self._turn_locks[key] = (lock, turns - 1)
+    
+    def get_transcript(self, user_id: str, case_id: str) -> Transcript:
+        """
+        Get the transcript of a specific case for reading.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            
+        Returns:
+            Transcript: Case transcript (an empty one if none exists)
+        """
+        session = self.get_session(user_id)
+        if session is None or case_id not in session.chat_history:
+            return Transcript()
+        
+        return session.chat_history[case_id]
+    
     def get_chat_history(self, user_id: str, case_id: str) -> List[ChatMessage]:
         """
-        Get chat history for a specific case.
+        Get chat history for a specific case as models for HTTP responses.
         
         Args:
             user_id (str): User ID
@@ -114,11 +204,228 @@ class SessionService:
         Returns:
             List[ChatMessage]: Chat history messages
         """
+        return [
+            ChatMessage(role=role, content=content, timestamp=timestamp, seq=seq)
+            for role, content, timestamp, seq in self.get_transcript(user_id, case_id).rows()
+        ]
+    
+    def get_live_summary(self, user_id: str, case_id: str) -> LiveSummary:
+        """
+        Get the live summary for a specific case.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            
+        Returns:
+            LiveSummary: Latest live summary (a blank version 0 summary if none exists)
+        """
+        session = self.get_session(user_id)
+        if session is None or case_id not in session.live_summaries:
+            return LiveSummary()
+        
+        return session.live_summaries[case_id]
+    
+    def set_live_summary_pending(self, user_id: str, case_id: str, pending: bool = True) -> LiveSummary:
+        """
+        Flag whether the live summary of a case is being regenerated.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            pending (bool): Whether a newer summary is being generated
+            
+        Returns:
+            LiveSummary: Current live summary with the pending flag updated
+        """
+        session = self.get_or_create_session(user_id)
+        live_summary = session.live_summaries.setdefault(case_id, LiveSummary())
+        live_summary.pending = pending
+        self.store.save(session)
+        return live_summary
+    
+    def set_live_summary(self, user_id: str, case_id: str, summary: str, message_count: int,
+                         pending: bool = False, incremental: bool = False, failed: bool = False,
+                         llm_summary: Optional[str] = None) -> Optional[LiveSummary]:
+        """
+        Store a newly generated live summary for a case.
+        
+        Summaries covering fewer messages than the stored one are stale and ignored.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            summary (str): Summary text
+            message_count (int): Number of transcript messages the summary covers
+            pending (bool): Whether a newer summary is still being generated
+            incremental (bool): Whether the summary was produced by an incremental update
+            failed (bool): Whether generation failed, forcing a full rebuild next time
+            llm_summary (Optional[str]): LLM-generated part of the summary, defaults to summary
+
+        Returns:
+            Optional[LiveSummary]: Updated live summary, None if session missing or summary stale
+        """
         session = self.get_session(user_id)
         if session is None:
-            return []
+            return None
         
-        return session.chat_history.get(case_id, [])
+        current = session.live_summaries.get(case_id, LiveSummary())
+        if message_count < current.message_count:
+            return None
+        
+        live_summary = LiveSummary(
+            summary=summary,
+            version=current.version + 1,
+            message_count=message_count,
+            pending=pending,
+            needs_full_rebuild=failed,
+            updates_since_rebuild=current.updates_since_rebuild + 1 if incremental else 0,
+            llm_summary=summary if llm_summary is None else llm_summary
+        )
+        session.live_summaries[case_id] = live_summary
+        self.store.save(session)
+        return live_summary
+    
+    def set_structured_summary(self, user_id: str, case_id: str, summary: str) -> Optional[LiveSummary]:
+        """
+        Replace the live summary text after re-rendering its structured sections.
+        
+        The LLM-generated part and the transcript coverage are left unchanged so
+        the next background refresh still sees which messages it has to process.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            summary (str): Summary text
+        
+        Returns:
+            Optional[LiveSummary]: Updated live summary, None if session missing or text unchanged
+        """
+        session = self.get_session(user_id)
+        if session is None:
+            return None
+        
+        current = session.live_summaries.setdefault(case_id, LiveSummary())
+        if summary == current.summary:
+            return None
+        
+        current.summary = summary
+        current.version += 1
+        current.updated_at = datetime.now()
+        self.store.save(session)
+        return current
+
+    def get_history_digest(self, user_id: str, case_id: str) -> Optional[HistoryDigest]:
+        """
+        Get the digest of the earlier chat turns of a case.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            Optional[HistoryDigest]: Digest or None if the history has not been compacted
+        """
+        session = self.get_session(user_id)
+        if session is None:
+            return None
+        
+        return session.history_digests.get(case_id)
+    
+    def set_history_digest(self, user_id: str, case_id: str, summary: str, message_count: int) -> Optional[HistoryDigest]:
+        """
+        Store a digest of the earlier chat turns of a case.
+        
+        Digests covering no more messages than the stored one are ignored.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            summary (str): Digest text
+            message_count (int): Number of leading transcript messages the digest replaces
+        
+        Returns:
+            Optional[HistoryDigest]: Stored digest, None if session missing or digest stale
+        """
+        session = self.get_session(user_id)
+        if session is None:
+            return None
+        
+        current = session.history_digests.get(case_id)
+        if current is not None and message_count <= current.message_count:
+            return None
+        
+        digest = HistoryDigest(summary=summary, message_count=message_count)
+        session.history_digests[case_id] = digest
+        self.store.save(session)
+        return digest
+    
+    def get_final_summary(self, user_id: str, case_id: str) -> FinalSummary:
+        """
+        Get the final summary of a completed case.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            FinalSummary: Final summary (a blank version 0 summary if none exists)
+        """
+        session = self.get_session(user_id)
+        if session is None or case_id not in session.final_summaries:
+            return FinalSummary()
+        
+        return session.final_summaries[case_id]
+    
+    def set_final_summary_pending(self, user_id: str, case_id: str, pending: bool = True) -> FinalSummary:
+        """
+        Flag whether the final summary of a case is being generated.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            pending (bool): Whether a newer summary is being generated
+        
+        Returns:
+            FinalSummary: Current final summary with the pending flag updated
+        """
+        session = self.get_or_create_session(user_id)
+        final_summary = session.final_summaries.setdefault(case_id, FinalSummary())
+        final_summary.pending = pending
+        self.store.save(session)
+        return final_summary
+    
+    def set_final_summary(self, user_id: str, case_id: str, summary: str, message_count: int,
+                          pending: bool = False, failed: bool = False) -> Optional[FinalSummary]:
+        """
+        Store a newly generated final summary for a case.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            summary (str): Summary text
+            message_count (int): Number of transcript messages the summary covers
+            pending (bool): Whether a newer summary is still being generated
+            failed (bool): Whether generation failed, so the summary is generated again on request
+        
+        Returns:
+            Optional[FinalSummary]: Stored final summary, None if session missing
+        """
+        session = self.get_session(user_id)
+        if session is None:
+            return None
+        
+        current = session.final_summaries.get(case_id, FinalSummary())
+        final_summary = FinalSummary(
+            summary=summary,
+            version=current.version + 1,
+            message_count=message_count,
+            pending=pending,
+            failed=failed
+        )
+        session.final_summaries[case_id] = final_summary
+        self.store.save(session)
+        return final_summary
     
     def complete_case(self, user_id: str, case_id: str, action: str) -> bool:
         """
@@ -144,6 +451,7 @@ class SessionService:
         if session.current_case == case_id:
             session.current_case = None
         
+        self.store.save(session)
         return True
     
     def add_survey_response(self, user_id: str, case_id: str, question_index: int, rating: int) -> bool:
@@ -167,6 +475,7 @@ class SessionService:
             session.survey_responses[case_id] = {}
         
         session.survey_responses[case_id][question_index] = rating
+        self.store.save(session)
         return True
     
     def get_survey_responses(self, user_id: str) -> Dict[str, Dict[int, int]]:
@@ -224,10 +533,7 @@ class SessionService:
         Returns:
             bool: True if session cleared, False if not found
         """
-        if user_id in self.sessions:
-            del self.sessions[user_id]
-            return True
-        return False
+        return self.store.delete(user_id)
     
     def get_next_case(self, user_id: str) -> Optional[str]:
         """
@@ -247,3 +553,29 @@ class SessionService:
                 return case_id
         
         return None
+    
+    def authenticate_user(self, user_id: str):
+        """
+        Record that a user has logged in, for every worker sharing the session store.
+        
+        Args:
+            user_id (str): User ID
+        """
+        self.store.add_authenticated_user(user_id)
+    
+    def is_authenticated(self, user_id: str) -> bool:
+        """
+        Check whether a user has logged in.
+        
+        Args:
+            user_id (str): User ID
+            
+        Returns:
+            bool: True if the user has logged in
+        """
+        return self.store.is_authenticated(user_id)
+    
+    def flush(self):
+        """Write pending session changes to the session store"""
+        self.store.flush()
+
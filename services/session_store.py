@@ -0,0 +1,758 @@
+"""
+Session storage backends for Emergency Medicine Case Simulator
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from models.schemas import UserSession
+from models.transcript import Transcript
+from config.llm_config import (
+    SESSION_STORE,
+    SESSION_MAX_RESIDENT,
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_DB_PATH,
+    SESSION_DB_FLUSH_INTERVAL_SECONDS,
+    SESSION_DB_BATCH_SIZE
+)
+
+# Session attributes stored as one field per case, so workers updating different
+# cases of the same user do not overwrite each other
+CASE_ATTRIBUTES = ("survey_responses", "live_summaries", "history_digests", "final_summaries")
+
+
+class SessionCache:
+    """Sessions resident in worker memory, evicted when idle or least recently used"""
+    
+    def __init__(self, max_sessions: int = SESSION_MAX_RESIDENT, idle_ttl: float = SESSION_IDLE_TTL_SECONDS,
+                 on_evict: Optional[Callable[[str, Any], None]] = None):
+        """
+        Initialize session cache.
+        
+        Args:
+            max_sessions (int): Maximum sessions kept, 0 for no limit
+            idle_ttl (float): Seconds since last use after which a session is evicted, 0 to keep it
+            on_evict (Optional[Callable[[str, Any], None]]): Called with the user ID and value of each evicted session
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+    
+    def get(self, user_id: str) -> Any:
+        """
+        Get a resident session and mark it as used.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            Any: Cached value, None if not resident
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        self.put(user_id, entry[0])
+        return entry[0]
+    
+    def put(self, user_id: str, value: Any):
+        """
+        Make a session resident, evicting idle and least recently used ones.
+        
+        Args:
+            user_id (str): User ID
+            value: Cached value
+        """
+        now = time.monotonic()
+        self._entries[user_id] = (value, now)
+        self._entries.move_to_end(user_id)
+        
+        # The oldest entries come first; user_id was just moved to the end
+        while len(self._entries) > 1:
+            oldest, (oldest_value, last_used) = next(iter(self._entries.items()))
+            over_limit = self.max_sessions and len(self._entries) > self.max_sessions
+            idle = self.idle_ttl and now - last_used > self.idle_ttl
+            if not (over_limit or idle):
+                break
+            del self._entries[oldest]
+            if self.on_evict is not None:
+                self.on_evict(oldest, oldest_value)
+    
+    def pop(self, user_id: str) -> Any:
+        """
+        Remove a session without calling on_evict.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            Any: Removed value, None if not resident
+        """
+        entry = self._entries.pop(user_id, None)
+        return entry[0] if entry is not None else None
+    
+    def __len__(self) -> int:
+        """Number of resident sessions"""
+        return len(self._entries)
+
+
+class SessionStore(ABC):
+    """
+    Storage interface behind SessionService.
+    
+    SessionService mutates the session returned by load, then calls save or
+    append_messages so the backend can persist the change. Backends must
+    implement every abstract method; flush and close are optional.
+    """
+    
+    @abstractmethod
+    def load(self, user_id: str) -> Optional[UserSession]:
+        """
+        Load a user session.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            Optional[UserSession]: Session with its chat history, None if not stored
+        """
+    
+    @abstractmethod
+    def save(self, session: UserSession):
+        """
+        Persist everything in a session except its chat history.
+        
+        Args:
+            session (UserSession): Session to persist
+        """
+    
+    @abstractmethod
+    def append_messages(self, user_id: str, case_id: str, transcript: Transcript, count: int):
+        """
+        Persist messages already appended to a case transcript.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            transcript (Transcript): Case transcript
+            count (int): Number of new messages at the end of the transcript
+        """
+    
+    @abstractmethod
+    def delete(self, user_id: str) -> bool:
+        """
+        Delete a user session.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            bool: True if a session was deleted, False if not found
+        """
+    
+    @abstractmethod
+    def add_authenticated_user(self, user_id: str):
+        """
+        Record that a user has logged in.
+        
+        Args:
+            user_id (str): User ID
+        """
+    
+    @abstractmethod
+    def is_authenticated(self, user_id: str) -> bool:
+        """
+        Check whether a user has logged in.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            bool: True if the user has logged in
+        """
+    
+    def flush(self):
+        """Write pending changes"""
+    
+    async def flush_async(self):
+        """Write pending changes without blocking the event loop"""
+        self.flush()
+    
+    def close(self):
+        """Write pending changes and release resources"""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Keeps sessions in process memory; they are lost on restart.
+    
+    Sessions evicted from memory are spilled to a private temporary SQLite
+    database, which is deleted when the store is closed, and loaded back into
+    memory on their next use.
+    """
+    
+    def __init__(self, max_sessions: int = SESSION_MAX_RESIDENT, idle_ttl: float = SESSION_IDLE_TTL_SECONDS):
+        """
+        Initialize in-memory store.
+        
+        Args:
+            max_sessions (int): Maximum sessions kept in memory, 0 for no limit
+            idle_ttl (float): Seconds a session stays in memory unused, 0 for no limit
+        """
+        self.sessions = SessionCache(max_sessions, idle_ttl, on_evict=self._spill)
+        self.authenticated_users: Set[str] = set()
+        # An empty path opens a temporary database that SQLite deletes on close
+        self._spill_db = sqlite3.connect("", check_same_thread=False)
+        self._spill_db.execute("CREATE TABLE sessions (user_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self._spilled: Set[str] = set()
+    
+    def _spill(self, user_id: str, session: UserSession):
+        """
+        Write an evicted session to the spill database.
+        
+        Args:
+            user_id (str): User ID
+            session (UserSession): Evicted session
+        """
+        self._spill_db.execute(
+            "INSERT OR REPLACE INTO sessions (user_id, data) VALUES (?, ?)", (user_id, session.model_dump_json())
+        )
+        self._spill_db.commit()
+        self._spilled.add(user_id)
+    
+    def _unspill(self, user_id: str) -> Optional[UserSession]:
+        """
+        Remove a session from the spill database.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            Optional[UserSession]: Spilled session, None if it was not spilled
+        """
+        if user_id not in self._spilled:
+            return None
+        self._spilled.discard(user_id)
+        row = self._spill_db.execute("SELECT data FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+        self._spill_db.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+        self._spill_db.commit()
+        return UserSession.model_validate_json(row[0]) if row is not None else None
+    
+    def load(self, user_id: str) -> Optional[UserSession]:
+        """Get a session from memory, loading it back if it was spilled"""
+        session = self.sessions.get(user_id)
+        if session is None:
+            session = self._unspill(user_id)
+            if session is not None:
+                self.sessions.put(user_id, session)
+        return session
+    
+    def save(self, session: UserSession):
+        """Keep the session in memory; changes are made to it in place"""
+        self.sessions.put(session.user_id, session)
+        # The session was saved from a copy loaded before it was spilled
+        if session.user_id in self._spilled:
+            self._unspill(session.user_id)
+    
+    def append_messages(self, user_id: str, case_id: str, transcript: Transcript, count: int):
+        """Nothing to do, the messages are already in the session"""
+    
+    def delete(self, user_id: str) -> bool:
+        """Remove a session from memory and the spill database"""
+        resident = self.sessions.pop(user_id) is not None
+        spilled = self._unspill(user_id) is not None
+        return resident or spilled
+    
+    def add_authenticated_user(self, user_id: str):
+        """Record a login in memory"""
+        self.authenticated_users.add(user_id)
+    
+    def is_authenticated(self, user_id: str) -> bool:
+        """Check the logins recorded in memory"""
+        return user_id in self.authenticated_users
+    
+    def close(self):
+        """Delete the spill database"""
+        self._spill_db.close()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Keeps sessions in a SQLite database in WAL mode, shared by every worker on a machine.
+    
+    Chat messages are append-only rows; the rest of a session is one JSON row.
+    Writes are queued and committed in batches by a background thread. Loaded
+    sessions are cached and reloaded when another worker has changed them.
+    Session rows are compare-and-set on their version: if another worker wrote
+    the row since this one last read or wrote it, only the fields changed here
+    are written over the stored row.
+    """
+    
+    def __init__(self, path: str = SESSION_DB_PATH, flush_interval: float = SESSION_DB_FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = SESSION_DB_BATCH_SIZE):
+        """
+        Open the database and start the writer thread.
+        
+        Args:
+            path (str): SQLite file path
+            flush_interval (float): Longest seconds a write waits to be committed
+            batch_size (int): Queued writes that trigger an immediate commit
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._db = self._connect(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                version TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                case_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                seq INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS messages_by_case ON messages (user_id, case_id, id);
+            CREATE TABLE IF NOT EXISTS authenticated_users (user_id TEXT PRIMARY KEY);
+        """)
+        # Databases created before messages had turn numbers
+        if "seq" not in {column[1] for column in self._db.execute("PRAGMA table_info(messages)")}:
+            self._db.execute("ALTER TABLE messages ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        self._db.commit()
+        self._db_lock = threading.Lock()
+        
+        # Loaded sessions with the version they were loaded or saved at and their fields
+        self._cache = SessionCache(on_evict=self._evicted)
+        # Sessions evicted from the cache while their changes were still being written
+        self._unflushed: Dict[str, Tuple[UserSession, str, Dict[str, str]]] = {}
+        # Row version each session had when this worker last read or committed it
+        self._versions: Dict[str, str] = {}
+        self._authenticated: Set[str] = set()
+        
+        # Writes waiting for the next commit; sessions hold the fields last read or
+        # committed, the fields to write and the new version
+        self._lock = threading.Lock()
+        self._pending_sessions: Dict[str, Tuple[Dict[str, str], Dict[str, str], str]] = {}
+        self._pending_versions: Dict[str, str] = {}
+        self._pending_messages: List[Tuple[str, str, str, str, str, int]] = []
+        self._pending_users: List[str] = []
+        self._pending_deletes: List[str] = []
+        # Users whose writes the writer has taken from the queue but not yet committed
+        self._inflight: Set[str] = set()
+        # Callers waiting for the writer to commit what they queued
+        self._commit_waiters: List[Future] = []
+        
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer_db = self._connect(path)
+        # Transactions are begun explicitly so the version check and the write are atomic
+        self._writer_db.isolation_level = None
+        self._writer = threading.Thread(target=self._run_writer, name="session-store-writer", daemon=True)
+        self._writer.start()
+    
+    def _connect(self, path: str) -> sqlite3.Connection:
+        """
+        Open a connection in WAL mode.
+        
+        Args:
+            path (str): SQLite file path
+        
+        Returns:
+            sqlite3.Connection: Open connection
+        """
+        db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode commits still survive a process crash; only power loss can drop the latest
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+    
+    def _has_unflushed(self, user_id: str) -> bool:
+        """
+        Check whether a session has changes that are queued or being committed.
+        
+        The caller holds the queue lock.
+        
+        Args:
+            user_id (str): User ID
+        
+        Returns:
+            bool: True if the database does not have the session's latest changes yet
+        """
+        return user_id in self._pending_sessions or user_id in self._pending_versions or user_id in self._inflight
+    
+    def _evicted(self, user_id: str, entry: Tuple[UserSession, str, Dict[str, str]]):
+        """
+        Keep a session evicted from the cache until its changes are committed.
+        
+        Args:
+            user_id (str): User ID
+            entry (Tuple[UserSession, str, Dict[str, str]]): Evicted cache entry
+        """
+        with self._lock:
+            if self._has_unflushed(user_id):
+                self._unflushed[user_id] = entry
+    
+    def load(self, user_id: str) -> Optional[UserSession]:
+        """Get a session from the cache, reloading it if another worker changed it"""
+        cached = self._cache.get(user_id)
+        with self._lock:
+            if cached is None:
+                cached = self._unflushed.pop(user_id, None)
+                restored = cached is not None
+            else:
+                restored = False
+            unflushed = self._has_unflushed(user_id)
+        if restored:
+            self._cache.put(user_id, cached)
+        # Unwritten changes are newer than anything in the database
+        if unflushed and cached is not None:
+            return cached[0]
+        if unflushed:
+            # Only messages were queued for a session that is not cached; wait for the writer
+            self._commit_soon().result()
+        
+        with self._db_lock:
+            row = self._db.execute("SELECT data, version FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                self._cache.pop(user_id)
+                self._versions.pop(user_id, None)
+                return None
+            if cached is not None and cached[1] == row[1]:
+                return cached[0]
+            
+            messages = self._db.execute(
+                "SELECT case_id, role, content, timestamp, seq FROM messages WHERE user_id = ? ORDER BY id", (user_id,)
+            ).fetchall()
+        
+        session = UserSession.model_validate_json(row[0])
+        for case_id, role, content, timestamp, seq in messages:
+            session.chat_history.setdefault(case_id, Transcript()).append(
+                role, content, datetime.fromisoformat(timestamp), seq
+            )
+        self._cache.put(user_id, (session, row[1], _session_fields(json.loads(row[0]))))
+        self._versions[user_id] = row[1]
+        return session
+    
+    def save(self, session: UserSession):
+        """Queue the session fields for the next commit"""
+        user_id = session.user_id
+        cached = self._cache.get(user_id)
+        version = uuid.uuid4().hex
+        fields = _session_fields(session.model_dump(mode="json", exclude={"chat_history"}))
+        with self._lock:
+            pending = self._pending_sessions.get(user_id)
+            if pending is not None:
+                written = pending[0]
+            else:
+                written = cached[2] if cached is not None else {}
+            self._pending_sessions[user_id] = (written, fields, version)
+            self._pending_versions.pop(user_id, None)
+        self._cache.put(user_id, (session, version, fields))
+        self._queued()
+    
+    def append_messages(self, user_id: str, case_id: str, transcript: Transcript, count: int):
+        """Queue message rows for the next commit"""
+        cached = self._cache.get(user_id)
+        version = uuid.uuid4().hex
+        if cached is not None:
+            self._cache.put(user_id, (cached[0], version, cached[2]))
+        with self._lock:
+            self._pending_messages.extend(
+                (user_id, case_id, role, content, timestamp.isoformat(), seq)
+                for role, content, timestamp, seq in transcript.rows(len(transcript) - count)
+            )
+            # Other workers see the new version and reload the transcript
+            if user_id in self._pending_sessions:
+                written, fields, _ = self._pending_sessions[user_id]
+                self._pending_sessions[user_id] = (written, fields, version)
+            else:
+                self._pending_versions[user_id] = version
+        self._queued()
+    
+    def delete(self, user_id: str) -> bool:
+        """Queue deletion of the session and its messages"""
+        exists = self.load(user_id) is not None
+        self._cache.pop(user_id)
+        self._versions.pop(user_id, None)
+        with self._lock:
+            self._unflushed.pop(user_id, None)
+            self._pending_sessions.pop(user_id, None)
+            self._pending_versions.pop(user_id, None)
+            self._pending_messages = [row for row in self._pending_messages if row[0] != user_id]
+            self._pending_deletes.append(user_id)
+        self._wake.set()
+        return exists
+    
+    def add_authenticated_user(self, user_id: str):
+        """Record a login and commit it"""
+        self._authenticated.add(user_id)
+        with self._lock:
+            self._pending_users.append(user_id)
+        # Commit right away so the user's next request can go to any worker
+        self._wake.set()
+    
+    def is_authenticated(self, user_id: str) -> bool:
+        """Check logins made on any worker"""
+        if user_id in self._authenticated:
+            return True
+        with self._db_lock:
+            row = self._db.execute("SELECT 1 FROM authenticated_users WHERE user_id = ?", (user_id,)).fetchone()
+        if row is not None:
+            self._authenticated.add(user_id)
+        return row is not None
+    
+    def _queued(self):
+        """Commit right away once enough writes are queued"""
+        with self._lock:
+            queued = len(self._pending_sessions) + len(self._pending_versions) + len(self._pending_messages)
+        if queued >= self.batch_size:
+            self._wake.set()
+    
+    def _run_writer(self):
+        """Commit queued writes every flush interval until the store is closed"""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                waiters, self._commit_waiters = self._commit_waiters, []
+            self.flush()
+            for waiter in waiters:
+                waiter.set_result(None)
+    
+    def _commit_soon(self) -> Future:
+        """
+        Ask the writer thread to commit everything queued so far.
+        
+        Returns:
+            Future: Resolved once the writes are committed
+        """
+        waiter: Future = Future()
+        with self._lock:
+            if self._closed:
+                waiter.set_result(None)
+                return waiter
+            self._commit_waiters.append(waiter)
+        self._wake.set()
+        return waiter
+    
+    def flush(self):
+        """Commit every queued write in one transaction"""
+        with self._flush_lock:
+            self._flush()
+    
+    async def flush_async(self):
+        """Have the writer thread commit every queued write and wait for it"""
+        await asyncio.wrap_future(self._commit_soon())
+    
+    def _flush(self):
+        """Commit every queued write; the caller holds the flush lock"""
+        with self._lock:
+            sessions, self._pending_sessions = self._pending_sessions, {}
+            versions, self._pending_versions = self._pending_versions, {}
+            messages, self._pending_messages = self._pending_messages, []
+            users, self._pending_users = self._pending_users, []
+            deletes, self._pending_deletes = self._pending_deletes, []
+            # Loads keep serving the cached sessions until these writes are committed
+            self._inflight = set(sessions) | set(versions) | {row[0] for row in messages}
+        if not (sessions or versions or messages or users or deletes):
+            return
+        
+        committed: Dict[str, str] = {}
+        conflicts: List[str] = []
+        try:
+            with self._writer_db:
+                # Take the write lock up front so no worker writes between the version check and the write
+                self._writer_db.execute("BEGIN IMMEDIATE")
+                self._writer_db.executemany(
+                    "DELETE FROM messages WHERE user_id = ?", [(user_id,) for user_id in deletes]
+                )
+                self._writer_db.executemany(
+                    "DELETE FROM sessions WHERE user_id = ?", [(user_id,) for user_id in deletes]
+                )
+                for user_id, (written, fields, version) in sessions.items():
+                    row = self._writer_db.execute(
+                        "SELECT data, version FROM sessions WHERE user_id = ?", (user_id,)
+                    ).fetchone()
+                    if row is not None and row[1] != self._versions.get(user_id):
+                        # Another worker changed the session; apply only the fields changed here
+                        fields = _merge_fields(_session_fields(json.loads(row[0])), written, fields)
+                        conflicts.append(user_id)
+                    self._writer_db.execute(
+                        "INSERT INTO sessions (user_id, data, version) VALUES (?, ?, ?) "
+                        "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, version = excluded.version",
+                        (user_id, json.dumps(_session_data(fields)), version)
+                    )
+                    committed[user_id] = version
+                for user_id, version in versions.items():
+                    row = self._writer_db.execute(
+                        "SELECT version FROM sessions WHERE user_id = ?", (user_id,)
+                    ).fetchone()
+                    if row is not None and row[0] != self._versions.get(user_id):
+                        conflicts.append(user_id)
+                    self._writer_db.execute("UPDATE sessions SET version = ? WHERE user_id = ?", (version, user_id))
+                    committed[user_id] = version
+                self._writer_db.executemany(
+                    "INSERT INTO messages (user_id, case_id, role, content, timestamp, seq) VALUES (?, ?, ?, ?, ?, ?)",
+                    messages
+                )
+                self._writer_db.executemany(
+                    "INSERT OR IGNORE INTO authenticated_users (user_id) VALUES (?)", [(user_id,) for user_id in users]
+                )
+        except sqlite3.Error as e:
+            print(f"Error writing sessions to {self.path}, retrying with the next batch: {e}")
+            with self._lock:
+                for user_id, (written, fields, version) in sessions.items():
+                    pending = self._pending_sessions.get(user_id)
+                    if pending is None:
+                        self._pending_sessions[user_id] = (written, fields, version)
+                    else:
+                        # Keep diffing against the fields that are still in the database
+                        self._pending_sessions[user_id] = (written,) + pending[1:]
+                for user_id, version in versions.items():
+                    self._pending_versions.setdefault(user_id, version)
+                self._pending_messages[:0] = messages
+                self._pending_users[:0] = users
+                self._pending_deletes[:0] = deletes
+                self._inflight = set()
+            return
+        
+        with self._lock:
+            self._inflight = set()
+            for user_id in conflicts:
+                # Reload the other worker's changes, unless newer changes here are still queued
+                if not self._has_unflushed(user_id):
+                    self._cache.pop(user_id)
+                    self._unflushed.pop(user_id, None)
+                committed.pop(user_id)
+            self._versions.update(committed)
+            for user_id in list(self._unflushed):
+                if not self._has_unflushed(user_id):
+                    del self._unflushed[user_id]
+    
+    def close(self):
+        """Stop the writer thread and commit the remaining writes"""
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+            waiters, self._commit_waiters = self._commit_waiters, []
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        for waiter in waiters:
+            waiter.set_result(None)
+        self._writer_db.close()
+        self._db.close()
+
+
+def _session_fields(data: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Flatten a session, except its transcripts, into JSON fields.
+    
+    Per-case attributes become one field per case, e.g. "live_summaries:case_1",
+    and completed cases one field each, so a write only replaces what it changed.
+    
+    Args:
+        data (Dict[str, Any]): Session dumped in JSON mode
+    
+    Returns:
+        Dict[str, str]: JSON value by field name
+    """
+    fields = {}
+    for name, value in data.items():
+        if name in CASE_ATTRIBUTES:
+            for case_id, case_value in value.items():
+                fields[f"{name}:{case_id}"] = json.dumps(case_value, sort_keys=True)
+        elif name == "completed_cases":
+            for case_id in value:
+                fields[f"{name}:{case_id}"] = ""
+        else:
+            fields[name] = json.dumps(value)
+    return fields
+
+
+def _session_data(fields: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Rebuild the session data flattened by _session_fields.
+    
+    Args:
+        fields (Dict[str, str]): JSON value by field name
+    
+    Returns:
+        Dict[str, Any]: Session data for UserSession.model_validate
+    """
+    data: Dict[str, Any] = {}
+    for name, value in fields.items():
+        attribute, separator, case_id = name.partition(":")
+        if attribute == "completed_cases":
+            data.setdefault(attribute, []).append(case_id)
+        elif separator:
+            data.setdefault(attribute, {})[case_id] = json.loads(value)
+        else:
+            data[attribute] = json.loads(value)
+    return data
+
+
+def _merge_fields(stored: Dict[str, str], written: Dict[str, str], fields: Dict[str, str]) -> Dict[str, str]:
+    """
+    Apply the fields changed since they were last read or written over the stored fields.
+    
+    Args:
+        stored (Dict[str, str]): Fields currently in the database
+        written (Dict[str, str]): Fields as this worker last read or wrote them
+        fields (Dict[str, str]): Fields to write
+    
+    Returns:
+        Dict[str, str]: Stored fields with this worker's changes
+    """
+    merged = dict(stored)
+    for name, value in fields.items():
+        if written.get(name) != value:
+            merged[name] = value
+    for name in written:
+        if name not in fields:
+            merged.pop(name, None)
+    return merged
+
+
+def create_session_store(name: str = SESSION_STORE) -> SessionStore:
+    """
+    Create the configured session store.
+    
+    Args:
+        name (str): "memory", "sqlite" or "redis"
+    
+    Returns:
+        SessionStore: Session store
+    
+    Raises:
+        ValueError: If the store name is unknown
+    """
+    if name == "memory":
+        return MemorySessionStore()
+    if name == "sqlite":
+        return SQLiteSessionStore()
+    if name == "redis":
+        # Imported here so the redis package is only needed when it is used
+        from services.redis_session_store import RedisSessionStore
+        return RedisSessionStore()
+    raise ValueError(f"Unknown session store: {name}")
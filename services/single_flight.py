@@ -0,0 +1,75 @@
+"""
+Single-flight request coalescing for Emergency Medicine Case Simulator
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Runs one call per key at a time, sharing its result with concurrent callers"""
+    
+    def __init__(self):
+        """Initialize in-flight call registry"""
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.coalesced = 0
+    
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a call, or join the identical call already in flight.
+        
+        The call runs as its own task, so it completes for the remaining callers
+        even if the caller that started it is cancelled. It is cancelled once
+        every caller has been, e.g. after all of their clients disconnected.
+        
+        Args:
+            key (str): Request fingerprint
+            call (Callable[[], Awaitable[Any]]): Coroutine function making the request
+        
+        Returns:
+            Any: Result of the shared call
+        
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+    
+    def _forget(self, key: str, task: asyncio.Task):
+        """
+        Remove a finished call so later requests start a new one.
+        
+        Args:
+            key (str): Request fingerprint
+            task (asyncio.Task): Finished call
+        """
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the error as retrieved when every caller was cancelled before it finished
+        if not task.cancelled():
+            task.exception()
+    
+    def get_in_flight(self) -> int:
+        """
+        Get the number of distinct calls in flight.
+        
+        Returns:
+            int: In-flight calls
+        """
+        return len(self._calls)
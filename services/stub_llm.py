@@ -0,0 +1,380 @@
+"""
+Stub LLM backend for Emergency Medicine Case Simulator
+
+Answers chat completions requests, streaming included, without calling OpenAI
+so the app can be tested and load-tested hermetically. Runs in-process when
+LLM_BACKEND=stub, or as a local server for OPENAI_BASE_URL:
+
+    python -m services.stub_llm --port 8001
+    OPENAI_BASE_URL=http://localhost:8001/v1 uvicorn src.main:app
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import httpx
+from services.token_counter import count_message_tokens
+from config.llm_config import (
+    LLM_STUB_LATENCY,
+    LLM_STUB_TOKENS_PER_SECOND,
+    LLM_STUB_ERROR_RATE,
+    LLM_STUB_ERROR_STATUS,
+    LLM_STUB_RESPONSES,
+    LLM_STUB_SEED,
+    MODEL_TIERS
+)
+
+DEFAULT_RESPONSE_TEMPLATE = "Nurse: Stub response from {model} to: {last_message}"
+
+ERROR_TYPES = {429: "rate_limit_error", 500: "server_error", 503: "server_error"}
+
+# Response parts: seconds to wait before each part, then its bytes
+ResponsePlan = Tuple[int, Dict[str, str], List[Tuple[float, bytes]]]
+
+
+class LatencyDistribution:
+    """Samples latencies from a spec such as "fixed:0.2", "uniform:0.1,0.5" or "lognormal:-0.7,0.5" """
+    
+    def __init__(self, spec: str, rng: random.Random):
+        """
+        Initialize latency distribution.
+        
+        Args:
+            spec (str): "fixed:SECONDS", "uniform:LOW,HIGH" or "lognormal:MU,SIGMA"
+                (median e^MU seconds)
+            rng (random.Random): Random number generator
+        
+        Raises:
+            ValueError: If the spec is not recognized
+        """
+        kind, _, params = spec.partition(":")
+        try:
+            self.values = [float(value) for value in params.split(",") if value.strip()]
+        except ValueError:
+            raise ValueError(f"Invalid latency distribution: {spec}")
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if expected.get(kind) != len(self.values):
+            raise ValueError(f"Invalid latency distribution: {spec}")
+        self.kind = kind
+        self.rng = rng
+    
+    def sample(self) -> float:
+        """
+        Draw one latency.
+        
+        Returns:
+            float: Seconds
+        """
+        if self.kind == "fixed":
+            return self.values[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.values)
+        return self.rng.lognormvariate(*self.values)
+
+
+class StubLLM:
+    """In-process stand-in for the chat completions API"""
+    
+    def __init__(self, latency: str = LLM_STUB_LATENCY, tokens_per_second: float = LLM_STUB_TOKENS_PER_SECOND,
+                 error_rate: float = LLM_STUB_ERROR_RATE, error_status: int = LLM_STUB_ERROR_STATUS,
+                 responses_path: str = LLM_STUB_RESPONSES, seed: Optional[int] = LLM_STUB_SEED):
+        """
+        Initialize stub backend.
+        
+        Args:
+            latency (str): Distribution of the time to the first token, see LatencyDistribution
+            tokens_per_second (float): Generation speed after the first token, unlimited if 0
+            error_rate (float): Fraction of requests answered with error_status
+            error_status (int): HTTP status of injected errors, e.g. 429 or 500
+            responses_path (str): JSON file of {"match": regex, "response": template} rules,
+                tried in order against the last message
+            seed (Optional[int]): Seed for reproducible latencies and errors
+        """
+        self.rng = random.Random(seed)
+        self.latency = LatencyDistribution(latency, self.rng)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rules = self._load_rules(responses_path) if responses_path else []
+        self.requests = 0
+    
+    def _load_rules(self, path: str) -> List[Tuple[re.Pattern, str]]:
+        """
+        Load scripted response rules.
+        
+        Args:
+            path (str): JSON file path
+        
+        Returns:
+            List[Tuple[re.Pattern, str]]: Compiled pattern and response template per rule
+        """
+        with open(path, encoding="utf-8") as f:
+            rules = json.load(f)
+        return [(re.compile(rule.get("match", ""), re.IGNORECASE), rule["response"]) for rule in rules]
+    
+    def render(self, body: Dict[str, Any]) -> str:
+        """
+        Produce the response text for a request.
+        
+        Templates may use {model}, {last_message}, {turn} (number of user messages)
+        and {request} (number of requests the stub has answered, this one included).
+        
+        Args:
+            body (Dict[str, Any]): Chat completions request body
+        
+        Returns:
+            str: Response text
+        """
+        messages = body.get("messages", [])
+        last_message = messages[-1]["content"] if messages else ""
+        template = DEFAULT_RESPONSE_TEMPLATE
+        for pattern, response in self.rules:
+            if pattern.search(last_message):
+                template = response
+                break
+        
+        return template.format(
+            model=body.get("model", ""),
+            last_message=" ".join(last_message.split())[:200],
+            turn=sum(1 for msg in messages if msg["role"] == "user"),
+            request=self.requests
+        )
+    
+    def plan(self, body: Dict[str, Any]) -> Tuple[float, ResponsePlan]:
+        """
+        Decide the response to a request and its timing.
+        
+        Args:
+            body (Dict[str, Any]): Chat completions request body
+        
+        Returns:
+            Tuple[float, ResponsePlan]: Seconds before the response headers, then
+                status, headers and timed body parts
+        """
+        self.requests += 1
+        first_token_delay = self.latency.sample()
+        
+        if self.error_rate and self.rng.random() < self.error_rate:
+            error = {
+                "error": {
+                    "message": f"Stub error {self.error_status}",
+                    "type": ERROR_TYPES.get(self.error_status, "invalid_request_error"),
+                    "code": None
+                }
+            }
+            headers = {"content-type": "application/json", "retry-after": "1"}
+            return first_token_delay, (self.error_status, headers, [(0.0, json.dumps(error).encode("utf-8"))])
+        
+        model = body.get("model", "stub")
+        content = self.render(body)
+        # One word per streamed chunk and per completion token
+        pieces = re.findall(r"\S+\s*", content) or [content]
+        token_delay = 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+        usage = {
+            "prompt_tokens": count_message_tokens(body.get("messages", []), model),
+            "completion_tokens": len(pieces),
+            "prompt_tokens_details": {"cached_tokens": 0}
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        response_id = f"chatcmpl-stub-{uuid.uuid4().hex}"
+        created = int(time.time())
+        
+        if not body.get("stream"):
+            completion = {
+                "id": response_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+            generation_time = token_delay * len(pieces)
+            return first_token_delay + generation_time, (
+                200, {"content-type": "application/json"}, [(0.0, json.dumps(completion).encode("utf-8"))]
+            )
+        
+        def chunk(delta: Dict[str, str], finish_reason: Optional[str] = None, chunk_usage: Optional[Dict] = None) -> bytes:
+            choices = [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+            data = {
+                "id": response_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                "usage": chunk_usage
+            }
+            return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+        
+        parts = [(0.0, chunk({"role": "assistant", "content": ""}))]
+        parts += [(token_delay if index else 0.0, chunk({"content": piece})) for index, piece in enumerate(pieces)]
+        parts.append((0.0, chunk({}, "stop")))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            parts.append((0.0, chunk(None, chunk_usage=usage)))
+        parts.append((0.0, b"data: [DONE]\n\n"))
+        return first_token_delay, (200, {"content-type": "text/event-stream"}, parts)
+    
+    def list_models(self) -> Dict[str, Any]:
+        """
+        Build a models list response naming every configured model tier.
+        
+        Returns:
+            Dict[str, Any]: Body of GET /v1/models
+        """
+        models = sorted({tier[role] for tier in MODEL_TIERS.values() for role in ("primary", "fallback")})
+        return {
+            "object": "list",
+            "data": [{"id": model, "object": "model", "created": 0, "owned_by": "stub"} for model in models]
+        }
+    
+    def _parse(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        """
+        Read the body of a chat completions request.
+        
+        Args:
+            request (httpx.Request): Request sent by the OpenAI client
+        
+        Returns:
+            Optional[Dict[str, Any]]: Request body, None for other endpoints
+        """
+        if not request.url.path.endswith("/chat/completions"):
+            return None
+        return json.loads(request.content)
+    
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a request from the sync OpenAI client.
+        
+        Args:
+            request (httpx.Request): HTTP request
+        
+        Returns:
+            httpx.Response: Stub response
+        """
+        if request.url.path.endswith("/models"):
+            return httpx.Response(200, json=self.list_models())
+        body = self._parse(request)
+        if body is None:
+            return httpx.Response(404, json={"error": {"message": "Not found"}})
+        
+        delay, (status, headers, parts) = self.plan(body)
+        time.sleep(delay)
+        if len(parts) == 1:
+            return httpx.Response(status, headers=headers, content=parts[0][1])
+        
+        def stream() -> Iterator[bytes]:
+            for part_delay, data in parts:
+                if part_delay:
+                    time.sleep(part_delay)
+                yield data
+        
+        return httpx.Response(status, headers=headers, content=stream())
+    
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a request from the async OpenAI client.
+        
+        Args:
+            request (httpx.Request): HTTP request
+        
+        Returns:
+            httpx.Response: Stub response
+        """
+        if request.url.path.endswith("/models"):
+            return httpx.Response(200, json=self.list_models())
+        body = self._parse(request)
+        if body is None:
+            return httpx.Response(404, json={"error": {"message": "Not found"}})
+        
+        delay, (status, headers, parts) = self.plan(body)
+        await asyncio.sleep(delay)
+        if len(parts) == 1:
+            return httpx.Response(status, headers=headers, content=parts[0][1])
+        return httpx.Response(status, headers=headers, content=self.stream_parts(parts))
+    
+    async def stream_parts(self, parts: List[Tuple[float, bytes]]) -> AsyncIterator[bytes]:
+        """
+        Yield response parts at their scheduled pace.
+        
+        Args:
+            parts (List[Tuple[float, bytes]]): Timed body parts
+        
+        Yields:
+            bytes: Body parts
+        """
+        for part_delay, data in parts:
+            if part_delay:
+                await asyncio.sleep(part_delay)
+            yield data
+    
+    def transport(self) -> httpx.MockTransport:
+        """
+        Get a transport for httpx.Client (the sync OpenAI client).
+        
+        Returns:
+            httpx.MockTransport: Transport answering from this stub
+        """
+        return httpx.MockTransport(self.handle)
+    
+    def async_transport(self) -> httpx.MockTransport:
+        """
+        Get a transport for httpx.AsyncClient (the async OpenAI client).
+        
+        Returns:
+            httpx.MockTransport: Transport answering from this stub
+        """
+        return httpx.MockTransport(self.handle_async)
+
+
+def create_app(stub: StubLLM):
+    """
+    Create an HTTP server app speaking the chat completions protocol.
+    
+    Args:
+        stub (StubLLM): Stub producing the responses
+    
+    Returns:
+        FastAPI: Server app
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import Response, StreamingResponse
+    
+    app = FastAPI(title="Stub LLM")
+    
+    @app.get("/v1/models")
+    async def models():
+        # Listed by the app's connection warm-up at startup
+        return stub.list_models()
+    
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        delay, (status, headers, parts) = stub.plan(await request.json())
+        await asyncio.sleep(delay)
+        if len(parts) == 1:
+            return Response(parts[0][1], status_code=status, headers=headers)
+        return StreamingResponse(stub.stream_parts(parts), status_code=status, headers=headers)
+    
+    return app
+
+
+def main():
+    """Run the stub as a local HTTP server"""
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Serve a stub chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    uvicorn.run(create_app(StubLLM()), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+"""
+Summary service for Emergency Medicine Case Simulator
+"""
+
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from models.schemas import LiveSummary, FinalSummary
+from services.openai_service import OpenAIService, SUMMARY_ERROR_PREFIX, CONVERSATION_SUMMARY_ERROR_PREFIX
+from services.session_service import SessionService
+from services.case_data_service import CaseDataService, compose_summary
+from services.usage_tracker import attribute_usage
+from config.case_config import (
+    SUMMARY_SYSTEM_PROMPT,
+    INCREMENTAL_SUMMARY_SYSTEM_PROMPT,
+    NARRATIVE_SUMMARY_SYSTEM_PROMPT,
+    INCREMENTAL_NARRATIVE_SUMMARY_SYSTEM_PROMPT,
+    FINAL_SUMMARY_PROMPT
+)
+from config.llm_config import (
+    SUMMARY_INCREMENTAL_ENABLED,
+    SUMMARY_FULL_REBUILD_INTERVAL,
+    SUMMARY_STRUCTURED_EXTRACTION_ENABLED,
+    SUMMARY_WAIT_POLL_INTERVAL_SECONDS,
+    SUMMARY_FINAL_WAIT_SECONDS,
+    SUMMARY_FINAL_ORPHAN_SECONDS
+)
+
+
+class SummaryService:
+    """Service for generating live and final case summaries off the request path"""
+    
+    def __init__(self, openai_service: OpenAIService, session_service: SessionService,
+                 case_data_service: Optional[CaseDataService] = None):
+        """
+        Initialize summary service.
+        
+        Args:
+            openai_service (OpenAIService): Service used to generate summaries
+            session_service (SessionService): Service holding transcripts and summaries
+            case_data_service (Optional[CaseDataService]): Renders vitals, labs and imaging
+                sections locally; the LLM summarizes everything when omitted
+        """
+        self.openai_service = openai_service
+        self.session_service = session_service
+        self.case_data_service = case_data_service
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._updated: Dict[Tuple[str, str], asyncio.Event] = {}
+        self._final_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._final_updated: Dict[Tuple[str, str], asyncio.Event] = {}
+        # Loop time final summaries were first seen pending with no task on this worker
+        self._orphaned_since: Dict[Tuple[str, str], float] = {}
+    
+    def schedule_live_summary(self, user_id: str, case_id: str) -> LiveSummary:
+        """
+        Schedule a background refresh of the live summary for a case.
+        
+        A refresh already running for the case summarizes a transcript that is now
+        out of date, so it is cancelled and its result dropped. Sections backed by
+        structured case data are re-rendered immediately.
+
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            LiveSummary: Current (possibly stale) live summary, flagged as pending
+        """
+        key = (user_id, case_id)
+        live_summary = self.session_service.set_live_summary_pending(user_id, case_id)
+        if self._uses_structured_data(case_id):
+            live_summary = self._refresh_structured_sections(user_id, case_id)
+
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            # Cancelling stops the upstream LLM call of the superseded refresh
+            task.cancel()
+        self._tasks[key] = asyncio.create_task(self._run_live_summary(key))
+        
+        return live_summary
+    
+    async def _run_live_summary(self, key: Tuple[str, str]):
+        """
+        Regenerate the live summary for the current transcript.
+        
+        Args:
+            key (Tuple[str, str]): (user_id, case_id)
+        """
+        user_id, case_id = key
+        structured = self._uses_structured_data(case_id)
+        try:
+            chat_history = self.session_service.get_transcript(user_id, case_id).view()
+            message_count = len(chat_history)
+            current = self.session_service.get_live_summary(user_id, case_id)
+            
+            if self._can_update_incrementally(current, message_count):
+                if message_count == current.message_count:
+                    llm_summary, incremental, failed = current.llm_summary, True, False
+                else:
+                    llm_summary, incremental, failed = await self._update_incrementally(
+                        current, chat_history, structured
+                    )
+            else:
+                llm_summary = await self.openai_service.generate_case_summary_async(
+                    chat_history,
+                    NARRATIVE_SUMMARY_SYSTEM_PROMPT if structured else SUMMARY_SYSTEM_PROMPT
+                )
+                incremental, failed = False, llm_summary.startswith(SUMMARY_ERROR_PREFIX)
+            
+            summary = llm_summary
+            if structured:
+                if failed:
+                    llm_summary = current.llm_summary
+                sections = self.case_data_service.render_structured_sections(case_id, chat_history)
+                summary = compose_summary(sections, llm_summary)
+            
+            self.session_service.set_live_summary(
+                user_id, case_id, summary, message_count,
+                incremental=incremental, failed=failed, llm_summary=llm_summary
+            )
+            self._notify(key)
+        except Exception as e:
+            print(f"Error generating live summary for {user_id}/{case_id}: {e}")
+            self.session_service.set_live_summary_pending(user_id, case_id, pending=False)
+            self._notify(key)
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+    
+    def schedule_final_summary(self, user_id: str, case_id: str, force: bool = False) -> FinalSummary:
+        """
+        Schedule background generation of the final summary for a completed case.
+        
+        Nothing is scheduled if the stored summary already covers the transcript
+        or is being generated; failed summaries are generated again.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            force (bool): Generate the summary even if the stored one covers the transcript
+        
+        Returns:
+            FinalSummary: Current final summary, flagged as pending if one was scheduled
+        """
+        key = (user_id, case_id)
+        current = self.session_service.get_final_summary(user_id, case_id)
+        task = self._final_tasks.get(key)
+        if task is not None and not task.done():
+            return current
+        
+        message_count = len(self.session_service.get_transcript(user_id, case_id))
+        if not force and current.version > 0 and not current.failed and current.message_count == message_count:
+            return current
+        
+        final_summary = self.session_service.set_final_summary_pending(user_id, case_id)
+        # The task inherits the attribution, also when scheduled for several cases at once
+        attribute_usage(user_id, case_id)
+        self._final_tasks[key] = asyncio.create_task(self._run_final_summary(key))
+        return final_summary
+    
+    async def stream_final_summaries(self, user_id: str, case_ids: List[str]) -> AsyncIterator[Tuple[str, FinalSummary]]:
+        """
+        Generate the final summaries of several cases concurrently, yielding each once ready.
+        
+        Summaries that are missing are generated in parallel, bounded by the shared
+        OpenAI limiter, so the last one arrives after the slowest case rather than
+        the sum of all of them. Generation continues if the caller stops early.
+        
+        Args:
+            user_id (str): User ID
+            case_ids (List[str]): Completed case IDs
+        
+        Yields:
+            Tuple[str, FinalSummary]: (case_id, final summary) in the order they are ready
+        """
+        for case_id in case_ids:
+            self.schedule_final_summary(user_id, case_id)
+        
+        waits = [asyncio.ensure_future(self._wait_until_final(user_id, case_id)) for case_id in case_ids]
+        try:
+            for wait in asyncio.as_completed(waits):
+                yield await wait
+        finally:
+            for wait in waits:
+                wait.cancel()
+    
+    async def _wait_until_final(self, user_id: str, case_id: str) -> Tuple[str, FinalSummary]:
+        """
+        Wait until the final summary of a case is no longer being generated.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            Tuple[str, FinalSummary]: (case_id, final summary), still pending if
+                it was not ready within SUMMARY_FINAL_WAIT_SECONDS
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SUMMARY_FINAL_WAIT_SECONDS
+        final_summary = self.session_service.get_final_summary(user_id, case_id)
+        while final_summary.pending and loop.time() < deadline:
+            final_summary = await self.wait_for_final_summary(
+                user_id, case_id, final_summary.version, timeout=min(deadline - loop.time(), 30.0)
+            )
+        return case_id, final_summary
+    
+    def _adopt_orphaned_final_summary(self, user_id: str, case_id: str, final_summary: FinalSummary) -> FinalSummary:
+        """
+        Generate a final summary again if it has been pending too long with no task here.
+        
+        The pending flag is stored with the session, so it stays set if the worker
+        generating the summary stops before finishing it.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            final_summary (FinalSummary): Stored final summary
+        
+        Returns:
+            FinalSummary: Final summary, flagged as pending if it was scheduled again
+        """
+        key = (user_id, case_id)
+        if not final_summary.pending or key in self._final_tasks:
+            self._orphaned_since.pop(key, None)
+            return final_summary
+        
+        now = asyncio.get_running_loop().time()
+        if now - self._orphaned_since.setdefault(key, now) < SUMMARY_FINAL_ORPHAN_SECONDS:
+            return final_summary
+        del self._orphaned_since[key]
+        print(f"Final summary for {user_id}/{case_id} pending for {SUMMARY_FINAL_ORPHAN_SECONDS}s with no task, generating it again")
+        return self.schedule_final_summary(user_id, case_id, force=True)
+    
+    async def _run_final_summary(self, key: Tuple[str, str]):
+        """
+        Generate the final summary until it covers the latest transcript.
+        
+        Args:
+            key (Tuple[str, str]): (user_id, case_id)
+        """
+        user_id, case_id = key
+        try:
+            while True:
+                chat_history = self.session_service.get_transcript(user_id, case_id).view()
+                message_count = len(chat_history)
+                summary = await self.openai_service.generate_conversation_summary_async(
+                    chat_history, FINAL_SUMMARY_PROMPT
+                )
+                
+                # The case was restarted and completed again while generating
+                stale = len(self.session_service.get_transcript(user_id, case_id)) != message_count
+                self.session_service.set_final_summary(
+                    user_id, case_id, summary, message_count,
+                    pending=stale, failed=summary.startswith(CONVERSATION_SUMMARY_ERROR_PREFIX)
+                )
+                self._notify(key, self._final_updated)
+                
+                if not stale:
+                    break
+        except Exception as e:
+            print(f"Error generating final summary for {user_id}/{case_id}: {e}")
+            self.session_service.set_final_summary_pending(user_id, case_id, pending=False)
+            self._notify(key, self._final_updated)
+        finally:
+            if self._final_tasks.get(key) is asyncio.current_task():
+                del self._final_tasks[key]
+    
+    async def generate_full_summary(self, case_id: str, chat_history: Sequence[Dict[str, str]]) -> Tuple[str, str]:
+        """
+        Summarize a transcript from scratch, outside of any session.
+        
+        Args:
+            case_id (str): Case ID
+            chat_history (Sequence[Dict[str, str]]): Transcript to summarize
+        
+        Returns:
+            Tuple[str, str]: (summary, llm_summary) as stored on LiveSummary
+        
+        Raises:
+            Exception: If the summary could not be generated
+        """
+        structured = self._uses_structured_data(case_id)
+        llm_summary = await self.openai_service.generate_case_summary_async(
+            chat_history,
+            NARRATIVE_SUMMARY_SYSTEM_PROMPT if structured else SUMMARY_SYSTEM_PROMPT
+        )
+        if llm_summary.startswith(SUMMARY_ERROR_PREFIX):
+            raise Exception(llm_summary)
+        
+        if not structured:
+            return llm_summary, llm_summary
+        
+        sections = self.case_data_service.render_structured_sections(case_id, chat_history)
+        return compose_summary(sections, llm_summary), llm_summary
+    
+    def _uses_structured_data(self, case_id: str) -> bool:
+        """
+        Check whether part of the summary for a case can be rendered locally.
+        
+        Args:
+            case_id (str): Case ID
+        
+        Returns:
+            bool: True if structured sections are rendered by CaseDataService
+        """
+        return (
+            SUMMARY_STRUCTURED_EXTRACTION_ENABLED
+            and self.case_data_service is not None
+            and self.case_data_service.has_structured_data(case_id)
+        )
+    
+    def _refresh_structured_sections(self, user_id: str, case_id: str) -> LiveSummary:
+        """
+        Re-render the structured sections against the latest transcript.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            LiveSummary: Current live summary
+        """
+        chat_history = self.session_service.get_transcript(user_id, case_id).view()
+        current = self.session_service.get_live_summary(user_id, case_id)
+        sections = self.case_data_service.render_structured_sections(case_id, chat_history)
+        summary = compose_summary(sections, current.llm_summary)
+        
+        if summary and self.session_service.set_structured_summary(user_id, case_id, summary) is not None:
+            self._notify((user_id, case_id))
+        return self.session_service.get_live_summary(user_id, case_id)
+    
+    def _can_update_incrementally(self, current: LiveSummary, message_count: int) -> bool:
+        """
+        Check whether the stored summary can be updated with only the new messages.
+        
+        Args:
+            current (LiveSummary): Stored live summary
+            message_count (int): Current transcript length
+        
+        Returns:
+            bool: True for an incremental update, False for a full rebuild
+        """
+        return (
+            SUMMARY_INCREMENTAL_ENABLED
+            and not current.needs_full_rebuild
+            and current.updates_since_rebuild < SUMMARY_FULL_REBUILD_INTERVAL
+            and 0 < current.message_count <= message_count
+        )
+    
+    async def _update_incrementally(self, current: LiveSummary, chat_history: Sequence[Dict[str, str]],
+                                    structured: bool = False) -> Tuple[str, bool, bool]:
+        """
+        Update the stored LLM summary with the messages added since it was generated.
+        
+        Args:
+            current (LiveSummary): Stored live summary
+            chat_history (Sequence[Dict[str, str]]): Full transcript
+            structured (bool): Whether the LLM only summarizes the narrative sections
+        
+        Returns:
+            Tuple[str, bool, bool]: (summary, incremental, failed)
+        """
+        new_messages = chat_history[current.message_count:]
+        try:
+            summary = await self.openai_service.update_case_summary_async(
+                current.llm_summary, new_messages,
+                INCREMENTAL_NARRATIVE_SUMMARY_SYSTEM_PROMPT if structured else INCREMENTAL_SUMMARY_SYSTEM_PROMPT
+            )
+            return summary, True, False
+        except Exception as e:
+            print(f"Incremental summary update failed, rebuilding from full transcript: {e}")
+        
+        summary = await self.openai_service.generate_case_summary_async(
+            chat_history,
+            NARRATIVE_SUMMARY_SYSTEM_PROMPT if structured else SUMMARY_SYSTEM_PROMPT
+        )
+        return summary, False, summary.startswith(SUMMARY_ERROR_PREFIX)
+    
+    def _notify(self, key: Tuple[str, str], events: Optional[Dict[Tuple[str, str], asyncio.Event]] = None):
+        """
+        Wake up any request waiting for a summary update.
+        
+        Args:
+            key (Tuple[str, str]): (user_id, case_id)
+            events (Optional[Dict[Tuple[str, str], asyncio.Event]]): Events of the updated
+                summary, the live summary events by default
+        """
+        event = (self._updated if events is None else events).pop(key, None)
+        if event is not None:
+            event.set()
+    
+    async def wait_for_live_summary(self, user_id: str, case_id: str, since_version: int, timeout: float) -> LiveSummary:
+        """
+        Wait until the live summary is newer than a known version.
+        
+        Refreshes on this worker wake the wait right away. The store is re-checked
+        every SUMMARY_WAIT_POLL_INTERVAL_SECONDS for refreshes made by other workers.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            since_version (int): Version already seen by the client
+            timeout (float): Maximum seconds to wait
+        
+        Returns:
+            LiveSummary: Latest live summary (unchanged if the timeout expired)
+        """
+        key = (user_id, case_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        
+        while True:
+            live_summary = self.session_service.get_live_summary(user_id, case_id)
+            remaining = deadline - loop.time()
+            if live_summary.version > since_version or not live_summary.pending or remaining <= 0:
+                return live_summary
+            
+            event = self._updated.setdefault(key, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, SUMMARY_WAIT_POLL_INTERVAL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+    
+    async def wait_for_final_summary(self, user_id: str, case_id: str, since_version: int, timeout: float) -> FinalSummary:
+        """
+        Wait until the final summary is newer than a known version.
+        
+        Like wait_for_live_summary, the store is re-checked every
+        SUMMARY_WAIT_POLL_INTERVAL_SECONDS for summaries finished by other workers.
+        A summary left pending by a worker that stopped is generated again here.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+            since_version (int): Version already seen by the client
+            timeout (float): Maximum seconds to wait
+        
+        Returns:
+            FinalSummary: Latest final summary (unchanged if the timeout expired)
+        """
+        key = (user_id, case_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        
+        while True:
+            final_summary = self._adopt_orphaned_final_summary(
+                user_id, case_id, self.session_service.get_final_summary(user_id, case_id)
+            )
+            remaining = deadline - loop.time()
+            if final_summary.version > since_version or not final_summary.pending or remaining <= 0:
+                return final_summary
+            
+            event = self._final_updated.setdefault(key, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, SUMMARY_WAIT_POLL_INTERVAL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,77 @@
+"""
+Token counting for Emergency Medicine Case Simulator
+"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Approximate characters per token when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Encoding used for models tiktoken does not know
+FALLBACK_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """
+    Load the local tokenizer for a model.
+    
+    Args:
+        model (str): Model name
+    
+    Returns:
+        tiktoken.Encoding or None if no tokenizer is available
+    """
+    if tiktoken is None:
+        return None
+    
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        # Encoding files are downloaded on first use and may be unavailable offline
+        print(f"Warning: Could not load tokenizer for {model}, estimating token counts: {e}")
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str, model: str) -> int:
+    """
+    Count the tokens of a text for a model.
+    
+    Args:
+        text (str): Text to count
+        model (str): Model name
+    
+    Returns:
+        int: Token count (estimated from length without a tokenizer)
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str) -> int:
+    """
+    Count the tokens of chat completion messages.
+    
+    Args:
+        messages (List[Dict[str, str]]): Messages with role and content
+        model (str): Model name
+    
+    Returns:
+        int: Token count including per-message overhead
+    """
+    return sum(count_tokens(msg["content"], model) + MESSAGE_OVERHEAD_TOKENS for msg in messages)
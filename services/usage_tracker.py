@@ -0,0 +1,169 @@
+"""
+LLM usage accounting for Emergency Medicine Case Simulator
+"""
+
+import threading
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from models.schemas import LLMCallRecord
+from services.model_router import percentile
+from config.llm_config import USAGE_WINDOW, USAGE_RECORDS_PER_CASE, USAGE_MAX_CASES
+
+# Trainee and case the current request works for. Background tasks inherit it
+# from the request that created them.
+_usage_context: ContextVar[Tuple[Optional[str], Optional[str]]] = ContextVar(
+    "llm_usage_context", default=(None, None)
+)
+
+# Fields calls can be grouped by in rollups
+ROLLUP_FIELDS = ("user_id", "case_id", "task", "model")
+
+
+def attribute_usage(user_id: Optional[str], case_id: Optional[str]):
+    """
+    Attribute the LLM calls made from the current task to a trainee and case.
+    
+    Args:
+        user_id (Optional[str]): User ID, None for calls made for no trainee
+        case_id (Optional[str]): Case ID
+    """
+    _usage_context.set((user_id, case_id))
+
+
+class UsageTracker:
+    """Records tokens, latency and outcome of every LLM call with rolling rollups"""
+    
+    def __init__(self, window: int = USAGE_WINDOW, records_per_case: int = USAGE_RECORDS_PER_CASE,
+                 max_cases: int = USAGE_MAX_CASES):
+        """
+        Initialize usage tracker.
+        
+        Args:
+            window (int): Most recent calls the rollups are computed over
+            records_per_case (int): Calls kept per (user_id, case_id) for export
+            max_cases (int): Most (user_id, case_id) keys kept, least recently used dropped first
+        """
+        self._records: Deque[LLMCallRecord] = deque(maxlen=window)
+        self._by_case: "OrderedDict[Tuple[str, str], Deque[LLMCallRecord]]" = OrderedDict()
+        self.records_per_case = records_per_case
+        self.max_cases = max_cases
+        self._lock = threading.Lock()
+    
+    def record(self, task: str, prompt_type: str, model: str, usage: Any,
+               time_to_first_token: Optional[float], latency: float, outcome: str) -> LLMCallRecord:
+        """
+        Record one call, attributed to the current trainee and case.
+        
+        Args:
+            task (str): Model routing task
+            prompt_type (str): Prompt type the call was built from
+            model (str): Model name
+            usage: Usage reported by the API, None if not available
+            time_to_first_token (Optional[float]): Seconds until the first token
+            latency (float): Seconds until the call finished
+            outcome (str): "ok", "cancelled" or the error type
+        
+        Returns:
+            LLMCallRecord: Recorded call
+        """
+        user_id, case_id = _usage_context.get()
+        details = getattr(usage, "prompt_tokens_details", None)
+        record = LLMCallRecord(
+            user_id=user_id,
+            case_id=case_id,
+            task=task,
+            prompt_type=prompt_type,
+            model=model,
+            prompt_tokens=getattr(usage, "prompt_tokens", None) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+            cached_tokens=getattr(details, "cached_tokens", None) or 0,
+            time_to_first_token=time_to_first_token,
+            latency=latency,
+            outcome=outcome
+        )
+        
+        with self._lock:
+            self._records.append(record)
+            if user_id is not None and case_id is not None:
+                key = (user_id, case_id)
+                if key not in self._by_case:
+                    self._by_case[key] = deque(maxlen=self.records_per_case)
+                self._by_case[key].append(record)
+                self._by_case.move_to_end(key)
+                while len(self._by_case) > self.max_cases:
+                    self._by_case.popitem(last=False)
+        return record
+    
+    def get_records(self, user_id: str, case_id: str) -> List[LLMCallRecord]:
+        """
+        Get the calls made for a trainee's case.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            List[LLMCallRecord]: Calls in the order they were made
+        """
+        with self._lock:
+            return list(self._by_case.get((user_id, case_id), ()))
+    
+    def get_export_rows(self, user_id: str, case_id: str) -> List[Dict[str, Any]]:
+        """
+        Get a trainee's calls as rows to append to the exported chat log.
+        
+        Args:
+            user_id (str): User ID
+            case_id (str): Case ID
+        
+        Returns:
+            List[Dict[str, Any]]: One row per call with role "llm_call"
+        """
+        rows = []
+        for record in self.get_records(user_id, case_id):
+            row = record.dict(exclude={"user_id", "case_id"})
+            row["role"] = "llm_call"
+            row["content"] = f"{record.task} ({record.model}): {record.outcome}"
+            rows.append(row)
+        return rows
+    
+    def get_rollups(self, group_by: str = "case_id") -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate the calls in the rolling window.
+        
+        Args:
+            group_by (str): One of ROLLUP_FIELDS
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Calls, errors, tokens and latency percentiles per group
+        
+        Raises:
+            ValueError: If group_by is not a rollup field
+        """
+        if group_by not in ROLLUP_FIELDS:
+            raise ValueError(f"Cannot group usage by {group_by}")
+        
+        with self._lock:
+            records = list(self._records)
+        
+        groups: Dict[str, List[LLMCallRecord]] = {}
+        for record in records:
+            groups.setdefault(str(getattr(record, group_by)), []).append(record)
+        
+        rollups = {}
+        for key, group in groups.items():
+            latencies = [record.latency for record in group if record.outcome == "ok"]
+            first_tokens = [record.time_to_first_token for record in group if record.time_to_first_token is not None]
+            rollups[key] = {
+                "calls": len(group),
+                "errors": sum(1 for record in group if record.outcome not in ("ok", "cancelled")),
+                "prompt_tokens": sum(record.prompt_tokens for record in group),
+                "completion_tokens": sum(record.completion_tokens for record in group),
+                "cached_tokens": sum(record.cached_tokens for record in group),
+                "latency_p50": round(percentile(latencies, 0.5), 3),
+                "latency_p95": round(percentile(latencies, 0.95), 3),
+                "time_to_first_token_p50": round(percentile(first_tokens, 0.5), 3),
+                "time_to_first_token_p95": round(percentile(first_tokens, 0.95), 3)
+            }
+        return rollups
@@ -3,12 +3,14 @@ Main FastAPI application for Emergency Medicine Case Simulator
 """
 
 import os
-from fastapi import FastAPI, HTTPException, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+import json
+import asyncio
+from fastapi import FastAPI, HTTPException, Request, Form, Header
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List
+from typing import Any, Awaitable, List, Optional
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -31,6 +33,12 @@ from services.auth_service import AuthService
 from services.openai_service import OpenAIService  
 from services.google_drive_service import GoogleDriveService
 from services.session_service import SessionService
+from services.summary_service import SummaryService
+from services.case_data_service import CaseDataService
+from services.presentation_pool_service import PresentationPoolService
+from services.history_service import HistoryService
+from services.http_clients import HTTPClients
+from services.usage_tracker import attribute_usage
 
 # Import models
 from models.schemas import (
@@ -38,12 +46,14 @@ from models.schemas import (
     CaseListResponse, CaseInfo, CaseStartResponse, 
     CaseCompleteRequest, CaseCompleteResponse,
     SurveySubmitRequest, SurveySubmitResponse,
-    FinalSummaryResponse, CaseSummaryData, ChatMessage
+    FinalSummaryResponse, CaseSummaryData, ChatMessage,
+    LiveSummaryResponse, FinalCaseSummaryResponse, LLMCallRecord
 )
 
 # Import configuration
-from config.case_config import AVAILABLE_CASES
+from config.case_config import AVAILABLE_CASES, FINAL_SUMMARY_PROMPT
 from config.survey_questions import SURVEY_QUESTIONS
+from config.llm_config import HTTP_WARMUP_TIMEOUT_SECONDS
 
 # Define additional models for summary generation
 class SummaryGenerationRequest(BaseModel):
@@ -77,12 +87,37 @@ templates = Jinja2Templates(directory="templates")
 
 # Initialize services
 auth_service = AuthService()
-openai_service = OpenAIService()
-google_drive_service = GoogleDriveService()
+http_clients = HTTPClients()
+openai_service = OpenAIService(http_clients)
+google_drive_service = GoogleDriveService(http_clients.google)
 session_service = SessionService()
+case_data_service = CaseDataService()
+summary_service = SummaryService(openai_service, session_service, case_data_service)
+presentation_pool_service = PresentationPoolService(openai_service, summary_service)
+history_service = HistoryService(openai_service, session_service)
 
-# Store for user authentication (in-memory for simplicity)
-authenticated_users: Dict[str, bool] = {}
+
+
+@app.on_event("startup")
+async def startup():
+    """Pre-generate case presentations and open upstream connections before trainees start cases"""
+    presentation_pool_service.start()
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(openai_service.warm_up(), google_drive_service.run(google_drive_service.warm_up)),
+            HTTP_WARMUP_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        print(f"Warning: Upstream warm-up did not finish within {HTTP_WARMUP_TIMEOUT_SECONDS}s")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background presentation generation, close upstream connections and write pending sessions"""
+    await presentation_pool_service.stop()
+    google_drive_service.close()
+    await http_clients.close()
+    session_service.flush()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -109,7 +144,7 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=401, detail="Invalid user ID")
     
     # Mark user as authenticated
-    authenticated_users[request.user_id] = True
+    session_service.authenticate_user(request.user_id)
     
     # Create or get session
     session_service.get_or_create_session(request.user_id)
@@ -124,7 +159,7 @@ async def login(request: LoginRequest):
 @app.get("/case/{user_id}", response_class=HTMLResponse)
 async def case_page(request: Request, user_id: str):
     """Render case interface page"""
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         return RedirectResponse(url="/")
     
     return templates.TemplateResponse("case.html", {
@@ -136,7 +171,7 @@ async def case_page(request: Request, user_id: str):
 @app.get("/summary/{user_id}", response_class=HTMLResponse)
 async def summary_page(request: Request, user_id: str):
     """Render final summary page"""
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         return RedirectResponse(url="/")
     
     return templates.TemplateResponse("summary.html", {
@@ -165,14 +200,60 @@ async def get_cases():
     return CaseListResponse(cases=cases)
 
 
+async def wait_for_disconnect(http_request: Request):
+    """
+    Wait until the client closes the connection.
+    
+    Args:
+        http_request (Request): Request whose body has already been read
+    """
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(http_request: Request, awaitable: Awaitable[Any]) -> Any:
+    """
+    Await LLM work, cancelling it if the client disconnects first.
+    
+    Cancellation propagates into the OpenAI service, which closes the upstream
+    request and frees its rate limiter slot.
+    
+    Args:
+        http_request (Request): Request the work is done for
+        awaitable (Awaitable[Any]): Work to run
+        
+    Returns:
+        Any: Result of the work
+        
+    Raises:
+        HTTPException: 499 if the client disconnected before the work finished
+    """
+    work = asyncio.ensure_future(awaitable)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(http_request))
+    try:
+        done, _ = await asyncio.wait({work, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect.cancel()
+        work.cancel()
+    
+    if work not in done:
+        # Let the service finish cleaning up before answering
+        await asyncio.wait({work})
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    return work.result()
+
+
 @app.post("/api/cases/{case_id}/start/{user_id}", response_model=CaseStartResponse)
-async def start_case(case_id: str, user_id: str):
+async def start_case(case_id: str, user_id: str, http_request: Request):
     """
     Start a specific case for user.
     
     Args:
         case_id (str): Case ID to start
         user_id (str): User ID
+        http_request (Request): HTTP request, watched for client disconnect
         
     Returns:
         CaseStartResponse: Case start response with initial message
@@ -180,48 +261,72 @@ async def start_case(case_id: str, user_id: str):
     Raises:
         HTTPException: If user not authenticated or case not found
     """
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         raise HTTPException(status_code=401, detail="User not authenticated")
     
     if case_id not in AVAILABLE_CASES:
         raise HTTPException(status_code=404, detail="Case not found")
     
+    attribute_usage(user_id, case_id)
+    
     # Start case in session
     if not session_service.start_case(user_id, case_id):
         raise HTTPException(status_code=400, detail="Failed to start case")
     
     try:
-        # Get initial case presentation
-        case_data = AVAILABLE_CASES[case_id]
-        initial_message = openai_service.get_case_presentation(case_data["content"])
-        
-        # Add initial message to session
-        session_service.add_message(user_id, case_id, "assistant", initial_message)
+        # Serve a pre-generated presentation on a fresh start, the case content otherwise
+        pooled = None
+        if not session_service.get_transcript(user_id, case_id):
+            pooled = await cancel_on_disconnect(http_request, presentation_pool_service.acquire(case_id))
+        
+        live_summary = None
+        if pooled is not None:
+            initial_message = pooled.initial_message
+            session_service.add_message(user_id, case_id, "assistant", initial_message)
+            live_summary = session_service.set_live_summary(
+                user_id, case_id, pooled.summary, 1, llm_summary=pooled.llm_summary
+            )
+        else:
+            case_data = AVAILABLE_CASES[case_id]
+            initial_message = await cancel_on_disconnect(
+                http_request, openai_service.get_case_presentation_async(case_data["content"])
+            )
+            session_service.add_message(user_id, case_id, "assistant", initial_message)
         
-        # Generate initial summary
-        chat_history = session_service.get_chat_history(user_id, case_id)
-        summary = openai_service.generate_case_summary([msg.dict() for msg in chat_history])
+        # Generate initial summary in the background unless it came with the presentation
+        if live_summary is None:
+            live_summary = summary_service.schedule_live_summary(user_id, case_id)
         
         return CaseStartResponse(
             success=True,
             message="Case started successfully",
             initial_message=initial_message,
-            summary=summary
+            summary=live_summary.summary,
+            summary_version=live_summary.version,
+            summary_pending=live_summary.pending
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting case: {str(e)}")
 
 
 @app.post("/api/cases/{case_id}/chat/{user_id}", response_model=ChatResponse)
-async def chat(case_id: str, user_id: str, request: ChatRequest):
+async def chat(case_id: str, user_id: str, request: ChatRequest, http_request: Request):
     """
     Handle chat message in case.
     
+    Turns of the same case are answered one at a time, so a double submit or a
+    second tab waits for the turn in flight and sees it in the history. The turn
+    is only stored once the AI response has arrived. If the client disconnects
+    first, the LLM call is cancelled and nothing is stored.
+    
     Args:
         case_id (str): Case ID
         user_id (str): User ID
         request (ChatRequest): Chat request with user message
+        http_request (Request): HTTP request, watched for client disconnect
         
     Returns:
         ChatResponse: Chat response with AI message and summary
@@ -229,44 +334,179 @@ async def chat(case_id: str, user_id: str, request: ChatRequest):
     Raises:
         HTTPException: If user not authenticated or error occurs
     """
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         raise HTTPException(status_code=401, detail="User not authenticated")
     
     if case_id not in AVAILABLE_CASES:
         raise HTTPException(status_code=404, detail="Case not found")
     
+    attribute_usage(user_id, case_id)
+    
+    async def run_turn() -> str:
+        async with session_service.turn(user_id, case_id):
+            # Get chat history, condensed to the model's token budget
+            history_dicts = history_service.get_window(user_id, case_id)
+            
+            # Get AI response
+            case_data = AVAILABLE_CASES[case_id]
+            ai_response = await openai_service.get_chat_response_async(
+                case_data["content"], 
+                history_dicts, 
+                request.message
+            )
+            
+            # Add user message and AI response to session
+            session_service.add_turn(user_id, case_id, request.message, ai_response)
+            return ai_response
+    
     try:
-        # Add user message to session
-        session_service.add_message(user_id, case_id, "user", request.message)
-        
-        # Get chat history
-        chat_history = session_service.get_chat_history(user_id, case_id)
-        history_dicts = [msg.dict() for msg in chat_history]
-        
-        # Get AI response
-        case_data = AVAILABLE_CASES[case_id]
-        ai_response = openai_service.get_chat_response(
-            case_data["content"], 
-            history_dicts, 
-            request.message
-        )
+        ai_response = await cancel_on_disconnect(http_request, run_turn())
         
-        # Add AI response to session
-        session_service.add_message(user_id, case_id, "assistant", ai_response)
-        
-        # Generate updated summary
-        updated_history = session_service.get_chat_history(user_id, case_id)
-        summary = openai_service.generate_case_summary([msg.dict() for msg in updated_history])
+        # Generate updated summary in the background
+        live_summary = summary_service.schedule_live_summary(user_id, case_id)
         
         return ChatResponse(
             message=ai_response,
-            summary=summary
+            summary=live_summary.summary,
+            summary_version=live_summary.version,
+            summary_pending=live_summary.pending
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
+def format_sse_event(data) -> str:
+    """
+    Format a payload as a Server-Sent Events data line.
+    
+    Args:
+        data: JSON-serializable payload, or a raw string sentinel such as '[DONE]'
+        
+    Returns:
+        str: SSE-formatted event
+    """
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    return f"data: {data}\n\n"
+
+
+@app.post("/api/cases/{case_id}/chat/{user_id}/stream")
+async def chat_stream(case_id: str, user_id: str, request: ChatRequest):
+    """
+    Handle chat message in case, streaming the AI response as Server-Sent Events.
+    
+    Emits 'token' events while the response is generated, a 'summary' event with
+    the current summary version once the assembled message has been stored, and a
+    final '[DONE]' sentinel. The refreshed summary is fetched from the live summary
+    endpoint. Turns of the same case are answered one at a time. The turn is only
+    stored once the response is complete; if the client disconnects first, the
+    upstream stream is closed and nothing is stored.
+    
+    Args:
+        case_id (str): Case ID
+        user_id (str): User ID
+        request (ChatRequest): Chat request with user message
+        
+    Returns:
+        StreamingResponse: text/event-stream response
+        
+    Raises:
+        HTTPException: If user not authenticated or case not found
+    """
+    if not session_service.is_authenticated(user_id):
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    
+    if case_id not in AVAILABLE_CASES:
+        raise HTTPException(status_code=404, detail="Case not found")
+    
+    attribute_usage(user_id, case_id)
+    case_data = AVAILABLE_CASES[case_id]
+    
+    async def event_stream():
+        async with session_service.turn(user_id, case_id):
+            chunks = []
+            # Get chat history, condensed to the model's token budget
+            history_dicts = history_service.get_window(user_id, case_id)
+            deltas = openai_service.stream_chat_response(
+                case_data["content"],
+                history_dicts,
+                request.message
+            )
+            try:
+                async for delta in deltas:
+                    chunks.append(delta)
+                    yield format_sse_event({"type": "token", "content": delta})
+                
+                # Persist the turn with the assembled AI response once the stream has finished
+                ai_response = "".join(chunks)
+                if not ai_response:
+                    raise Exception("Empty response from model")
+                session_service.add_turn(user_id, case_id, request.message, ai_response)
+                
+                # Generate updated summary in the background
+                live_summary = summary_service.schedule_live_summary(user_id, case_id)
+                yield format_sse_event({
+                    "type": "summary",
+                    "summary": live_summary.summary,
+                    "version": live_summary.version,
+                    "pending": live_summary.pending
+                })
+                
+            except Exception as e:
+                yield format_sse_event({"type": "error", "detail": f"Error processing chat: {str(e)}"})
+            finally:
+                # A disconnected client stops iteration mid-stream; close the upstream stream now
+                await deltas.aclose()
+        
+        yield format_sse_event("[DONE]")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/cases/{case_id}/summary/{user_id}", response_model=LiveSummaryResponse)
+async def get_live_summary(http_request: Request, case_id: str, user_id: str, since_version: int = 0, wait: float = 0):
+    """
+    Get the live case summary, optionally long-polling for a newer version.
+    
+    Args:
+        http_request (Request): HTTP request, watched for client disconnect
+        case_id (str): Case ID
+        user_id (str): User ID
+        since_version (int): Summary version already displayed by the client
+        wait (float): Seconds to wait for a version newer than since_version (max 30)
+        
+    Returns:
+        LiveSummaryResponse: Latest summary with its version and pending flag
+        
+    Raises:
+        HTTPException: If user not authenticated or case not found
+    """
+    if not session_service.is_authenticated(user_id):
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    
+    if case_id not in AVAILABLE_CASES:
+        raise HTTPException(status_code=404, detail="Case not found")
+    
+    attribute_usage(user_id, case_id)
+    
+    live_summary = await cancel_on_disconnect(http_request, summary_service.wait_for_live_summary(
+        user_id, case_id, since_version, timeout=max(0.0, min(wait, 30.0))
+    ))
+    
+    return LiveSummaryResponse(
+        summary=live_summary.summary,
+        version=live_summary.version,
+        pending=live_summary.pending
+    )
+
+
 @app.post("/api/cases/{case_id}/complete/{user_id}", response_model=CaseCompleteResponse)
 async def complete_case(case_id: str, user_id: str, request: CaseCompleteRequest):
     """
@@ -283,7 +523,7 @@ async def complete_case(case_id: str, user_id: str, request: CaseCompleteRequest
     Raises:
         HTTPException: If user not authenticated or error occurs
     """
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         raise HTTPException(status_code=401, detail="User not authenticated")
     
     if case_id not in AVAILABLE_CASES:
@@ -292,17 +532,25 @@ async def complete_case(case_id: str, user_id: str, request: CaseCompleteRequest
     if request.action not in ["admit", "discharge"]:
         raise HTTPException(status_code=400, detail="Invalid action. Must be 'admit' or 'discharge'")
     
+    attribute_usage(user_id, case_id)
+    
     try:
         # Mark case as completed
         session_service.complete_case(user_id, case_id, request.action)
         
+        # Generate the summary shown on the final summary page in the background
+        summary_service.schedule_final_summary(user_id, case_id)
+        
         # Save chat log to Google Drive using synchronous method
-        chat_history = session_service.get_chat_history(user_id, case_id)
-        if chat_history and google_drive_service.is_available():
-            messages_dict = [msg.dict() for msg in chat_history]
+        transcript = session_service.get_transcript(user_id, case_id)
+        if transcript and google_drive_service.is_available():
+            messages_dict = transcript.to_dicts()
+            messages_dict.extend(openai_service.usage.get_export_rows(user_id, case_id))
             case_title = AVAILABLE_CASES[case_id]["title"]
-            # Use synchronous method to avoid async/await issues
-            google_drive_service.upload_chat_log_sync(messages_dict, user_id, case_id, case_title)
+            # Runs on the Drive thread, which owns the shared Drive connection
+            await google_drive_service.run(
+                google_drive_service.upload_chat_log_sync, messages_dict, user_id, case_id, case_title
+            )
         elif not google_drive_service.is_available():
             print("Warning: Google Drive service not available, chat log not saved")
         
@@ -329,24 +577,31 @@ async def get_final_summary(user_id: str):
     Raises:
         HTTPException: If user not authenticated
     """
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         raise HTTPException(status_code=401, detail="User not authenticated")
     
     # Get completed cases
     completed_case_ids = session_service.get_completed_cases(user_id)
     
-    # Build case summary data
+    # Build case summary data with the summaries generated at completion
     completed_cases = []
     for case_id in completed_case_ids:
         if case_id in AVAILABLE_CASES:
             case_data = AVAILABLE_CASES[case_id]
             chat_messages = session_service.get_chat_history(user_id, case_id)
             
+            # Summaries missing or failed, e.g. after a restart, are generated now
+            final_summary = summary_service.schedule_final_summary(user_id, case_id)
+            
             completed_cases.append(CaseSummaryData(
                 case_id=case_id,
                 title=case_data["title"],
                 description=case_data["description"],
-                chat_messages=chat_messages
+                chat_messages=chat_messages,
+                summary=final_summary.summary,
+                summary_version=final_summary.version,
+                summary_pending=final_summary.pending,
+                summary_failed=final_summary.failed
             ))
     
     # Get existing survey responses
@@ -359,6 +614,91 @@ async def get_final_summary(user_id: str):
     )
 
 
+@app.get("/api/summary/{user_id}/stream")
+async def stream_case_summaries(user_id: str):
+    """
+    Summarize every completed case of a user, streaming each summary as Server-Sent Events.
+    
+    Transcripts are read from the session. Summaries not generated at completion
+    are generated concurrently, and a 'summary' event is emitted per case as soon
+    as its summary is ready, followed by a final '[DONE]' sentinel.
+    
+    Args:
+        user_id (str): User ID
+        
+    Returns:
+        StreamingResponse: text/event-stream response
+        
+    Raises:
+        HTTPException: If user not authenticated
+    """
+    if not session_service.is_authenticated(user_id):
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    
+    case_ids = [case_id for case_id in session_service.get_completed_cases(user_id) if case_id in AVAILABLE_CASES]
+    
+    async def event_stream():
+        summaries = summary_service.stream_final_summaries(user_id, case_ids)
+        try:
+            async for case_id, final_summary in summaries:
+                yield format_sse_event({
+                    "type": "summary",
+                    "case_id": case_id,
+                    "summary": final_summary.summary,
+                    "version": final_summary.version,
+                    "pending": final_summary.pending,
+                    "failed": final_summary.failed
+                })
+        except Exception as e:
+            yield format_sse_event({"type": "error", "detail": f"Error generating summaries: {str(e)}"})
+        finally:
+            await summaries.aclose()
+        
+        yield format_sse_event("[DONE]")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/cases/{case_id}/final-summary/{user_id}", response_model=FinalCaseSummaryResponse)
+async def get_case_final_summary(http_request: Request, case_id: str, user_id: str, since_version: int = 0, wait: float = 0):
+    """
+    Get the final summary of a completed case, optionally long-polling for a newer version.
+    
+    Args:
+        http_request (Request): HTTP request, watched for client disconnect
+        case_id (str): Case ID
+        user_id (str): User ID
+        since_version (int): Summary version already displayed by the client
+        wait (float): Seconds to wait for a version newer than since_version (max 30)
+        
+    Returns:
+        FinalCaseSummaryResponse: Latest summary with its version and pending flag
+        
+    Raises:
+        HTTPException: If user not authenticated or case not found
+    """
+    if not session_service.is_authenticated(user_id):
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    
+    if case_id not in AVAILABLE_CASES:
+        raise HTTPException(status_code=404, detail="Case not found")
+    
+    final_summary = await cancel_on_disconnect(http_request, summary_service.wait_for_final_summary(
+        user_id, case_id, since_version, timeout=max(0.0, min(wait, 30.0))
+    ))
+    
+    return FinalCaseSummaryResponse(
+        summary=final_summary.summary,
+        version=final_summary.version,
+        pending=final_summary.pending,
+        failed=final_summary.failed
+    )
+
+
 @app.post("/api/survey/submit/{user_id}", response_model=SurveySubmitResponse)
 async def submit_survey(user_id: str, request: SurveySubmitRequest):
     """
@@ -374,7 +714,7 @@ async def submit_survey(user_id: str, request: SurveySubmitRequest):
     Raises:
         HTTPException: If user not authenticated or error occurs
     """
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         raise HTTPException(status_code=401, detail="User not authenticated")
     
     try:
@@ -390,8 +730,8 @@ async def submit_survey(user_id: str, request: SurveySubmitRequest):
         # Save survey responses to Google Drive using synchronous method
         survey_data = session_service.get_survey_responses(user_id)
         if survey_data and google_drive_service.is_available():
-            # Use synchronous method to avoid async/await issues
-            google_drive_service.upload_survey_responses_sync(survey_data, user_id)
+            # Runs on the Drive thread, which owns the shared Drive connection
+            await google_drive_service.run(google_drive_service.upload_survey_responses_sync, survey_data, user_id)
         elif not google_drive_service.is_available():
             print("Warning: Google Drive service not available, survey responses not saved")
         
@@ -405,12 +745,13 @@ async def submit_survey(user_id: str, request: SurveySubmitRequest):
 
 
 @app.post("/api/generate-summary", response_model=SummaryGenerationResponse)
-async def generate_summary(request: SummaryGenerationRequest):
+async def generate_summary(request: SummaryGenerationRequest, http_request: Request):
     """
     Generate an LLM-based summary of a case conversation.
     
     Args:
         request (SummaryGenerationRequest): Request with messages and case ID
+        http_request (Request): HTTP request, watched for client disconnect
         
     Returns:
         SummaryGenerationResponse: Response with generated summary
@@ -418,6 +759,8 @@ async def generate_summary(request: SummaryGenerationRequest):
     Raises:
         HTTPException: If error occurs during summary generation
     """
+    attribute_usage(None, request.case_id)
+    
     try:
         print(f"Generating summary for case: {request.case_id}")
         print(f"Number of messages: {len(request.messages)}")
@@ -430,27 +773,19 @@ async def generate_summary(request: SummaryGenerationRequest):
         if not openai_service:
             raise Exception("OpenAI service not initialized")
         
-        # Generate summary using OpenAI service with a specific prompt for case summaries
-        summary_prompt = """
-        Please provide a concise, professional summary of this medical case simulation conversation. 
-        Focus on:
-        - The clinical reasoning process demonstrated
-        - Key diagnostic and treatment decisions made
-        - The overall approach to patient care
-        - Any notable clinical insights or educational moments
-        
-        Keep the summary to 2-3 sentences and make it specific to the actual conversation content.
-        """
-        
         print("Calling OpenAI service...")
         
-        # Use the conversation summary generation method
-        summary = openai_service.generate_conversation_summary(messages_dict, summary_prompt)
+        # Use the conversation summary generation method with the final summary prompt
+        summary = await cancel_on_disconnect(
+            http_request, openai_service.generate_conversation_summary_async(messages_dict, FINAL_SUMMARY_PROMPT)
+        )
         
         print(f"Generated summary: {summary[:100]}...")
         
         return SummaryGenerationResponse(summary=summary)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in generate_summary: {str(e)}")
         print(f"Error type: {type(e)}")
@@ -473,7 +808,7 @@ async def get_next_case(user_id: str):
     Raises:
         HTTPException: If user not authenticated
     """
-    if user_id not in authenticated_users:
+    if not session_service.is_authenticated(user_id):
         raise HTTPException(status_code=401, detail="User not authenticated")
     
     next_case_id = session_service.get_next_case(user_id)
@@ -493,6 +828,70 @@ async def get_next_case(user_id: str):
         }
 
 
+
+@app.get("/api/llm/status")
+async def get_llm_status():
+    """
+    Get the state of the shared OpenAI rate limiter and model routing.
+    
+    Returns:
+        dict: In-flight requests, queue depth, available tokens per minute,
+            the model serving each task, chat hedging counters and the prompt
+            cache hit rate per prompt type
+    """
+    status = openai_service.limiter.get_stats()
+    status["routing"] = openai_service.get_routing_status()
+    status["hedging"] = openai_service.get_hedging_stats()
+    status["prompt_cache"] = openai_service.get_prompt_cache_stats()
+    return status
+
+
+@app.get("/api/admin/usage")
+async def get_usage_rollups(group_by: str = "case_id", x_admin_token: Optional[str] = Header(None)):
+    """
+    Get LLM usage and latency over the most recent calls, grouped by a call field.
+    
+    Args:
+        group_by (str): One of user_id, case_id, task or model
+        x_admin_token (Optional[str]): Admin token from the X-Admin-Token header
+        
+    Returns:
+        dict: Calls, errors, token counts and latency percentiles per group
+        
+    Raises:
+        HTTPException: If the admin token is invalid or group_by is unknown
+    """
+    if not auth_service.validate_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    
+    try:
+        return openai_service.usage.get_rollups(group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/admin/usage/{user_id}/{case_id}", response_model=List[LLMCallRecord])
+async def get_case_usage(user_id: str, case_id: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    Get every recorded LLM call made for a trainee's case.
+    
+    Args:
+        user_id (str): User ID
+        case_id (str): Case ID
+        x_admin_token (Optional[str]): Admin token from the X-Admin-Token header
+        
+    Returns:
+        List[LLMCallRecord]: Calls in the order they were made
+        
+    Raises:
+        HTTPException: If the admin token is invalid
+    """
+    if not auth_service.validate_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    
+    return openai_service.usage.get_records(user_id, case_id)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
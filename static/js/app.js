@@ -43,14 +43,19 @@ window.EMCaseSimulator = {
 
         // Streaming chat request
         async streamChat(url, data, onChunk) {
+            return this.stream(url, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(data)
+            }, onChunk);
+        },
+
+        // Server-Sent Events request, calling onChunk with each parsed event
+        async stream(url, options, onChunk) {
             try {
-                const response = await fetch(url, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify(data)
-                });
+                const response = await fetch(url, options);
 
                 if (!response.ok) {
                     const errorData = await response.json();
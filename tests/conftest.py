@@ -0,0 +1,10 @@
+"""
+Test configuration: answer LLM requests from the in-process stub backend
+"""
+
+import os
+
+# Set before any test module imports the app or its config
+os.environ["LLM_BACKEND"] = "stub"
+os.environ.setdefault("LLM_STUB_LATENCY", "fixed:0")
+os.environ.setdefault("LLM_STUB_TOKENS_PER_SECOND", "0")
@@ -0,0 +1,78 @@
+"""
+Tests for offline batch summaries using the local batch backend
+"""
+
+import os
+import csv
+import json
+import asyncio
+from services.openai_service import OpenAIService
+from services.batch_service import (
+    BatchService,
+    LocalBatchBackend,
+    load_chat_logs,
+    write_summaries_csv
+)
+
+
+def write_chat_log(directory, filename, messages):
+    """Write a chat log in the format exported to Google Drive"""
+    with open(os.path.join(directory, filename), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["role", "content", "timestamp"])
+        writer.writeheader()
+        for role, content in messages:
+            writer.writerow({"role": role, "content": content, "timestamp": "2025-06-01T10:00:00"})
+
+
+def test_load_chat_logs_keeps_latest_export(tmp_path):
+    write_chat_log(tmp_path, "david_case_1_Case_1_chat_log_20250601_100000.csv", [("assistant", "old")])
+    write_chat_log(tmp_path, "david_case_1_Case_1_chat_log_20250601_120000.csv", [("assistant", "new")])
+    write_chat_log(tmp_path, "alex_case_2_Case_2_chat_log_20250601_100000.csv", [("user", "hello")])
+    write_chat_log(tmp_path, "alex_survey_responses_20250601_100000.csv", [("user", "ignored")])
+
+    transcripts = load_chat_logs(str(tmp_path))
+
+    assert set(transcripts) == {("david", "case_1"), ("alex", "case_2")}
+    assert transcripts[("david", "case_1")] == [{"role": "assistant", "content": "new"}]
+
+
+def test_batch_summaries_are_merged_by_user_and_case(tmp_path):
+    write_chat_log(tmp_path, "david_case_1_Case_1_chat_log_20250601_100000.csv", [
+        ("assistant", "Nurse: There is a 68 year old female here with shortness of breath"),
+        ("user", "Get an ECG"),
+    ])
+    write_chat_log(tmp_path, "adrian_case_3_Case_3_chat_log_20250601_100000.csv", [
+        ("assistant", "Nurse: There is a patient here with abdominal pain"),
+        ("user", "Order a lipase"),
+    ])
+    write_chat_log(tmp_path, "alex_case_2_Case_2_chat_log_20250601_100000.csv", [
+        ("assistant", "Nurse: There is a patient here with a headache"),
+    ])
+
+    async def complete(body):
+        transcript = body["messages"][-1]["content"]
+        if "headache" in transcript:
+            raise Exception("upstream error")
+        return f" Summary of: {transcript.splitlines()[-1]} "
+
+    openai_service = OpenAIService()
+    batch_service = BatchService(openai_service, LocalBatchBackend(complete))
+    transcripts = load_chat_logs(str(tmp_path))
+
+    jsonl = batch_service.build_batch(transcripts)
+    requests = [json.loads(line) for line in jsonl.splitlines()]
+    assert [request["custom_id"] for request in requests] == ["adrian:case_3", "alex:case_2", "david:case_1"]
+    assert requests[0]["body"] == openai_service.build_conversation_summary_request(transcripts[("adrian", "case_3")])
+
+    summaries = asyncio.run(batch_service.summarize(transcripts, poll_interval=0.01))
+
+    assert summaries == {
+        ("david", "case_1"): "Summary of: Medical Student/Resident: Get an ECG",
+        ("adrian", "case_3"): "Summary of: Medical Student/Resident: Order a lipase",
+    }
+
+    output = tmp_path / "summaries.csv"
+    write_summaries_csv(summaries, str(output))
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["user_id"], row["case_id"]) for row in rows] == [("adrian", "case_3"), ("david", "case_1")]
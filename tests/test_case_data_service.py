@@ -0,0 +1,82 @@
+"""
+Tests for indexing case data and rendering the structured summary sections
+"""
+
+import pytest
+from services.case_data_service import CaseDataService, compose_summary, split_summary_sections
+
+CASE_CONTENT = """Case: 54-year-old male with chest pain
+
+Triage vitals: BP 150/90, HR 110, RR 22, Temp 37.2°C, SpO2 94%
+
+Laboratory Results:
+CBC (Reference Ranges)
+WBC: 15.2 x10^9/L (4.0-11.0)
+Hemoglobin: 140 g/L (135-175)
+Chemistry
+Troponin: 2.1 ng/mL (<0.04)
+
+ECGs, X-rays, Ultrasounds and Pictures:
+ECG:
+ST elevation in leads II, III and aVF.
+Reciprocal depression in aVL.
+CXR: Clear lung fields, no pneumothorax.
+"""
+
+
+@pytest.fixture
+def service():
+    return CaseDataService({"case_x": {"content": CASE_CONTENT}})
+
+
+def test_case_content_is_indexed(service):
+    index = service.get_index("case_x")
+    assert (index.identification.age, index.identification.sex, index.identification.chief_complaint) == (54, "Male", "chest pain")
+    assert [(vital.name, vital.value, vital.unit) for vital in index.vitals] == [
+        ("BP", "150/90", "mmHg"), ("HR", "110", "bpm"), ("RR", "22", "breaths/min"), ("Temp", "37.2", "°C"), ("SpO2", "94", "%")
+    ]
+    assert [(lab.name, lab.panel, lab.numeric_value, lab.flag) for lab in index.labs] == [
+        ("WBC", "CBC", 15.2, "H"), ("Hemoglobin", "CBC", 140.0, None), ("Troponin", "Chemistry", 2.1, "H")
+    ]
+    assert [(study.modality, study.section) for study in index.imaging] == [("ECG", "Other"), ("CXR", "Imaging")]
+    assert index.imaging[0].finding == "ST elevation in leads II, III and aVF. Reciprocal depression in aVL."
+
+
+def test_configured_cases_are_indexed():
+    service = CaseDataService()
+    assert service.has_structured_data("case_1")
+    assert not service.has_structured_data("unknown_case")
+
+
+def test_only_results_the_ai_revealed_are_rendered(service):
+    history = [
+        {"role": "user", "content": "What is the BP? Any troponin or CXR?"},
+        {"role": "assistant", "content": "Nurse: BP is 150/90 and HR 110. The WBC came back at 15.2. "
+                                         "The ECG shows ST elevation in the inferior leads II, III and aVF."}
+    ]
+    sections = service.render_structured_sections("case_x", history)
+    assert sections["Vitals"] == "* **BP:** 150/90 mmHg\n* **HR:** 110 bpm"
+    assert sections["Labs"] == "* **WBC:** 15.2 x10^9/L (H, ref 4.0-11.0)"
+    assert sections["Other"] == "* **ECG:** ST elevation in leads II, III and aVF."
+    assert sections["Imaging"] == ""
+    assert sections["ID"] == ""
+
+
+def test_user_messages_reveal_nothing(service):
+    history = [{"role": "user", "content": "Is the BP 150/90 and the troponin 2.1?"}]
+    revealed = service.find_revealed("case_x", history)
+    assert not revealed.vitals and not revealed.labs and not revealed.imaging
+
+
+def test_structured_and_narrative_sections_are_merged_in_order():
+    narrative = "**PMH:** Hypertension\n\n**Interventions Administered:**\n* Aspirin 324 mg"
+    summary = compose_summary({"Vitals": "* **HR:** 110 bpm", "ID": "54-year-old male"}, narrative)
+    assert summary == (
+        "**ID:** 54-year-old male\n\n**PMH:** Hypertension\n\n**Vitals:**\n* **HR:** 110 bpm"
+        "\n\n**Interventions Administered:**\n* Aspirin 324 mg"
+    )
+    assert split_summary_sections(summary)["PMH"] == "Hypertension"
+
+
+def test_unformatted_narrative_is_kept():
+    assert compose_summary({"Vitals": "* **HR:** 110 bpm"}, "Free text summary") == "**Vitals:**\n* **HR:** 110 bpm\n\nFree text summary"
@@ -0,0 +1,21 @@
+"""
+Tests for running Google Drive calls off the event loop
+"""
+
+import asyncio
+import threading
+from services.google_drive_service import GoogleDriveService
+
+
+def test_drive_calls_share_one_thread_off_the_event_loop():
+    drive_service = GoogleDriveService()
+    
+    async def run():
+        loop_thread = threading.get_ident()
+        threads = await asyncio.gather(*(drive_service.run(threading.get_ident) for _ in range(5)))
+        return loop_thread, threads
+    
+    loop_thread, threads = asyncio.run(run())
+    assert len(set(threads)) == 1
+    assert threads[0] != loop_thread
+    drive_service.close()
@@ -0,0 +1,87 @@
+"""
+Tests for keeping chat history within the model's token budget
+"""
+
+import re
+import asyncio
+from services.openai_service import OpenAIService
+from services.session_service import SessionService
+from services.session_store import MemorySessionStore
+from services.history_service import HistoryService, DIGEST_HEADER
+from services.model_router import CHAT_TASK
+from services.token_counter import count_message_tokens
+
+USER_ID = "history-user"
+CASE_ID = "case_1"
+TURN_TEXT = "the patient reports worsening chest pain radiating to the left arm " * 2
+TURN_MESSAGES = [{"role": "user", "content": TURN_TEXT}, {"role": "assistant", "content": f"Nurse: {TURN_TEXT}"}]
+
+
+def create_history_service(history_token_budget):
+    openai_service = OpenAIService()
+    openai_service.stub.rules = [(re.compile("^(Existing digest|Transcript):"), "Digest {request}")]
+    settings_models = []
+    
+    def get_model_settings(model_name=None):
+        settings_models.append(model_name)
+        return {"context_window": 100000, "history_token_budget": history_token_budget, "recent_turns": 2}
+    
+    openai_service.get_model_settings = get_model_settings
+    session_service = SessionService(MemorySessionStore())
+    session_service.start_case(USER_ID, CASE_ID)
+    return HistoryService(openai_service, session_service), settings_models
+
+
+def add_turns(history_service, count):
+    for _ in range(count):
+        history_service.session_service.add_turn(USER_ID, CASE_ID, TURN_TEXT, f"Nurse: {TURN_TEXT}")
+
+
+async def next_window(history_service):
+    window = history_service.get_window(USER_ID, CASE_ID)
+    await asyncio.gather(*history_service._tasks.values())
+    return window
+
+
+def test_window_within_budget_is_the_transcript():
+    history_service, _ = create_history_service(100000)
+    add_turns(history_service, 3)
+    
+    window = asyncio.run(next_window(history_service))
+    transcript = history_service.session_service.get_transcript(USER_ID, CASE_ID)
+    assert list(window) == transcript.api_messages
+    assert history_service.openai_service.stub.requests == 0
+
+
+def test_digest_is_not_regenerated_once_the_window_is_within_budget():
+    # Room for a short digest and three turns, but not for four turns
+    budget = count_message_tokens(TURN_MESSAGES * 4, "gpt-4o")
+    history_service, settings_models = create_history_service(budget)
+    stub = history_service.openai_service.stub
+    add_turns(history_service, 6)
+    
+    async def run():
+        # Over budget: older turns are folded into a digest in the background
+        await next_window(history_service)
+        assert stub.requests == 1
+        digest = history_service.session_service.get_history_digest(USER_ID, CASE_ID)
+        assert digest.message_count == 8
+        
+        window = await next_window(history_service)
+        assert window[0]["content"] == f"{DIGEST_HEADER}\n\nDigest 1"
+        assert len(window) == 5
+        
+        # The digest and the turns after it still fit, so the next turn costs no digest call
+        add_turns(history_service, 1)
+        await next_window(history_service)
+        assert stub.requests == 1
+        
+        # Once the sent window is over budget again, the digest catches up
+        add_turns(history_service, 3)
+        window = await next_window(history_service)
+        assert stub.requests == 2
+        window = await next_window(history_service)
+        assert window[0]["content"] == f"{DIGEST_HEADER}\n\nDigest 2"
+    
+    asyncio.run(run())
+    assert set(settings_models) == {history_service.openai_service.get_model(CHAT_TASK)}
@@ -0,0 +1,80 @@
+"""
+Tests for routing tasks between primary and fallback models
+"""
+
+from services.model_router import ModelRouter, percentile
+from config.llm_config import MODEL_TIERS, MODEL_HEALTH_MIN_SAMPLES
+
+TIERS = {"chat": {"primary": "big-model", "fallback": "small-model", "max_p95_seconds": 2.0}}
+
+
+def record_samples(router, model, latency, ok, count=MODEL_HEALTH_MIN_SAMPLES):
+    for _ in range(count):
+        router.record("chat", model, latency, ok)
+
+
+def test_percentile():
+    assert percentile([], 0.95) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(100)), 0.95) == 95
+
+
+def test_healthy_primary_is_used():
+    router = ModelRouter(TIERS)
+    record_samples(router, "big-model", 0.5, True)
+    assert router.select("chat") == "big-model"
+
+
+def test_too_few_samples_do_not_trigger_fallback():
+    router = ModelRouter(TIERS)
+    record_samples(router, "big-model", 10.0, False, MODEL_HEALTH_MIN_SAMPLES - 1)
+    assert router.select("chat") == "big-model"
+
+
+def test_errors_trigger_fallback():
+    router = ModelRouter(TIERS)
+    record_samples(router, "big-model", 0.5, False)
+    assert router.select("chat") == "small-model"
+    
+    status = router.get_status()["chat"]
+    assert status["model"] == "small-model"
+    assert status["primary_error_rate"] == 1.0
+
+
+def test_slow_p95_triggers_fallback():
+    router = ModelRouter(TIERS)
+    record_samples(router, "big-model", 5.0, True)
+    assert router.select("chat") == "small-model"
+    assert router.get_status()["chat"]["primary_p95_seconds"] == 5.0
+
+
+def test_primary_recovers_after_cooldown(monkeypatch):
+    router = ModelRouter(TIERS)
+    record_samples(router, "big-model", 0.5, False)
+    assert router.select("chat") == "small-model"
+    
+    # Still degraded within the cooldown, even though newer samples are healthy
+    record_samples(router, "big-model", 0.5, True, 50)
+    assert router.select("chat") == "small-model"
+    
+    # After the cooldown the primary's old samples are dropped and it is tried again
+    monkeypatch.setattr("services.model_router.MODEL_FALLBACK_COOLDOWN_SECONDS", 0)
+    assert router.select("chat") == "big-model"
+    assert router.get_status()["chat"]["primary_error_rate"] == 0.0
+
+
+def test_pinned_model_overrides_tiers():
+    router = ModelRouter(TIERS)
+    record_samples(router, "big-model", 0.5, False)
+    router.pin("other-model")
+    assert router.select("chat") == "other-model"
+    assert router.get_task_models("chat") == ["other-model"]
+    
+    router.pin(None)
+    assert router.get_task_models("chat") == ["big-model", "small-model"]
+
+
+def test_default_fallbacks_are_faster_tiers():
+    faster = {"gpt-4o": {"gpt-4o-mini", "gpt-3.5-turbo"}, "gpt-4o-mini": {"gpt-3.5-turbo"}}
+    for tier in MODEL_TIERS.values():
+        assert tier["fallback"] in faster[tier["primary"]]
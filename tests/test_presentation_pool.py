@@ -0,0 +1,101 @@
+"""
+Tests for the pool of pre-generated case presentations
+"""
+
+import re
+import asyncio
+from services.openai_service import OpenAIService
+from services.session_service import SessionService
+from services.session_store import MemorySessionStore
+from services.summary_service import SummaryService
+from services.presentation_pool_service import PresentationPoolService
+from config.case_config import AVAILABLE_CASES
+from config.llm_config import PRESENTATION_POOL_SIZE
+
+
+def create_pool():
+    openai_service = OpenAIService()
+    # Number every presentation so identical responses can only come from a shared call
+    openai_service.stub.rules = [(re.compile("Present the case", re.IGNORECASE), "Nurse: Presentation {request}")]
+    summary_service = SummaryService(openai_service, SessionService(MemorySessionStore()))
+    return PresentationPoolService(openai_service, summary_service, cases={"case_1": AVAILABLE_CASES["case_1"]})
+
+
+async def fill(pool):
+    pool.start()
+    await asyncio.gather(*pool._fill_tasks.values())
+
+
+def test_pooled_variants_differ():
+    pool = create_pool()
+    asyncio.run(fill(pool))
+
+    variants = pool._pools["case_1"]
+    assert len(variants) == PRESENTATION_POOL_SIZE
+    assert len({variant.initial_message for variant in variants}) == PRESENTATION_POOL_SIZE
+    assert pool.openai_service.in_flight.coalesced == 0
+
+
+def test_identical_presentation_requests_are_coalesced():
+    openai_service = create_pool().openai_service
+    content = AVAILABLE_CASES["case_1"]["content"]
+
+    async def start_twice(coalesce):
+        return await asyncio.gather(*(
+            openai_service.get_case_presentation_async(content, coalesce=coalesce) for _ in range(2)
+        ))
+
+    first, second = asyncio.run(start_twice(True))
+    assert first == second
+    assert openai_service.in_flight.coalesced == 1
+
+    first, second = asyncio.run(start_twice(False))
+    assert first != second
+    assert openai_service.in_flight.coalesced == 1
+
+
+def test_case_start_waits_for_the_first_fill():
+    pool = create_pool()
+
+    async def start_case():
+        pool.start()
+        variant = await pool.acquire("case_1")
+        await asyncio.gather(*pool._fill_tasks.values())
+        return variant
+
+    assert asyncio.run(start_case()) is not None
+
+
+def test_variants_rotate_and_retire(monkeypatch):
+    monkeypatch.setattr("services.presentation_pool_service.PRESENTATION_POOL_MAX_USES", 2)
+    pool = create_pool()
+
+    async def start_cases():
+        await fill(pool)
+        first = [pool._take("case_1") for _ in range(PRESENTATION_POOL_SIZE)]
+        second = pool._take("case_1")
+        await asyncio.gather(*pool._fill_tasks.values())
+        return first, second
+
+    first, second = asyncio.run(start_cases())
+
+    # Each start gets the next variant; a variant used MAX_USES times is replaced
+    assert len({variant.initial_message for variant in first}) == PRESENTATION_POOL_SIZE
+    assert second is first[0]
+    assert second not in pool._pools["case_1"]
+    assert len(pool._pools["case_1"]) == PRESENTATION_POOL_SIZE
+
+
+def test_variants_from_a_previous_model_are_dropped():
+    pool = create_pool()
+    asyncio.run(fill(pool))
+    stale = pool._pools["case_1"][0]
+    stale.model = "retired-model"
+
+    async def take():
+        variant = pool._take("case_1")
+        await asyncio.gather(*pool._fill_tasks.values())
+        return variant
+
+    assert asyncio.run(take()) is not stale
+    assert stale not in pool._pools["case_1"]
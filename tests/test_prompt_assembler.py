@@ -0,0 +1,55 @@
+"""
+Tests for assembling prompts behind stable, cacheable prefixes
+"""
+
+from types import SimpleNamespace
+from models.transcript import Transcript
+from services.prompt_assembler import PromptAssembler, CASE_PROMPT, LIVE_SUMMARY_PROMPT, MAX_CACHED_PREFIXES
+
+
+def test_case_messages_share_one_prefix():
+    prompts = PromptAssembler()
+    first = prompts.case_messages("Case A", "Instructions", [{"role": "user", "content": "Hello"}])
+    second = prompts.case_messages("Case A", "Instructions", [{"role": "user", "content": "Vitals?"}])
+    
+    assert first[0] is second[0]
+    assert first[0] == {"role": "system", "content": "Instructions\n\nCase A"}
+    assert prompts.case_messages("Case B", "Instructions", [])[0] is not first[0]
+
+
+def test_case_messages_keep_only_conversation_roles_without_copying():
+    prompts = PromptAssembler()
+    transcript = Transcript()
+    transcript.append("user", "Vitals?")
+    transcript.append("assistant", "Nurse: BP 90/60")
+    
+    messages = prompts.case_messages("Case A", "Instructions", [*transcript.view(), {"role": "system", "content": "Ignored"}])
+    assert messages[1:] == transcript.api_messages
+    assert messages[1] is transcript.api_messages[0]
+
+
+def test_summary_messages_put_the_variable_text_last():
+    prompts = PromptAssembler()
+    messages = prompts.summary_messages(LIVE_SUMMARY_PROMPT, "Summarize", "Transcript")
+    assert messages == [{"role": "system", "content": "Summarize"}, {"role": "user", "content": "Transcript"}]
+    assert messages[0] is prompts.summary_messages(LIVE_SUMMARY_PROMPT, "Summarize", "Other")[0]
+
+
+def test_prefix_memo_is_bounded():
+    prompts = PromptAssembler()
+    for index in range(MAX_CACHED_PREFIXES + 10):
+        prompts.prefix(LIVE_SUMMARY_PROMPT, f"Prompt {index}")
+    assert len(prompts._prefixes) == MAX_CACHED_PREFIXES
+
+
+def test_cache_hit_rate_per_prompt_type():
+    prompts = PromptAssembler()
+    prompts.record_usage(CASE_PROMPT, SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=0)))
+    prompts.record_usage(CASE_PROMPT, SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=768)))
+    prompts.record_usage(LIVE_SUMMARY_PROMPT, SimpleNamespace(prompt_tokens=500, prompt_tokens_details=None))
+    prompts.record_usage(LIVE_SUMMARY_PROMPT, None)
+    
+    stats = prompts.get_cache_stats()
+    assert stats[CASE_PROMPT] == {"calls": 2, "prompt_tokens": 2000, "cached_tokens": 768, "cache_hit_rate": 0.384}
+    assert stats[LIVE_SUMMARY_PROMPT]["calls"] == 1
+    assert stats[LIVE_SUMMARY_PROMPT]["cache_hit_rate"] == 0.0
@@ -0,0 +1,72 @@
+"""
+Tests for the shared OpenAI rate limiter
+"""
+
+import time
+import asyncio
+from services.rate_limiter import RateLimiter
+
+
+def test_unlimited_limiter_never_waits():
+    limiter = RateLimiter(0, 0)
+    for _ in range(100):
+        assert limiter._try_acquire(10000) == 0
+    assert limiter.get_stats() == {"in_flight": 100, "queue_depth": 0, "available_tokens": None}
+
+
+def test_in_flight_requests_are_capped():
+    limiter = RateLimiter(2, 0)
+    assert limiter._try_acquire(1) == 0
+    assert limiter._try_acquire(1) == 0
+    assert limiter._try_acquire(1) > 0
+    
+    limiter.release(1)
+    assert limiter._try_acquire(1) == 0
+
+
+def test_token_bucket_waits_for_refill():
+    limiter = RateLimiter(0, 600)
+    assert limiter._try_acquire(500) == 0
+    
+    # 100 tokens left, refilled at 10 per second
+    wait = limiter._try_acquire(200)
+    assert 9 < wait <= 10
+    assert limiter.get_stats()["available_tokens"] == 100
+
+
+def test_requests_larger_than_the_bucket_pass_once_it_is_full():
+    limiter = RateLimiter(0, 600)
+    assert limiter._try_acquire(5000) == 0
+    assert limiter._try_acquire(1) > 0
+
+
+def test_release_corrects_the_estimate_with_tokens_used():
+    limiter = RateLimiter(0, 600)
+    limiter._try_acquire(500)
+    limiter.release(500, used_tokens=100)
+    assert limiter.get_stats()["available_tokens"] == 500
+
+
+def test_pause_holds_back_new_requests():
+    limiter = RateLimiter(0, 0)
+    limiter.pause(5)
+    assert 4 < limiter._try_acquire(1) <= 5
+
+
+def test_waiting_callers_are_counted_as_queue_depth():
+    limiter = RateLimiter(1, 0)
+    
+    async def run():
+        await limiter.acquire_async(1)
+        waiter = asyncio.create_task(limiter.acquire_async(1))
+        await asyncio.sleep(0.01)
+        assert limiter.get_queue_depth() == 1
+        
+        started = time.monotonic()
+        limiter.release(1)
+        await waiter
+        assert time.monotonic() - started < 1
+        assert limiter.get_queue_depth() == 0
+        assert limiter.get_stats()["in_flight"] == 1
+    
+    asyncio.run(run())
@@ -0,0 +1,118 @@
+"""
+Tests for hedging slow LLM requests
+"""
+
+import asyncio
+import pytest
+from services.openai_service import OpenAIService
+from services.request_hedger import RequestHedger
+from services.usage_tracker import UsageTracker
+
+
+def create_hedger(budget_percent=100.0):
+    hedger = RequestHedger(latency_percentile=0.9, min_delay=0.01, budget_percent=budget_percent, window=10, min_samples=3)
+    for _ in range(3):
+        hedger.record("model", 0.01)
+    return hedger
+
+
+def make_start(delays, results=None):
+    """Start function whose n-th call takes delays[n] seconds"""
+    calls = []
+    
+    async def start():
+        index = len(calls)
+        calls.append(index)
+        await asyncio.sleep(delays[index])
+        if results is not None and isinstance(results[index], Exception):
+            raise results[index]
+        return index
+    
+    return start, calls
+
+
+def test_no_hedging_until_latencies_are_known():
+    hedger = RequestHedger(0.9, 0.01, 100.0, 10, 3)
+    assert hedger.get_hedge_delay("model") is None
+    
+    start, calls = make_start([0.05])
+    assert asyncio.run(hedger.run("model", start)) == 0
+    assert calls == [0]
+    assert hedger.get_hedge_delay("model") is None
+
+
+def test_slow_request_is_hedged_and_the_hedge_wins():
+    hedger = create_hedger()
+    start, calls = make_start([1.0, 0.0])
+    assert asyncio.run(hedger.run("model", start)) == 1
+    assert calls == [0, 1]
+    assert hedger.get_stats()["hedged"] == 1
+    assert hedger.get_stats()["hedge_wins"] == 1
+
+
+def test_fast_request_is_not_hedged():
+    hedger = create_hedger()
+    start, calls = make_start([0.0])
+    assert asyncio.run(hedger.run("model", start)) == 0
+    assert calls == [0]
+    assert hedger.hedged == 0
+
+
+def test_hedges_are_limited_by_the_budget():
+    hedger = create_hedger(budget_percent=50.0)
+    
+    async def run():
+        results = []
+        for primary_delay in (0.02, 0.5):
+            start, calls = make_start([primary_delay, 0.0])
+            results.append((await hedger.run("model", start), len(calls)))
+        return results
+    
+    # The first request only earns half a hedge, the second completes one
+    assert asyncio.run(run()) == [(0, 1), (1, 2)]
+
+
+def test_failed_hedge_falls_back_to_the_primary():
+    hedger = create_hedger()
+    start, _ = make_start([0.05, 0.0], [None, RuntimeError("hedge failed")])
+    assert asyncio.run(hedger.run("model", start)) == 0
+    assert hedger.hedge_wins == 0
+
+
+def test_primary_error_is_raised_when_every_request_fails():
+    hedger = create_hedger()
+    start, _ = make_start([0.05, 0.0], [RuntimeError("primary failed"), RuntimeError("hedge failed")])
+    with pytest.raises(RuntimeError, match="primary failed"):
+        asyncio.run(hedger.run("model", start))
+
+
+def test_losing_stream_is_recorded_in_usage():
+    service = OpenAIService()
+    
+    async def chat():
+        return "".join([delta async for delta in service.stream_chat_response("Case", [], "Check vitals")])
+    
+    # Load the tokenizer before timing anything
+    asyncio.run(chat())
+    service.usage = UsageTracker()
+    service.hedger = create_hedger()
+    model = service.router.select("chat")
+    for _ in range(3):
+        service.hedger.record(f"{model}/stream", 0.01)
+    
+    # The primary's headers arrive at once but its first token only after a second
+    plan = service.stub.plan
+    primary = service.stub.requests + 1
+    
+    def slow_primary(body):
+        delay, (status, headers, parts) = plan(body)
+        if service.stub.requests == primary:
+            parts = [parts[0], (1.0, parts[1][1])] + parts[2:]
+        return 0.0, (status, headers, parts)
+    
+    service.stub.plan = slow_primary
+    
+    assert asyncio.run(chat())
+    assert service.hedger.hedge_wins == 1
+    assert service.usage.get_rollups("task")["chat"]["calls"] == 2
+    assert sorted(record.outcome for record in service.usage._records) == ["cancelled", "ok"]
@@ -0,0 +1,89 @@
+"""
+Tests for the LLM response cache
+"""
+
+import time
+from services.response_cache import ResponseCache, request_fingerprint
+from services.openai_service import OpenAIService
+
+MESSAGES = [{"role": "system", "content": "Summarize"}, {"role": "user", "content": "Transcript"}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+    
+    def __call__(self):
+        return self.now
+
+
+def test_fingerprint_ignores_fields_other_than_role_and_content():
+    with_timestamps = [dict(message, timestamp="2024-01-01T00:00:00") for message in MESSAGES]
+    assert request_fingerprint("gpt-4o", MESSAGES, temperature=0.3) == request_fingerprint("gpt-4o", with_timestamps, temperature=0.3)
+    assert request_fingerprint("gpt-4o", MESSAGES, temperature=0.3) != request_fingerprint("gpt-4o", MESSAGES, temperature=0.7)
+    assert request_fingerprint("gpt-4o", MESSAGES) != request_fingerprint("gpt-4o-mini", MESSAGES)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.get_stats() == {"hits": 3, "misses": 1, "entries": 2}
+
+
+def test_entries_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("services.response_cache.time.time", clock)
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    cache.set("a", "A")
+    
+    clock.now += 59
+    assert cache.get("a") == "A"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_disk_tier_survives_restarts(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache" / "responses.db")
+    ResponseCache(max_entries=10, ttl_seconds=60, disk_path=path).set("a", "A")
+    
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, disk_path=path)
+    assert cache.get_stats()["entries"] == 0
+    assert cache.get("a") == "A"
+    assert cache.get_stats()["entries"] == 1
+    
+    # Expired entries are dropped when the tier is opened again
+    clock = Clock()
+    clock.now += 61
+    monkeypatch.setattr("services.response_cache.time.time", clock)
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, disk_path=path)
+    assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+    assert cache.get("a") is None
+
+
+def test_unusable_disk_path_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, disk_path=str(blocker / "responses.db"))
+    cache.set("a", "A")
+    assert cache.get("a") == "A"
+
+
+def test_repeated_summaries_are_served_from_the_cache():
+    openai_service = OpenAIService()
+    transcript = [{"role": "user", "content": "What are the vitals?"}, {"role": "assistant", "content": "Nurse: BP 90/60"}]
+
+    first = openai_service.generate_case_summary(transcript)
+    assert openai_service.generate_case_summary(transcript) == first
+    assert openai_service.stub.requests == 1
+
+    transcript.append({"role": "user", "content": "Start fluids"})
+    openai_service.generate_case_summary(transcript)
+    assert openai_service.stub.requests == 2
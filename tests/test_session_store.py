@@ -0,0 +1,306 @@
+"""
+Tests for the session storage backends
+"""
+
+import time
+import asyncio
+import threading
+import pytest
+from services import session_store
+from services.session_service import SessionService
+from services.session_store import SessionStore, MemorySessionStore, SQLiteSessionStore
+
+
+def test_sqlite_sessions_survive_restart(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    sessions = SessionService(SQLiteSessionStore(path))
+    sessions.authenticate_user("david")
+    sessions.get_or_create_session("david")
+    sessions.start_case("david", "case_1")
+    sessions.add_message("david", "case_1", "assistant", "Nurse: A patient is here")
+    sessions.add_turn("david", "case_1", "Get an ECG", "Nurse: ECG shows sinus rhythm")
+    sessions.set_live_summary("david", "case_1", "Summary", 3)
+    sessions.complete_case("david", "case_1", "admit")
+    sessions.add_survey_response("david", "case_1", 0, 4)
+    sessions.store.close()
+
+    restarted = SessionService(SQLiteSessionStore(path))
+    history = restarted.get_chat_history("david", "case_1")
+    assert [(message.role, message.content, message.seq) for message in history] == [
+        ("assistant", "Nurse: A patient is here", 1),
+        ("user", "Get an ECG", 2),
+        ("assistant", "Nurse: ECG shows sinus rhythm", 2),
+    ]
+    assert restarted.get_live_summary("david", "case_1").summary == "Summary"
+    assert restarted.get_completed_cases("david") == ["case_1"]
+    assert restarted.get_survey_responses("david") == {"case_1": {0: 4}}
+    assert restarted.is_authenticated("david")
+    restarted.store.close()
+
+
+def test_sqlite_workers_see_each_others_writes(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SessionService(SQLiteSessionStore(path))
+    second = SessionService(SQLiteSessionStore(path))
+
+    first.get_or_create_session("alex")
+    first.start_case("alex", "case_2")
+    first.flush()
+    assert second.get_chat_history("alex", "case_2") == []
+
+    second.add_turn("alex", "case_2", "Order a head CT", "Nurse: CT is negative")
+    second.flush()
+    assert [message.content for message in first.get_chat_history("alex", "case_2")] == [
+        "Order a head CT", "Nurse: CT is negative"
+    ]
+
+    assert first.clear_session("alex")
+    first.flush()
+    assert second.get_session("alex") is None
+    first.store.close()
+    second.store.close()
+
+
+def test_evicted_sessions_are_spilled_and_reloaded():
+    store = MemorySessionStore(max_sessions=2, idle_ttl=0)
+    sessions = SessionService(store)
+    for user_id in ("ana", "ben", "cy"):
+        sessions.start_case(user_id, "case_1")
+        sessions.add_turn(user_id, "case_1", f"Examine {user_id}", "Nurse: Done")
+
+    assert len(store.sessions) == 2
+    assert [message.content for message in sessions.get_chat_history("ana", "case_1")] == [
+        "Examine ana", "Nurse: Done"
+    ]
+    # Reloading ana evicted ben, the least recently used
+    assert store.sessions.get("ben") is None
+    assert sessions.clear_session("ben")
+    assert sessions.get_session("ben") is None
+    store.close()
+
+
+def test_idle_sessions_are_evicted():
+    store = MemorySessionStore(max_sessions=0, idle_ttl=0.05)
+    sessions = SessionService(store)
+    sessions.start_case("ana", "case_1")
+    time.sleep(0.1)
+    sessions.start_case("ben", "case_2")
+
+    assert len(store.sessions) == 1
+    assert sessions.get_session("ana").current_case == "case_1"
+    store.close()
+
+
+def _eventually(check, timeout: float = 5.0):
+    """Wait for another node's invalidation message to arrive"""
+    deadline = time.monotonic() + timeout
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert check()
+
+
+def test_redis_sessions_are_shared_between_nodes():
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.redis_session_store import RedisSessionStore
+
+    server = fakeredis.FakeServer()
+    first = SessionService(RedisSessionStore(fakeredis.FakeRedis(server=server)))
+    second = SessionService(RedisSessionStore(fakeredis.FakeRedis(server=server)))
+
+    first.authenticate_user("adrian")
+    first.get_or_create_session("adrian")
+    first.start_case("adrian", "case_3")
+    first.add_turn("adrian", "case_3", "Order a lipase", "Nurse: Lipase is 900")
+    first.flush()
+    assert second.is_authenticated("adrian")
+    assert [message.content for message in second.get_chat_history("adrian", "case_3")] == [
+        "Order a lipase", "Nurse: Lipase is 900"
+    ]
+
+    # Nodes updating different cases of the same user keep both changes
+    first.set_live_summary("adrian", "case_3", "Pancreatitis", 2)
+    second.add_survey_response("adrian", "case_3", 1, 5)
+    second.complete_case("adrian", "case_3", "admit")
+    first.flush()
+    second.flush()
+
+    _eventually(lambda: first.get_survey_responses("adrian") == {"case_3": {1: 5}})
+    assert first.get_live_summary("adrian", "case_3").summary == "Pancreatitis"
+    assert first.get_completed_cases("adrian") == ["case_3"]
+    _eventually(lambda: second.get_live_summary("adrian", "case_3") is not None)
+    assert second.get_live_summary("adrian", "case_3").summary == "Pancreatitis"
+    assert first.clear_session("adrian")
+    _eventually(lambda: second.get_session("adrian") is None)
+    first.store.close()
+    second.store.close()
+
+
+def test_redis_requests_do_not_wait_for_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.redis_session_store import RedisSessionStore
+
+    server = fakeredis.FakeServer()
+    store = RedisSessionStore(fakeredis.FakeRedis(server=server))
+    sessions = SessionService(store)
+    sessions.get_or_create_session("bea")
+    store.flush()
+
+    # Cached loads make no round trip, and writes wait on the writer thread
+    redis_slow = threading.Event()
+    pipeline = store.client.pipeline
+    monkeypatch.setattr(store.client, "pipeline", lambda *args, **kwargs: redis_slow.wait(5) and pipeline(*args, **kwargs))
+    monkeypatch.setattr(store.client, "hget", lambda *args: pytest.fail("cached load asked Redis for the version"))
+    started = time.monotonic()
+    sessions.start_case("bea", "case_2")
+    sessions.add_turn("bea", "case_2", "Check a lactate", "Nurse: Lactate is 4")
+    assert sessions.get_session("bea").current_case == "case_2"
+    assert time.monotonic() - started < 1
+    redis_slow.set()
+    store.flush()
+    store.close()
+
+    restarted = SessionService(RedisSessionStore(fakeredis.FakeRedis(server=server)))
+    assert restarted.get_session("bea").current_case == "case_2"
+    assert [message.content for message in restarted.get_chat_history("bea", "case_2")] == [
+        "Check a lactate", "Nurse: Lactate is 4"
+    ]
+    restarted.store.close()
+
+
+def test_transcript_views_share_api_messages():
+    sessions = SessionService(MemorySessionStore())
+    sessions.start_case("ana", "case_1")
+    sessions.add_message("ana", "case_1", "assistant", "Nurse: A patient is here")
+    sessions.add_turn("ana", "case_1", "Get a troponin", "Nurse: Troponin is 0.8")
+
+    transcript = sessions.get_transcript("ana", "case_1")
+    view = transcript.view(1)
+    assert list(view) == [
+        {"role": "user", "content": "Get a troponin"},
+        {"role": "assistant", "content": "Nurse: Troponin is 0.8"},
+    ]
+    assert view[0] is transcript.api_messages[1]
+    assert len(view[1:]) == 1
+
+    # Models are only built for HTTP responses
+    history = sessions.get_chat_history("ana", "case_1")
+    assert [(message.role, message.seq) for message in history] == [("assistant", 1), ("user", 2), ("assistant", 2)]
+
+
+def test_sqlite_workers_do_not_overwrite_each_others_fields(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SessionService(SQLiteSessionStore(path))
+    second = SessionService(SQLiteSessionStore(path))
+    first.start_case("alex", "case_1")
+    first.flush()
+    assert second.get_session("alex") is not None
+
+    # Both workers change the session they loaded before seeing the other's write
+    first.set_live_summary("alex", "case_1", "Summary from the first worker", 0)
+    second.add_survey_response("alex", "case_1", 0, 5)
+    first.flush()
+    second.flush()
+
+    for sessions in (first, second, SessionService(SQLiteSessionStore(path))):
+        assert sessions.get_live_summary("alex", "case_1").summary == "Summary from the first worker"
+        assert sessions.get_survey_responses("alex") == {"case_1": {0: 5}}
+        sessions.store.close()
+
+
+def test_turn_is_committed_before_its_lock_is_released(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SessionService(SQLiteSessionStore(path, flush_interval=60))
+    second = SessionService(SQLiteSessionStore(path, flush_interval=60))
+    first.start_case("alex", "case_2")
+
+    async def run_turn():
+        async with first.turn("alex", "case_2"):
+            first.add_turn("alex", "case_2", "Order a head CT", "Nurse: CT is negative")
+
+    asyncio.run(run_turn())
+    assert [message.content for message in second.get_chat_history("alex", "case_2")] == [
+        "Order a head CT", "Nurse: CT is negative"
+    ]
+    first.store.close()
+    second.store.close()
+
+
+def test_incomplete_store_fails_at_construction():
+    class LoadOnlyStore(SessionStore):
+        def load(self, user_id):
+            return None
+
+    with pytest.raises(TypeError):
+        LoadOnlyStore()
+
+
+def test_loads_during_a_commit_keep_the_changes_being_committed(tmp_path, monkeypatch):
+    path = str(tmp_path / "sessions.sqlite3")
+    sessions = SessionService(SQLiteSessionStore(path, flush_interval=60))
+    sessions.start_case("alex", "case_1")
+    sessions.add_turn("alex", "case_1", "Check vitals", "Nurse: BP 90/60")
+    sessions.flush()
+
+    # Hold the commit of the next batch open
+    committing, release = threading.Event(), threading.Event()
+    session_data = session_store._session_data
+
+    def slow_session_data(fields):
+        committing.set()
+        release.wait(5)
+        return session_data(fields)
+
+    monkeypatch.setattr(session_store, "_session_data", slow_session_data)
+    sessions.set_live_summary("alex", "case_1", "Summary being committed", 2)
+    sessions.add_turn("alex", "case_1", "Give fluids", "Nurse: Fluids running")
+    writer = threading.Thread(target=sessions.flush)
+    writer.start()
+    assert committing.wait(5)
+
+    sessions.add_survey_response("alex", "case_1", 0, 5)
+    sessions.add_turn("alex", "case_1", "Recheck BP", "Nurse: BP 110/70")
+    release.set()
+    writer.join()
+    sessions.store.close()
+
+    restarted = SessionService(SQLiteSessionStore(path))
+    assert restarted.get_live_summary("alex", "case_1").summary == "Summary being committed"
+    assert restarted.get_survey_responses("alex") == {"case_1": {0: 5}}
+    assert [message.seq for message in restarted.get_chat_history("alex", "case_1")] == [1, 1, 2, 2, 3, 3]
+    restarted.store.close()
+
+
+def test_evicted_sessions_keep_unwritten_changes(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), flush_interval=60)
+    store._cache.max_sessions = 1
+    sessions = SessionService(store)
+    sessions.start_case("alex", "case_1")
+    sessions.set_live_summary("alex", "case_1", "Unwritten summary", 0)
+
+    # Loading another session evicts alex before the summary is committed
+    sessions.start_case("sam", "case_1")
+    assert store._cache.get("alex") is None
+    assert sessions.get_live_summary("alex", "case_1").summary == "Unwritten summary"
+    store.close()
+
+
+def test_turns_are_committed_by_the_writer_thread(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), flush_interval=60)
+    sessions = SessionService(store)
+    sessions.start_case("alex", "case_1")
+    threads = []
+    flush = store._flush
+
+    def record_flush():
+        threads.append(threading.current_thread().name)
+        flush()
+
+    store._flush = record_flush
+
+    async def run_turn():
+        async with sessions.turn("alex", "case_1"):
+            sessions.add_turn("alex", "case_1", "Order a head CT", "Nurse: CT is negative")
+
+    asyncio.run(run_turn())
+    assert threads == ["session-store-writer"]
+    store.close()
@@ -0,0 +1,84 @@
+"""
+Tests for coalescing identical in-flight requests
+"""
+
+import asyncio
+import pytest
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_with_the_same_key_share_one_call():
+    in_flight = SingleFlight()
+    calls = []
+    
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+    
+    async def run():
+        return await asyncio.gather(*(in_flight.do("key", call) for _ in range(3)), in_flight.do("other", call))
+    
+    assert asyncio.run(run()) == [2, 2, 2, 2]
+    assert len(calls) == 2
+    assert in_flight.coalesced == 2
+    assert in_flight.get_in_flight() == 0
+
+
+def test_finished_calls_are_not_reused():
+    in_flight = SingleFlight()
+    calls = []
+    
+    async def call():
+        calls.append(1)
+        return len(calls)
+    
+    async def run():
+        return [await in_flight.do("key", call), await in_flight.do("key", call)]
+    
+    assert asyncio.run(run()) == [1, 2]
+    assert in_flight.coalesced == 0
+
+
+def test_errors_reach_every_caller():
+    in_flight = SingleFlight()
+    
+    async def call():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+    
+    async def run():
+        return await asyncio.gather(*(in_flight.do("key", call) for _ in range(2)), return_exceptions=True)
+    
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_call_survives_until_every_caller_is_cancelled():
+    in_flight = SingleFlight()
+    started = []
+    
+    async def call():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+    
+    async def run():
+        first = asyncio.create_task(in_flight.do("key", call))
+        second = asyncio.create_task(in_flight.do("key", call))
+        await asyncio.sleep(0.01)
+        
+        # The remaining caller still gets the shared result
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        
+        third = asyncio.create_task(in_flight.do("key", call))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        await asyncio.sleep(0.01)
+        assert in_flight.get_in_flight() == 0
+    
+    asyncio.run(run())
+    assert len(started) == 2
@@ -0,0 +1,271 @@
+"""
+Integration tests for the FastAPI app running against the stub LLM backend
+"""
+
+import json
+import time
+import random
+import asyncio
+import contextvars
+import pytest
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI, RateLimitError
+import httpx
+from services.stub_llm import LatencyDistribution, StubLLM, create_app
+from services.openai_service import OpenAIService
+from services.usage_tracker import UsageTracker, attribute_usage
+from src.main import app, openai_service, session_service, history_service
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        assert test_client.post("/api/auth/login", json={"user_id": "david"}).status_code == 200
+        yield test_client
+
+
+def read_sse_events(response):
+    """Parse the data lines of a Server-Sent Events response"""
+    events = []
+    for line in response.iter_lines():
+        if line.startswith("data: "):
+            data = line[len("data: "):]
+            events.append(data if data == "[DONE]" else json.loads(data))
+    return events
+
+
+def test_case_start_and_chat(client):
+    start = client.post("/api/cases/case_1/start/david")
+    assert start.status_code == 200
+    assert start.json()["initial_message"]
+
+    chat = client.post("/api/cases/case_1/chat/david", json={"message": "What are the vitals?"})
+    assert chat.status_code == 200
+    assert "What are the vitals?" in chat.json()["message"]
+
+
+def test_chat_turn_is_stored_once(client):
+    assert client.post("/api/cases/case_1/start/david").status_code == 200
+    assert client.post("/api/cases/case_1/chat/david", json={"message": "Get an ECG"}).status_code == 200
+
+    history = session_service.get_chat_history("david", "case_1")
+    assert [message.content for message in history].count("Get an ECG") == 1
+    assert [message.role for message in history[-2:]] == ["user", "assistant"]
+
+
+def test_disconnect_cancels_chat(client, monkeypatch):
+    assert client.post("/api/cases/case_2/start/david").status_code == 200
+    assert not client.get("/api/cases/case_2/summary/david?wait=5").json()["pending"]
+    history_length = len(session_service.get_chat_history("david", "case_2"))
+    monkeypatch.setattr(openai_service.stub, "latency", LatencyDistribution("fixed:30", random.Random()))
+
+    body = json.dumps({"message": "Order a head CT"}).encode()
+    messages = [
+        {"type": "http.request", "body": body, "more_body": False},
+        {"type": "http.disconnect"}
+    ]
+    sent = []
+
+    async def receive():
+        if len(messages) == 1:
+            # Disconnect once the LLM call is in flight
+            while openai_service.limiter.get_stats()["in_flight"] == 0:
+                await asyncio.sleep(0.01)
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/cases/case_2/chat/david", "raw_path": b"/api/cases/case_2/chat/david",
+        "query_string": b"", "root_path": "", "server": ("testserver", 80), "client": ("testclient", 50000),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    }
+
+    async def call():
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+    client.portal.call(call)
+
+    assert sent[0]["status"] == 499
+    assert openai_service.limiter.get_stats()["in_flight"] == 0
+    assert len(session_service.get_chat_history("david", "case_2")) == history_length
+
+
+def test_concurrent_turns_are_serialized(client, monkeypatch):
+    assert client.post("/api/cases/case_3/start/david").status_code == 200
+    monkeypatch.setattr(openai_service.stub, "latency", LatencyDistribution("fixed:0.2", random.Random()))
+    windows = []
+    get_window = history_service.get_window
+
+    def recording_get_window(user_id, case_id):
+        window = get_window(user_id, case_id)
+        windows.append([message["content"] for message in window])
+        return window
+
+    monkeypatch.setattr(history_service, "get_window", recording_get_window)
+
+    async def submit_twice():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+            return await asyncio.gather(*(
+                http.post("/api/cases/case_3/chat/david", json={"message": message})
+                for message in ("Check a glucose", "Give aspirin")
+            ))
+
+    responses = client.portal.call(submit_twice)
+
+    assert [response.status_code for response in responses] == [200, 200]
+    # The second turn waited for the first and saw it in its history
+    assert "Check a glucose" not in windows[0]
+    assert "Check a glucose" in windows[1]
+    history = session_service.get_chat_history("david", "case_3")
+    assert [message.content for message in history[-4::2]] == ["Check a glucose", "Give aspirin"]
+    assert [message.seq for message in history] == [1, 2, 2, 3, 3]
+
+
+def test_streamed_chat(client):
+    assert client.post("/api/cases/case_2/start/david").status_code == 200
+
+    with client.stream("POST", "/api/cases/case_2/chat/david/stream", json={"message": "Order a CBC"}) as response:
+        assert response.status_code == 200
+        events = read_sse_events(response)
+
+    tokens = "".join(event["content"] for event in events if isinstance(event, dict) and event["type"] == "token")
+    assert "Order a CBC" in tokens
+    assert events[-1] == "[DONE]"
+    assert not [event for event in events if isinstance(event, dict) and event["type"] == "error"]
+
+
+def test_scripted_responses(tmp_path):
+    rules = tmp_path / "responses.json"
+    rules.write_text(json.dumps([
+        {"match": "vitals", "response": "Nurse: BP 120/80, HR 88 (turn {turn})"},
+        {"match": "", "response": "Patient: I feel unwell"}
+    ]))
+    stub = StubLLM(latency="fixed:0", tokens_per_second=0, responses_path=str(rules))
+
+    assert stub.render({"model": "gpt-4o", "messages": [{"role": "user", "content": "Check vitals"}]}) == "Nurse: BP 120/80, HR 88 (turn 1)"
+    assert stub.render({"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello"}]}) == "Patient: I feel unwell"
+
+
+def test_stub_lists_models_for_the_warm_up():
+    stub = StubLLM(latency="fixed:0", tokens_per_second=0)
+    openai_client = AsyncOpenAI(api_key="stub", http_client=httpx.AsyncClient(transport=stub.async_transport()))
+
+    async def list_models():
+        return await openai_client.models.list()
+
+    assert "gpt-4o" in [model.id for model in asyncio.run(list_models()).data]
+
+    with TestClient(create_app(stub)) as server:
+        response = server.get("/v1/models")
+    assert response.status_code == 200
+    assert "gpt-4o" in [model["id"] for model in response.json()["data"]]
+
+
+def test_error_injection():
+    stub = StubLLM(latency="fixed:0", tokens_per_second=0, error_rate=1.0, error_status=429)
+    openai_client = AsyncOpenAI(
+        api_key="stub", max_retries=0, http_client=httpx.AsyncClient(transport=stub.async_transport())
+    )
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(openai_client.chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": "hi"}]
+        ))
+
+
+def test_llm_calls_do_not_block_the_event_loop():
+    service = OpenAIService()
+    service.stub.latency = LatencyDistribution("fixed:0.3", random.Random(1))
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(
+            service.get_chat_response_async("Case", [], f"Question {index}") for index in range(4)
+        ))
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.9
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+
+    assert LatencyDistribution("fixed:0.25", rng).sample() == 0.25
+    assert 0.1 <= LatencyDistribution("uniform:0.1,0.2", rng).sample() <= 0.2
+    assert LatencyDistribution("lognormal:-0.7,0.5", rng).sample() > 0
+    with pytest.raises(ValueError):
+        LatencyDistribution("gamma:1", rng)
+
+
+def test_usage_is_attributed_to_user_and_case(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/api/cases/case_3/start/david").status_code == 200
+    assert client.post("/api/cases/case_3/chat/david", json={"message": "Order a lipase"}).status_code == 200
+
+    assert client.get("/api/admin/usage").status_code == 403
+    records = client.get("/api/admin/usage/david/case_3", headers={"X-Admin-Token": "secret"}).json()
+    chat_calls = [record for record in records if record["task"] == "chat"]
+    assert chat_calls and chat_calls[-1]["outcome"] == "ok"
+    assert chat_calls[-1]["prompt_tokens"] > 0
+
+    rollups = client.get("/api/admin/usage?group_by=task", headers={"X-Admin-Token": "secret"}).json()
+    assert rollups["chat"]["calls"] >= 1
+
+
+def test_usage_keeps_the_most_recently_used_cases():
+    usage = UsageTracker(max_cases=2)
+
+    def record(user_id, case_id):
+        attribute_usage(user_id, case_id)
+        usage.record("chat", "case", "gpt-4o", None, 0.1, 0.2, "ok")
+
+    for user_id, case_id in (("david", "case_1"), ("david", "case_2"), ("david", "case_1"), ("ines", "case_1")):
+        contextvars.copy_context().run(record, user_id, case_id)
+    assert len(usage.get_records("david", "case_1")) == 2
+    assert usage.get_records("david", "case_2") == []
+    assert len(usage.get_records("ines", "case_1")) == 1
+
+
+def test_prompt_cache_stats_are_reported(client):
+    assert client.post("/api/cases/case_2/start/david").status_code == 200
+    assert client.post("/api/cases/case_2/chat/david", json={"message": "Get an ECG"}).status_code == 200
+
+    prompt_cache = client.get("/api/llm/status").json()["prompt_cache"]
+    assert prompt_cache["case"]["calls"] >= 1
+    assert prompt_cache["case"]["prompt_tokens"] > 0
+    assert 0.0 <= prompt_cache["case"]["cache_hit_rate"] <= 1.0
+
+
+def test_final_summary_is_generated_at_completion(client):
+    assert client.post("/api/cases/case_1/start/david").status_code == 200
+    assert client.post("/api/cases/case_1/chat/david", json={"message": "Admit to cardiology"}).status_code == 200
+    assert client.post("/api/cases/case_1/complete/david", json={"action": "admit"}).status_code == 200
+
+    final = client.get("/api/cases/case_1/final-summary/david?wait=5").json()
+    assert not final["pending"] and not final["failed"]
+    assert final["summary"]
+
+    summary = client.get("/api/summary/david").json()
+    case = next(case for case in summary["completed_cases"] if case["case_id"] == "case_1")
+    assert case["summary"] == final["summary"]
+    assert case["summary_version"] == final["version"]
+    assert not case["summary_pending"]
+
+
+def test_case_summaries_are_streamed(client):
+    for case_id in ("case_2", "case_3"):
+        assert client.post(f"/api/cases/{case_id}/start/david").status_code == 200
+        assert client.post(f"/api/cases/{case_id}/complete/david", json={"action": "discharge"}).status_code == 200
+
+    with client.stream("GET", "/api/summary/david/stream") as response:
+        assert response.status_code == 200
+        events = read_sse_events(response)
+
+    summaries = {event["case_id"]: event for event in events if isinstance(event, dict) and event["type"] == "summary"}
+    assert {"case_2", "case_3"} <= set(summaries)
+    assert all(event["summary"] and not event["failed"] for event in summaries.values())
+    assert events[-1] == "[DONE]"
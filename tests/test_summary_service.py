@@ -0,0 +1,201 @@
+"""
+Tests for generating live case summaries in the background
+"""
+
+import re
+import asyncio
+from services.openai_service import OpenAIService
+from services.session_service import SessionService
+from services.session_store import MemorySessionStore, SQLiteSessionStore
+from services.summary_service import SummaryService
+
+USER_ID = "summary-user"
+CASE_ID = "case_1"
+
+
+def create_summary_service():
+    openai_service = OpenAIService()
+    openai_service.stub.rules = [
+        (re.compile("^Current summary"), "Updated summary {request}"),
+        (re.compile("^Please summarize"), "Full summary {request}")
+    ]
+    session_service = SessionService(MemorySessionStore())
+    session_service.start_case(USER_ID, CASE_ID)
+    return SummaryService(openai_service, session_service)
+
+
+async def refresh(summary_service, message):
+    summary_service.session_service.add_turn(USER_ID, CASE_ID, message, f"Nurse: {message} done")
+    pending = summary_service.schedule_live_summary(USER_ID, CASE_ID)
+    assert pending.pending
+    await asyncio.gather(*summary_service._tasks.values())
+    return summary_service.session_service.get_live_summary(USER_ID, CASE_ID)
+
+
+def test_live_summary_is_updated_with_only_the_new_messages():
+    summary_service = create_summary_service()
+    updates = []
+    update_case_summary_async = summary_service.openai_service.update_case_summary_async
+    
+    async def record_update(previous_summary, new_messages, system_prompt=None):
+        updates.append((previous_summary, list(new_messages)))
+        return await update_case_summary_async(previous_summary, new_messages, system_prompt)
+    
+    summary_service.openai_service.update_case_summary_async = record_update
+    
+    async def run():
+        first = await refresh(summary_service, "Check vitals")
+        assert (first.summary, first.message_count, first.pending) == ("Full summary 1", 2, False)
+        
+        second = await refresh(summary_service, "Give aspirin")
+        assert second.summary == "Updated summary 2"
+        assert second.version > first.version
+        assert second.updates_since_rebuild == 1
+        assert updates == [("Full summary 1", [
+            {"role": "user", "content": "Give aspirin"}, {"role": "assistant", "content": "Nurse: Give aspirin done"}
+        ])]
+    
+    asyncio.run(run())
+
+
+def test_full_rebuild_after_the_configured_number_of_updates(monkeypatch):
+    monkeypatch.setattr("services.summary_service.SUMMARY_FULL_REBUILD_INTERVAL", 1)
+    summary_service = create_summary_service()
+    
+    async def run():
+        summaries = [await refresh(summary_service, message) for message in ("Check vitals", "Give aspirin", "Get an ECG")]
+        return [summary.summary for summary in summaries]
+    
+    assert asyncio.run(run()) == ["Full summary 1", "Updated summary 2", "Full summary 3"]
+
+
+def test_superseded_refresh_is_cancelled():
+    summary_service = create_summary_service()
+    
+    async def run():
+        summary_service.session_service.add_turn(USER_ID, CASE_ID, "Check vitals", "Nurse: BP 90/60")
+        summary_service.schedule_live_summary(USER_ID, CASE_ID)
+        superseded = summary_service._tasks[(USER_ID, CASE_ID)]
+        live_summary = await refresh(summary_service, "Give fluids")
+        assert superseded.cancelled()
+        return live_summary
+    
+    live_summary = asyncio.run(run())
+    assert live_summary.message_count == 4
+    assert live_summary.summary.startswith("Full summary")
+
+
+def test_waiters_wake_when_the_summary_is_updated():
+    summary_service = create_summary_service()
+    
+    async def run():
+        summary_service.session_service.add_turn(USER_ID, CASE_ID, "Check vitals", "Nurse: BP 90/60")
+        version = summary_service.schedule_live_summary(USER_ID, CASE_ID).version
+        return await summary_service.wait_for_live_summary(USER_ID, CASE_ID, version, timeout=5)
+    
+    live_summary = asyncio.run(run())
+    assert live_summary.summary == "Full summary 1"
+    assert not live_summary.pending
+
+
+def test_waiters_see_summaries_finished_by_another_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.summary_service.SUMMARY_WAIT_POLL_INTERVAL_SECONDS", 0.05)
+    path = str(tmp_path / "sessions.sqlite3")
+    waiting = SummaryService(OpenAIService(), SessionService(SQLiteSessionStore(path, flush_interval=60)))
+    finishing = SessionService(SQLiteSessionStore(path, flush_interval=60))
+
+    async def run():
+        waiting.session_service.start_case(USER_ID, CASE_ID)
+        version = waiting.session_service.set_live_summary_pending(USER_ID, CASE_ID).version
+        waiting.session_service.flush()
+
+        async def finish_elsewhere():
+            await asyncio.sleep(0.1)
+            finishing.set_live_summary(USER_ID, CASE_ID, "Summary from another worker", 0)
+            finishing.flush()
+
+        started = asyncio.get_running_loop().time()
+        live_summary, _ = await asyncio.gather(
+            waiting.wait_for_live_summary(USER_ID, CASE_ID, version, timeout=5), finish_elsewhere()
+        )
+        return live_summary, asyncio.get_running_loop().time() - started
+
+    live_summary, waited = asyncio.run(run())
+    assert live_summary.summary == "Summary from another worker"
+    assert waited < 1
+    waiting.session_service.store.close()
+    finishing.store.close()
+
+
+def test_final_summary_waiters_see_another_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.summary_service.SUMMARY_WAIT_POLL_INTERVAL_SECONDS", 0.05)
+    path = str(tmp_path / "sessions.sqlite3")
+    waiting = SummaryService(OpenAIService(), SessionService(SQLiteSessionStore(path, flush_interval=60)))
+    finishing = SessionService(SQLiteSessionStore(path, flush_interval=60))
+
+    async def run():
+        waiting.session_service.start_case(USER_ID, CASE_ID)
+        version = waiting.session_service.set_final_summary_pending(USER_ID, CASE_ID).version
+        waiting.session_service.flush()
+
+        async def finish_elsewhere():
+            await asyncio.sleep(0.1)
+            finishing.set_final_summary(USER_ID, CASE_ID, "Final summary from another worker", 0)
+            finishing.flush()
+
+        started = asyncio.get_running_loop().time()
+        final_summary, _ = await asyncio.gather(
+            waiting.wait_for_final_summary(USER_ID, CASE_ID, version, timeout=5), finish_elsewhere()
+        )
+        return final_summary, asyncio.get_running_loop().time() - started
+
+    final_summary, waited = asyncio.run(run())
+    assert final_summary.summary == "Final summary from another worker"
+    assert waited < 1
+    waiting.session_service.store.close()
+    finishing.store.close()
+
+
+def test_final_summary_left_pending_by_a_stopped_worker_is_generated_again(monkeypatch):
+    monkeypatch.setattr("services.summary_service.SUMMARY_WAIT_POLL_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr("services.summary_service.SUMMARY_FINAL_ORPHAN_SECONDS", 0.1)
+    summary_service = create_summary_service()
+    session_service = summary_service.session_service
+
+    async def run():
+        session_service.add_turn(USER_ID, CASE_ID, "Admit to cardiology", "Nurse: Bed requested")
+        # A summary that covers the transcript, then pending on a worker that stopped
+        session_service.set_final_summary(USER_ID, CASE_ID, "Old summary", 2)
+        session_service.set_final_summary_pending(USER_ID, CASE_ID)
+        assert summary_service.schedule_final_summary(USER_ID, CASE_ID).pending
+        assert not summary_service._final_tasks
+
+        return [final_summary async for _, final_summary in summary_service.stream_final_summaries(USER_ID, [CASE_ID])]
+
+    final_summaries = asyncio.run(run())
+    assert not final_summaries[0].pending
+    assert final_summaries[0].summary.startswith("Full summary")
+
+
+def test_final_summary_stream_gives_up_after_the_deadline(monkeypatch):
+    monkeypatch.setattr("services.summary_service.SUMMARY_WAIT_POLL_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr("services.summary_service.SUMMARY_FINAL_WAIT_SECONDS", 0.2)
+    summary_service = create_summary_service()
+
+    async def never_finishes(chat_history, system_prompt):
+        await asyncio.Event().wait()
+
+    summary_service.openai_service.generate_conversation_summary_async = never_finishes
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        final_summaries = [
+            final_summary async for _, final_summary in summary_service.stream_final_summaries(USER_ID, [CASE_ID])
+        ]
+        for task in summary_service._final_tasks.values():
+            task.cancel()
+        return final_summaries, asyncio.get_running_loop().time() - started
+
+    final_summaries, waited = asyncio.run(run())
+    assert final_summaries[0].pending
+    assert waited < 1